@@ -0,0 +1,182 @@
+import argparse
+import os
+import random
+
+RSC7_HEADER = b"RSC7"
+
+DEFAULT_CONFIG = {
+    "vehicles": 8,
+    "asset_size": 512 * 1024,
+    "meta_entries": 20,
+    "audio_banks": 1,
+    "seed": 1,
+}
+
+
+def config_slug(config):
+    return (
+        f"{config['vehicles']}v-{config['asset_size']}b-{config['meta_entries']}m-"
+        f"{config['audio_banks']}a-seed{config['seed']}"
+    )
+
+
+def _asset(rng, size):
+    # Real stream assets start with an RSC7 header followed by compressed data,
+    # which random bytes stand in for well enough.
+    return RSC7_HEADER + rng.randbytes(max(size - len(RSC7_HEADER), 0))
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def vehicles_meta(name, extra_entries):
+    items = [
+        f"""    <Item>
+      <modelName>{name}</modelName>
+      <txdName>{name}</txdName>
+      <handlingId>{name.upper()}</handlingId>
+      <gameName>{name.upper()}</gameName>
+      <audioNameHash>{name}</audioNameHash>
+      <layout>LAYOUT_STANDARD</layout>
+      <lodDistances content="float_array">15.0 30.0 60.0 120.0 500.0 500.0</lodDistances>
+    </Item>
+"""
+    ]
+    for i in range(extra_entries):
+        items.append(
+            f"""    <!-- variant {i} -->
+    <Item>
+      <modelName>{name}_v{i}</modelName>
+      <txdName>{name}</txdName>
+      <handlingId>{name.upper()}</handlingId>
+      <gameName>{name.upper()}</gameName>
+      <layout>LAYOUT_STANDARD</layout>
+      <lodDistances content="float_array">15.0 30.0 60.0 120.0 500.0 500.0</lodDistances>
+    </Item>
+"""
+        )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<CVehicleModelInfo__InitDataList>
+  <residentTxd>vehshare</residentTxd>
+  <InitDatas>
+{"".join(items)}  </InitDatas>
+  <txdRelationships>
+    <Item>
+      <parent>vehicles_generic</parent>
+      <child>{name}</child>
+    </Item>
+  </txdRelationships>
+</CVehicleModelInfo__InitDataList>
+"""
+
+
+def handling_meta(name, extra_entries):
+    items = []
+    for i in range(extra_entries + 1):
+        suffix = "" if i == 0 else f"_V{i}"
+        items.append(
+            f"""    <Item type="CHandlingData">
+      <handlingName>{name.upper()}{suffix}</handlingName>
+      <fMass value="{1200 + i}.000000" />
+      <fInitialDragCoeff value="8.000000" />
+      <vecCentreOfMassOffset x="0.000000" y="0.000000" z="-0.100000" />
+      <fInitialDriveMaxFlatVel value="{160 + i}.000000" />
+    </Item>
+"""
+        )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<CHandlingDataMgr>
+  <HandlingData>
+{"".join(items)}  </HandlingData>
+</CHandlingDataMgr>
+"""
+
+
+def carvariations_meta(name):
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<CVehicleModelInfoVariation>
+  <variationData>
+    <Item>
+      <modelName>{name}</modelName>
+      <colors>
+        <Item>
+          <indices content="char_array">0 0 0 0</indices>
+        </Item>
+      </colors>
+    </Item>
+  </variationData>
+</CVehicleModelInfoVariation>
+"""
+
+
+def generate_vehicle(root, index, config, rng):
+    name = f"bench{index:03d}"
+    folder = os.path.join(root, name)
+    size = config["asset_size"]
+    entries = config["meta_entries"]
+
+    _write(os.path.join(folder, "stream", f"{name}.yft"), _asset(rng, size))
+    _write(os.path.join(folder, "stream", f"{name}_hi.yft"), _asset(rng, size * 2))
+    _write(os.path.join(folder, "stream", f"{name}.ytd"), _asset(rng, size))
+    # Shared by every vehicle with the same bytes: exercises duplicate skipping.
+    _write(os.path.join(folder, "stream", "vehshare_bench.ytd"), _asset(random.Random(0), size // 4))
+    # Same name, two different contents: exercises conflict handling.
+    _write(os.path.join(folder, "stream", "interior_bench.ytd"), _asset(random.Random(index % 2 + 1), size // 8))
+
+    _write(os.path.join(folder, "data", "vehicles.meta"), vehicles_meta(name, entries))
+    _write(os.path.join(folder, "data", "handling.meta"), handling_meta(name, entries))
+    _write(os.path.join(folder, "data", "carvariations.meta"), carvariations_meta(name))
+
+    if config["audio_banks"]:
+        _write(os.path.join(folder, "audioconfig", f"{name}_game.dat151.rel"), rng.randbytes(2048))
+        _write(os.path.join(folder, "audioconfig", f"{name}_sounds.dat54.rel"), rng.randbytes(2048))
+        for bank in range(config["audio_banks"]):
+            _write(os.path.join(folder, "sfx", f"{name}_{bank}.awc"), rng.randbytes(size // 2))
+    return folder
+
+
+def generate_mod_tree(root, **overrides):
+    config = dict(DEFAULT_CONFIG, **overrides)
+    rng = random.Random(config["seed"])
+    os.makedirs(root, exist_ok=True)
+    return [generate_vehicle(root, index, config, rng) for index in range(config["vehicles"])]
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--vehicles", type=int, default=DEFAULT_CONFIG["vehicles"], help="Number of vehicle folders")
+    parser.add_argument(
+        "--asset-size", type=int, default=DEFAULT_CONFIG["asset_size"],
+        help="Size in bytes of each base stream asset (the _hi model is twice as large)",
+    )
+    parser.add_argument(
+        "--meta-entries", type=int, default=DEFAULT_CONFIG["meta_entries"],
+        help="Extra <Item> entries per vehicles.meta and handling.meta",
+    )
+    parser.add_argument("--audio-banks", type=int, default=DEFAULT_CONFIG["audio_banks"], help=".awc banks per vehicle")
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG["seed"], help="Random seed for asset contents")
+
+
+def config_from_args(args):
+    return {key: getattr(args, key) for key in DEFAULT_CONFIG}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Generate a synthetic tree of extracted vehicle mods.",
+    )
+    parser.add_argument("output", help="Directory to create the vehicle folders in")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    folders = generate_mod_tree(args.output, **config_from_args(args))
+    print(f"Generated {len(folders)} vehicles in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
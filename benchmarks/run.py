@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from converter import build_combined_fivem_resource, build_fivem_resource
+from converter.c_utils import merge_meta_files
+from converter.cli import main as cli_main
+from converter.hashing import hash_file, hash_stream
+
+from .generate import add_config_arguments, config_from_args, config_slug, generate_mod_tree
+from .startup import over_budget, print_probes, run_probes
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(BENCH_DIR, "golden")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+IGNORED_OUTPUTS = (".packer_cache.json",)
+
+
+def vehicle_folders(tree):
+    return [os.path.join(tree, name) for name in sorted(os.listdir(tree))]
+
+
+def source_bytes(folders):
+    total = 0
+    for folder in folders:
+        for dirpath, _, filenames in os.walk(folder):
+            total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    return total
+
+
+def zip_folders(folders, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    archives = []
+    for folder in folders:
+        archive = os.path.join(target_dir, os.path.basename(folder) + ".zip")
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+            for dirpath, _, filenames in os.walk(folder):
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    zf.write(path, os.path.relpath(path, folder))
+        archives.append(archive)
+    return archives
+
+
+def output_digests(out_dir):
+    # Zip packages are compared member by member, so folder and zip output of
+    # the same build share one golden file.
+    digests = {}
+    for dirpath, _, filenames in os.walk(out_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, out_dir).replace(os.sep, "/")
+            if name in IGNORED_OUTPUTS:
+                continue
+            if dirpath == out_dir and name.endswith(".zip"):
+                with zipfile.ZipFile(path) as zf:
+                    for info in zf.infolist():
+                        with zf.open(info) as f:
+                            digests[info.filename] = hash_stream(f)
+            else:
+                digests[rel] = hash_file(path)
+    return dict(sorted(digests.items()))
+
+
+def _build_each(folders, out_dir, **kwargs):
+    for folder in folders:
+        build_fivem_resource(folder, os.path.join(out_dir, os.path.basename(folder)), **kwargs)
+
+
+def _build_archives(ctx, out_dir):
+    for archive in ctx["archives"]:
+        name = os.path.basename(archive)[:-len(".zip")]
+        build_fivem_resource(archive, os.path.join(out_dir, name))
+
+
+def _build_combined(folders, out_dir, **kwargs):
+    build_combined_fivem_resource(folders, os.path.join(out_dir, "combined"), **kwargs)
+
+
+def _merge_metas(ctx, out_dir):
+    paths = [os.path.join(folder, "data", "vehicles.meta") for folder in ctx["folders"]]
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "vehicles.meta"), "w", encoding="utf-8") as f:
+        f.write(merge_meta_files("vehicles.meta", paths))
+
+
+def _cli_batch(ctx, out_dir):
+    argv = [ctx["tree"], "-o", out_dir, "-j", "2", "--no-meta-cache", "--full-rebuild"]
+    if cli_main(argv) != 0:
+        raise RuntimeError("CLI batch conversion failed")
+
+
+def _prepare_archives(ctx):
+    if "archives" not in ctx:
+        ctx["archives"] = zip_folders(ctx["folders"], os.path.join(ctx["work_dir"], "archives"))
+
+
+def _prepare_rebuild(ctx, out_dir):
+    _build_each(ctx["folders"], out_dir)
+
+
+def _prepare_link_rebuild(ctx, out_dir):
+    # Outputs hard-linked to the sources, which the rebuild must replace rather than write through.
+    _build_each(ctx["folders"], out_dir, copy_mode="link")
+
+
+# name -> (golden file, run(ctx, out_dir), untimed setup(ctx, out_dir) or None)
+SCENARIOS = {
+    "single_copy": ("single", lambda ctx, out: _build_each(ctx["folders"], out, copy_mode="copy"), None),
+    "single_fast": ("single", lambda ctx, out: _build_each(ctx["folders"], out, copy_mode="fast"), None),
+    "single_link": ("single", lambda ctx, out: _build_each(ctx["folders"], out, copy_mode="link"), None),
+    "single_zip": ("single", lambda ctx, out: _build_each(ctx["folders"], out, output_format="zip"), None),
+    "single_archive": ("single", _build_archives, lambda ctx, out: _prepare_archives(ctx)),
+    "single_rebuild": ("single", lambda ctx, out: _build_each(ctx["folders"], out), _prepare_rebuild),
+    "single_link_downscale": (
+        "single",
+        lambda ctx, out: _build_each(ctx["folders"], out, texture_max_size=1024),
+        _prepare_link_rebuild,
+    ),
+    "cli_batch": ("single", _cli_batch, None),
+    "combined": ("combined", lambda ctx, out: _build_combined(ctx["folders"], out), None),
+    "combined_rename": (
+        "combined_rename",
+        lambda ctx, out: _build_combined(ctx["folders"], out, conflict_policy="rename"),
+        None,
+    ),
+    "combined_zip": ("combined", lambda ctx, out: _build_combined(ctx["folders"], out, output_format="zip"), None),
+    "merge_meta": ("merge_meta", _merge_metas, None),
+}
+
+
+def _timed(run, ctx, out_dir, setup, trace):
+    shutil.rmtree(out_dir, ignore_errors=True)
+    if setup is not None:
+        setup(ctx, out_dir)
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        # Conflict warnings and per-vehicle lines would drown out the results.
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(ctx, out_dir)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace else None
+    finally:
+        if trace:
+            tracemalloc.stop()
+    return elapsed, peak
+
+
+def golden_path(slug, golden_name):
+    return os.path.join(GOLDEN_DIR, slug, f"{golden_name}.json")
+
+
+def check_golden(digests, path, update):
+    if update:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(digests, f, indent=1, sort_keys=True)
+            f.write("\n")
+        return "updated", []
+    if not os.path.exists(path):
+        return "missing", []
+    with open(path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    differences = sorted(
+        name for name in set(expected) | set(digests) if expected.get(name) != digests.get(name)
+    )
+    return ("match" if not differences else "mismatch"), differences
+
+
+def run_scenario(name, ctx, repeat, update_golden):
+    golden_name, run, setup = SCENARIOS[name]
+    out_dir = os.path.join(ctx["work_dir"], "out", name)
+    timings = [_timed(run, ctx, out_dir, setup, trace=False)[0] for _ in range(repeat)]
+    # Peak memory is measured on a separate run: tracemalloc slows allocation-heavy code down.
+    _, peak = _timed(run, ctx, out_dir, setup, trace=True)
+
+    status, differences = check_golden(
+        output_digests(out_dir), golden_path(ctx["slug"], golden_name), update_golden
+    )
+    # No build may touch the mod folders, whatever the copy mode.
+    sources = output_digests(ctx["tree"])
+    changed = sorted(name for name in sources if sources[name] != ctx["source_digests"].get(name))
+    if changed:
+        status = "mismatch"
+        differences = [f"source {name}" for name in changed] + differences
+    best = min(timings)
+    return {
+        "golden": golden_name,
+        "golden_status": status,
+        "golden_differences": differences[:20],
+        "wall_seconds": timings,
+        "best_seconds": best,
+        "median_seconds": statistics.median(timings),
+        "source_bytes": ctx["bytes"],
+        "throughput_mb_s": ctx["bytes"] / max(best, 1e-9) / (1024 * 1024),
+        "peak_memory_bytes": peak,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scenario(name, result, previous=None):
+    line = (
+        f"{name:<16} {result['best_seconds'] * 1000:9.1f} ms  {result['throughput_mb_s']:8.1f} MB/s  "
+        f"peak {result['peak_memory_bytes'] / 1024:9.1f} KiB  golden: {result['golden_status']}"
+    )
+    if previous is not None:
+        change = (result["best_seconds"] / max(previous["best_seconds"], 1e-9) - 1) * 100
+        line += f"  ({change:+.1f}% vs previous)"
+    print(line)
+    for difference in result["golden_differences"]:
+        print(f"    differs: {difference}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Time the converter on a synthetic mod tree and check its output against golden files.",
+    )
+    add_config_arguments(parser)
+    parser.add_argument(
+        "-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+        help="Scenario to run (repeatable, default: all)",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Timed runs per scenario (default: 3)")
+    parser.add_argument("--work-dir", help="Where to generate the tree and outputs (default: a temporary directory)")
+    parser.add_argument("-o", "--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="Earlier results file to compare timings against")
+    parser.add_argument(
+        "--update-golden", action="store_true",
+        help="Record the current outputs as the golden files instead of checking them",
+    )
+    parser.add_argument(
+        "--no-startup", action="store_true",
+        help="Skip the import time probes and their budget check",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.repeat < 1:
+        print("--repeat must be at least 1", file=sys.stderr)
+        return 2
+
+    config = config_from_args(args)
+    previous = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("scenarios", {})
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="fivem_bench_")
+    tree = os.path.join(work_dir, "tree")
+    try:
+        shutil.rmtree(tree, ignore_errors=True)
+        generate_mod_tree(tree, **config)
+        folders = vehicle_folders(tree)
+        ctx = {
+            "tree": tree,
+            "folders": folders,
+            "work_dir": work_dir,
+            "slug": config_slug(config),
+            "bytes": source_bytes(folders),
+            "source_digests": output_digests(tree),
+        }
+        print(f"Synthetic tree: {len(folders)} vehicles, {ctx['bytes'] / (1024 * 1024):.1f} MiB ({ctx['slug']})")
+
+        results = {}
+        for name in args.scenario or SCENARIOS:
+            results[name] = run_scenario(name, ctx, args.repeat, args.update_golden)
+            print_scenario(name, results[name], previous.get(name))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    startup = {} if args.no_startup else run_probes()
+    print_probes(startup)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config,
+            "scenarios": results,
+            "startup": startup,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+    if any(r["golden_status"] == "mismatch" for r in results.values()) or over_budget(startup):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+import argparse
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each entry point imports before it can do anything, and how long that may take.
+# Budgets leave out Qt itself: its import time depends on the machine and the Qt build,
+# not on us.
+PROBES = {
+    "gui": {"code": "import gui.main_window", "budget_ms": 60, "requires": "PyQt6", "exclude": ("PyQt6",)},
+    "library": {"code": "import converter; converter.CancelToken", "budget_ms": 25},
+    "cli": {"code": "import converter.cli", "budget_ms": 250},
+}
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    # Each line is "self us | cumulative us | <indent>module"; children come before their parent.
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append({
+                "name": name, "self_us": int(own), "cumulative_us": int(cumulative), "depth": len(indent) // 2,
+            })
+    return modules
+
+
+def _excluded(name, exclude):
+    return any(name == prefix or name.startswith(prefix + ".") for prefix in exclude)
+
+
+def summarize(modules, exclude=(), baseline=(), top=8):
+    # The interpreter imports the baseline modules before running anything, so they don't count.
+    modules = [m for m in modules if m["name"] not in baseline]
+    total = sum(m["cumulative_us"] for m in modules if m["depth"] == 0)
+    # Qt is usually imported from inside our own modules, so excluded packages are found at any
+    # depth. Only the outermost one counts, along with everything it imported.
+    excluded = 0
+    inside = set()
+    ancestors = []
+    for index in reversed(range(len(modules))):
+        m = modules[index]
+        del ancestors[m["depth"]:]
+        if any(_excluded(name, exclude) for name in ancestors):
+            inside.add(index)
+        elif _excluded(m["name"], exclude):
+            inside.add(index)
+            excluded += m["cumulative_us"]
+        ancestors.append(m["name"])
+    # Cumulative times nest, so a package shows up together with its heaviest imports.
+    heaviest = {}
+    for index in sorted(range(len(modules)), key=lambda i: modules[i]["cumulative_us"], reverse=True):
+        if len(heaviest) < top and index not in inside:
+            heaviest.setdefault(modules[index]["name"], modules[index])
+    own = {}
+    for m in modules:
+        package = m["name"].split(".")[0]
+        if package in ("converter", "gui"):
+            own[package] = own.get(package, 0) + m["self_us"]
+    return {
+        "total_ms": total / 1000,
+        "excluded_ms": excluded / 1000,
+        "measured_ms": (total - excluded) / 1000,
+        "own_ms": {package: us / 1000 for package, us in sorted(own.items())},
+        "heaviest": [{"name": m["name"], "ms": m["cumulative_us"] / 1000} for m in heaviest.values()],
+    }
+
+
+def _importtime(code):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else code)
+    return parse_importtime(completed.stderr)
+
+
+def probe(code, repeat=3, exclude=()):
+    baseline = {m["name"] for m in _importtime("pass")}
+    best = None
+    for _ in range(repeat):
+        # A fresh interpreter each time; the fastest run is the one least disturbed by the machine.
+        summary = summarize(_importtime(code), exclude, baseline)
+        if best is None or summary["measured_ms"] < best["measured_ms"]:
+            best = summary
+    return best
+
+
+def run_probes(names=None, repeat=3):
+    results = {}
+    for name in names or PROBES:
+        spec = PROBES[name]
+        if spec.get("requires") and importlib.util.find_spec(spec["requires"]) is None:
+            results[name] = {"status": "skipped", "reason": f"{spec['requires']} is not installed"}
+            continue
+        result = probe(spec["code"], repeat, spec.get("exclude", ()))
+        result["budget_ms"] = spec["budget_ms"]
+        result["status"] = "ok" if result["measured_ms"] <= spec["budget_ms"] else "over budget"
+        results[name] = result
+    return results
+
+
+def print_probes(results):
+    for name, result in results.items():
+        if result["status"] == "skipped":
+            print(f"startup {name:<9} skipped: {result['reason']}")
+            continue
+        line = (
+            f"startup {name:<9} {result['measured_ms']:7.1f} ms  budget {result['budget_ms']:5.0f} ms  "
+            f"{result['status']}"
+        )
+        if result["excluded_ms"]:
+            line += f"  (+{result['excluded_ms']:.1f} ms Qt)"
+        print(line)
+        print("    " + ", ".join(f"{m['name']} {m['ms']:.1f}" for m in result["heaviest"]))
+
+
+def over_budget(results):
+    return [name for name, result in results.items() if result["status"] == "over budget"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup",
+        description="Measure how long each entry point takes to import and check it against its budget.",
+    )
+    parser.add_argument("-p", "--probe", action="append", choices=sorted(PROBES), help="Probe to run (default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Fresh interpreters per probe (default: 3)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = run_probes(args.probe, args.repeat)
+    print_probes(results)
+    return 1 if over_budget(results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
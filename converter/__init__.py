@@ -1,7 +1,45 @@
-from .convert import build_fivem_resource
-from .multi_convert import build_combined_fivem_resource
+import importlib
 
-__all__ = [
-    "build_fivem_resource",
-    "build_combined_fivem_resource"
-]
\ No newline at end of file
+# Exports are imported on first use, so `import converter.events` (or the GUI
+# starting up) doesn't pull in every build path and its dependencies.
+_EXPORTS = {
+    "build_fivem_resource": ".convert",
+    "build_combined_fivem_resource": ".multi_convert",
+    "build_sharded_fivem_resources": ".sharding",
+    "plan_shards": ".sharding",
+    "FolderInventory": ".inventory",
+    "scan_folder": ".inventory",
+    "ArchiveInventory": ".archive_input",
+    "is_archive": ".archive_input",
+    "scan_source": ".archive_input",
+    "StreamConflictError": ".dedup",
+    "AssetBudgetError": ".asset_budget",
+    "AssetLimits": ".asset_budget",
+    "check_asset_budget": ".asset_budget",
+    "downscale_textures": ".texture_downscale",
+    "downscale_ytd": ".texture_downscale",
+    "deploy_resource": ".deploy",
+    "scan_library": ".library",
+    "VehicleSummary": ".library",
+    "MetaCache": ".meta_cache",
+    "extract_vehicle_metadata": ".meta_cache",
+    "CancelToken": ".events",
+    "ConversionCancelled": ".events",
+    "ConversionEvent": ".events",
+    "iter_conversion_events": ".events",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
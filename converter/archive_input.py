@@ -0,0 +1,180 @@
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from functools import partial
+
+from .inventory import InventoryEntry, FolderInventory, classify_file, scan_folder
+from .tracing import span
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# gzip, bzip2 and xz, the compressions tarfile's "r:*" mode detects.
+COMPRESSED_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+
+
+def is_archive(path):
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+class ArchiveEntry(InventoryEntry):
+    __slots__ = ("archive", "member", "index")
+
+    def __init__(self, archive, member, index, name, rel_path, size, mtime, kind):
+        super().__init__(name, f"{archive.root}!/{rel_path}", rel_path, size, mtime, kind)
+        self.archive = archive
+        self.member = member
+        self.index = index
+
+    def open(self):
+        return self.archive.open_member(self.member)
+
+    @property
+    def is_local_file(self):
+        return False
+
+
+class _LockedReader:
+    def __init__(self, lock, fileobj):
+        self._lock = lock
+        self._fileobj = fileobj
+
+    def read(self, size=-1):
+        return self._fileobj.read(size)
+
+    def close(self):
+        try:
+            self._fileobj.close()
+        finally:
+            self._lock.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ArchiveInventory(FolderInventory):
+    def __init__(self, root, entries, fmt, compressed=False):
+        super().__init__(root, entries)
+        self.format = fmt
+        self.compressed = compressed
+        self._local = threading.local()
+        self._handles = []
+        self._handles_lock = threading.Lock()
+        self._tar_lock = threading.Lock()
+        self._tar = None
+
+    def __getstate__(self):
+        return {"root": self.root, "entries": self.entries, "format": self.format, "compressed": self.compressed}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"], state["entries"], state["format"], state["compressed"])
+
+    @property
+    def sequential(self):
+        # Compressed tar streams can only be read efficiently front to back.
+        return self.format == "tar" and self.compressed
+
+    @classmethod
+    def scan(cls, root):
+        if zipfile.is_zipfile(root):
+            inventory = cls(root, [], "zip")
+            with zipfile.ZipFile(root) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        inventory._add(info, info.filename, info.file_size, _zip_mtime(info))
+            inventory.entries.sort(key=_folder_order)
+            return inventory
+
+        if root.lower().endswith(".zip"):
+            raise zipfile.BadZipFile(f"{root} is not a valid zip file")
+        inventory = cls(root, [], "tar", _is_compressed(root))
+        with tarfile.open(root, "r:*") as archive:
+            for info in archive:
+                if info.isfile():
+                    inventory._add(info, info.name, info.size, float(info.mtime))
+        inventory.entries.sort(key=_folder_order)
+        return inventory
+
+    def _add(self, member, name, size, mtime):
+        rel_path = name.replace("\\", "/").lstrip("/")
+        base = rel_path.rsplit("/", 1)[-1]
+        self.entries.append(ArchiveEntry(
+            self, member, len(self.entries), base, rel_path, size, mtime, classify_file(base)
+        ))
+
+    def open_member(self, member):
+        if self.format == "zip":
+            return self._thread_handle(zipfile.ZipFile).open(member)
+        if not self.compressed:
+            # Members of a plain tarball are read straight from their offset.
+            return self._thread_handle(partial(tarfile.open, mode="r:")).extractfile(member)
+
+        self._tar_lock.acquire()
+        try:
+            if self._tar is None:
+                self._tar = tarfile.open(self.root, "r:*")
+                with self._handles_lock:
+                    self._handles.append(self._tar)
+            return _LockedReader(self._tar_lock, self._tar.extractfile(member))
+        except BaseException:
+            self._tar_lock.release()
+            raise
+
+    def _thread_handle(self, opener):
+        archive = getattr(self._local, "archive", None)
+        if archive is None:
+            # One handle per thread so members can be read in parallel.
+            archive = self._local.archive = opener(self.root)
+            with self._handles_lock:
+                self._handles.append(archive)
+        return archive
+
+    def close(self):
+        with self._handles_lock:
+            handles, self._handles = self._handles, []
+        for handle in handles:
+            handle.close()
+        self._local = threading.local()
+        self._tar = None
+
+
+def _is_compressed(path):
+    with open(path, "rb") as f:
+        return f.read(6).startswith(COMPRESSED_MAGIC)
+
+
+def _folder_order(entry):
+    # Match FolderInventory.scan: files before subfolders, each sorted by name.
+    *folders, name = entry.rel_path.split("/")
+    return tuple((1, folder) for folder in folders) + ((0, name),)
+
+
+def _zip_mtime(info):
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+def in_archive_order(copies):
+    # Reading a compressed tarball out of order means decompressing it again from the start.
+    return dict(sorted(copies.items(), key=lambda item: getattr(item[1], "index", -1)))
+
+
+def source_name(path):
+    name = os.path.basename(os.path.normpath(path))
+    lower = name.lower()
+    for ext in ARCHIVE_EXTENSIONS:
+        if lower.endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def scan_source(path):
+    if is_archive(path):
+        with span("scan_archive", path=path) as scan_span:
+            inventory = ArchiveInventory.scan(path)
+            scan_span.set(files=len(inventory.entries))
+        return inventory
+    return scan_folder(path)
@@ -0,0 +1,157 @@
+import struct
+from collections import namedtuple
+
+from .archive_input import source_name
+from .events import check_cancelled, warn
+from .tracing import traced
+from .zip_output import RSC7_MAGIC
+
+RSC7_HEADER = struct.Struct("<4sIII")
+# FiveM starts warning about oversized assets at 16 MiB; past that, textures
+# drop out and models pop in on lower-end clients.
+DEFAULT_ASSET_LIMIT = 16 * 1024 * 1024
+
+AssetInfo = namedtuple("AssetInfo", ["vehicle", "name", "path", "size", "version", "virtual", "physical"])
+
+
+class AssetBudgetError(Exception):
+    def __init__(self, problems):
+        self.problems = problems
+        more = f" and {len(problems) - 5} more" if len(problems) > 5 else ""
+        super().__init__(f"Over the streaming budget: {'; '.join(problems[:5])}{more}")
+
+
+class AssetLimits:
+    def __init__(self, asset=DEFAULT_ASSET_LIMIT, vehicle=None, pack=None, fail=False):
+        self.asset = asset
+        self.vehicle = vehicle
+        self.pack = pack
+        self.fail = fail
+
+
+def rsc7_page_size(flags):
+    # The flags count pages of each size class; the low nibble is the base page shift.
+    pages = (
+        ((flags >> 27) & 0x1)
+        + (((flags >> 26) & 0x1) << 1)
+        + (((flags >> 25) & 0x1) << 2)
+        + (((flags >> 24) & 0x1) << 3)
+        + (((flags >> 17) & 0x7F) << 4)
+        + (((flags >> 11) & 0x3F) << 5)
+        + (((flags >> 7) & 0xF) << 6)
+        + (((flags >> 5) & 0x3) << 7)
+        + (((flags >> 4) & 0x1) << 8)
+    )
+    return (0x200 << (flags & 0xF)) * pages
+
+
+def parse_rsc7_header(head):
+    if len(head) < RSC7_HEADER.size or not head.startswith(RSC7_MAGIC):
+        return None
+    _, version, system_flags, graphics_flags = RSC7_HEADER.unpack_from(head)
+    return version, rsc7_page_size(system_flags), rsc7_page_size(graphics_flags)
+
+
+def read_asset_info(entry, vehicle):
+    with entry.open() as f:
+        head = f.read(RSC7_HEADER.size)
+    parsed = parse_rsc7_header(head)
+    if parsed is None:
+        # Not a compiled resource: all we know is its size on disk.
+        return AssetInfo(vehicle, entry.name, entry.path, entry.size, None, entry.size, 0)
+    version, virtual, physical = parsed
+    return AssetInfo(vehicle, entry.name, entry.path, entry.size, version, virtual, physical)
+
+
+def asset_memory(asset):
+    return asset.virtual + asset.physical
+
+
+def vehicle_totals(assets):
+    totals = {}
+    for asset in assets:
+        total = totals.setdefault(asset.vehicle, {"assets": 0, "virtual": 0, "physical": 0, "largest": None})
+        total["assets"] += 1
+        total["virtual"] += asset.virtual
+        total["physical"] += asset.physical
+        if total["largest"] is None or asset_memory(asset) > asset_memory(total["largest"]):
+            total["largest"] = asset
+    return totals
+
+
+def _mib(size):
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def budget_problems(assets, limits, pack_assets=None):
+    problems = []
+    if limits.asset:
+        for asset in assets:
+            if asset.physical > limits.asset:
+                problems.append(f"{asset.name} ({asset.vehicle}) uses {_mib(asset.physical)} of graphics memory")
+            elif asset.virtual > limits.asset:
+                problems.append(f"{asset.name} ({asset.vehicle}) uses {_mib(asset.virtual)} of system memory")
+    if limits.vehicle:
+        for vehicle, total in vehicle_totals(assets).items():
+            memory = total["virtual"] + total["physical"]
+            if memory > limits.vehicle:
+                problems.append(f"{vehicle} streams {_mib(memory)} in total")
+    if limits.pack and pack_assets is not None:
+        memory = sum(asset_memory(asset) for asset in pack_assets)
+        if memory > limits.pack:
+            problems.append(f"the pack streams {_mib(memory)} in total")
+    return problems
+
+
+@traced("asset_budget")
+def check_asset_budget(inventories, limits=None, report=None, on_event=None, cancel_token=None,
+                       pack_paths=None, estimate=None):
+    assets = []
+    for inventory in inventories:
+        check_cancelled(cancel_token)
+        vehicle = source_name(inventory.root)
+        # Compressed tarballs are cheapest to read front to back.
+        entries = sorted(inventory.of_kind("stream"), key=lambda entry: getattr(entry, "index", -1))
+        for entry in entries:
+            try:
+                asset = read_asset_info(entry, vehicle)
+                # What the asset will need once written, e.g. after downscaling.
+                assets.append(asset if estimate is None else estimate(entry, asset))
+            except OSError as e:
+                warn(on_event, f"Could not read {entry.name}: {e}", entry.path)
+    if report is not None:
+        report.extend(assets)
+    if limits is None:
+        return assets
+
+    # Files skipped as duplicates don't count twice towards the pack.
+    pack_assets = assets if pack_paths is None else [a for a in assets if a.path in pack_paths]
+    problems = budget_problems(assets, limits, pack_assets)
+    if problems and limits.fail:
+        raise AssetBudgetError(problems)
+    for problem in problems:
+        warn(on_event, f"\u26a0\ufe0f Over the streaming budget: {problem}")
+    return assets
+
+
+def format_asset_report(assets, top=5):
+    totals = vehicle_totals(assets)
+    lines = [f"{'vehicle':<24} {'assets':>6} {'system':>11} {'graphics':>11}  largest"]
+    for vehicle, total in sorted(totals.items(), key=lambda item: -(item[1]["virtual"] + item[1]["physical"])):
+        largest = total["largest"]
+        lines.append(
+            f"{vehicle:<24} {total['assets']:>6} {_mib(total['virtual']):>11} {_mib(total['physical']):>11}  "
+            f"{largest.name} ({_mib(asset_memory(largest))})"
+        )
+    lines.append(
+        f"{'total':<24} {len(assets):>6} {_mib(sum(a.virtual for a in assets)):>11} "
+        f"{_mib(sum(a.physical for a in assets)):>11}"
+    )
+    heaviest = sorted(assets, key=asset_memory, reverse=True)[:top]
+    if heaviest:
+        lines.append("Heaviest assets:")
+        lines.extend(
+            f"  {asset.name:<32} {_mib(asset.virtual):>11} {_mib(asset.physical):>11}  ({asset.vehicle})"
+            for asset in heaviest
+        )
+    return "\n".join(lines)
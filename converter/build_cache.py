@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .fast_copy import copy_file
+from .hashing import hash_entry
+
+CACHE_FILE = ".packer_cache.json"
+JOURNAL_FILE = ".packer_journal.jsonl"
+CACHE_VERSION = 1
+STAGING_SUFFIX = ".partial"
+
+
+def _source_key(entry):
+    return [entry.path, entry.size, entry.mtime]
+
+
+class BuildCache:
+    def __init__(self, output_path, enabled=True, incremental=True):
+        self.output_path = output_path
+        self.path = os.path.join(output_path, CACHE_FILE)
+        self.journal_path = os.path.join(output_path, JOURNAL_FILE)
+        self.enabled = enabled
+        self.files = {}
+        self.metas = {}
+        # Files finished by an interrupted run, recovered from the journal.
+        self.resumed = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        if enabled:
+            # A full rebuild ignores the last build's records but still resumes its own interrupted run.
+            if incremental:
+                self._load()
+            self._replay()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.metas = data.get("metas", {})
+
+    def _replay(self):
+        # Each finished file is journaled as soon as it's written, so a build that
+        # died halfway picks up where it stopped instead of copying everything again.
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # The write that was cut off by the crash.
+                break
+            if "file" in item:
+                self.files[item["file"]] = item["record"]
+                self.resumed += 1
+            elif "meta" in item:
+                self.metas[item["meta"]] = item["record"]
+
+    def _append(self, item):
+        # Callers hold the lock.
+        if self._journal is None:
+            os.makedirs(self.output_path, exist_ok=True)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps(item) + "\n")
+        self._journal.flush()
+
+    def plan(self, targets):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._append({"plan": sorted(self._rel(t) for t in targets)})
+
+    def save(self):
+        if not self.enabled:
+            return
+        os.makedirs(self.output_path, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_VERSION, "files": self.files, "metas": self.metas}, f)
+            os.replace(tmp_path, self.path)
+            # Everything the journal holds is in the cache file now.
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _rel(self, target):
+        return os.path.relpath(target, self.output_path).replace(os.sep, "/")
+
+    def _output_unchanged(self, record, target):
+        try:
+            st = os.stat(target)
+        except OSError:
+            return False
+        size = record.get("output_size", record["size"])
+        return st.st_size == size and st.st_mtime == record["output_mtime"]
+
+    def is_fresh(self, entry, target, transform=None):
+        if not self.enabled:
+            return False
+        record = self.files.get(self._rel(target))
+        if not record or record["src"] != entry.path or record["size"] != entry.size:
+            return False
+        # Outputs rewritten on the way (downscaled textures) only match the same rewrite.
+        if record.get("transform") != transform:
+            return False
+        if not self._output_unchanged(record, target):
+            return False
+        if record["mtime"] == entry.mtime:
+            return True
+        # Touched but maybe not edited: compare contents before recopying.
+        if record.get("hash") and hash_entry(entry) == record["hash"]:
+            record["mtime"] = entry.mtime
+            return True
+        return False
+
+    def output_digest(self, target):
+        # What the output's contents hash to, as far as the cache knows.
+        record = self.files.get(self._rel(target))
+        if not record:
+            return None
+        return record.get("output_hash") if "transform" in record else record.get("hash")
+
+    def record(self, entry, target, digest=None, transform=None, output_digest=None):
+        if not self.enabled:
+            return
+        st = os.stat(target)
+        record = {
+            "src": entry.path,
+            "size": entry.size,
+            "mtime": entry.mtime,
+            "hash": digest,
+            "output_mtime": st.st_mtime,
+        }
+        if transform is not None:
+            record["transform"] = transform
+            record["output_size"] = st.st_size
+            if output_digest is not None:
+                record["output_hash"] = output_digest
+        rel = self._rel(target)
+        with self._lock:
+            self.files[rel] = record
+            self._append({"file": rel, "record": record})
+
+    def meta_is_fresh(self, meta_name, target, entries, transform=None):
+        if not self.enabled:
+            return False
+        record = self.metas.get(meta_name)
+        if not record or record["sources"] != [_source_key(e) for e in entries]:
+            return False
+        if record.get("transform") != transform:
+            return False
+        return self._output_unchanged(record, target)
+
+    def meta_collisions(self, meta_name):
+        return self.metas.get(meta_name, {}).get("collisions", [])
+
+    def record_meta(self, meta_name, target, entries, transform=None, collisions=None):
+        if not self.enabled:
+            return
+        st = os.stat(target)
+        record = {
+            "sources": [_source_key(e) for e in entries],
+            "size": st.st_size,
+            "output_mtime": st.st_mtime,
+        }
+        if transform is not None:
+            record["transform"] = transform
+        if collisions:
+            # A fresh meta isn't merged again, so its collisions are reported from here.
+            record["collisions"] = collisions
+        with self._lock:
+            self.metas[meta_name] = record
+            self._append({"meta": meta_name, "record": record})
+
+    def remove_stale(self, targets, meta_names=None):
+        if not self.enabled:
+            return []
+        keep = {self._rel(t) for t in targets}
+        removed = []
+        for rel in list(self.files):
+            if rel not in keep:
+                self._delete_output(rel)
+                del self.files[rel]
+                removed.append(rel)
+        if meta_names is not None:
+            for meta_name in list(self.metas):
+                if meta_name not in meta_names:
+                    rel = f"data/{meta_name}"
+                    self._delete_output(rel)
+                    del self.metas[meta_name]
+                    removed.append(rel)
+        return removed
+
+    def _delete_output(self, rel):
+        try:
+            os.remove(os.path.join(self.output_path, rel))
+        except FileNotFoundError:
+            pass
+
+
+def _seed_file(src, dst):
+    # Hard links are safe here: every build step unlinks or replaces a file before
+    # writing it, so the published resource never changes through them.
+    if copy_file(src, dst, "link") != "hardlink":
+        st = os.stat(src)
+        # The rebuild cache recognises unchanged outputs by their mtime.
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _seed_staging(output_path, staging, workers=None):
+    pairs = []
+    for dirpath, _, filenames in os.walk(output_path):
+        target_dir = os.path.join(staging, os.path.relpath(dirpath, output_path))
+        os.makedirs(target_dir, exist_ok=True)
+        pairs.extend(
+            (os.path.join(dirpath, name), os.path.join(target_dir, name)) for name in filenames
+            # The journal is appended to and leftover temp files are opened for writing.
+            if name != JOURNAL_FILE and not name.endswith(".tmp")
+        )
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_COPY_WORKERS) as pool:
+        for _ in pool.map(lambda pair: _seed_file(*pair), pairs):
+            pass
+
+
+def begin_output(output_path, seed=True, workers=None):
+    # Folder builds go into NAME.partial and only become NAME once they finish,
+    # so a build that dies halfway never leaves a resource that looks complete.
+    staging = output_path + STAGING_SUFFIX
+    if seed and not os.path.isdir(staging) and os.path.isdir(output_path):
+        # The previous build, with its cache, is the starting point; it stays published until this one finishes.
+        _seed_staging(output_path, staging, workers)
+    os.makedirs(staging, exist_ok=True)
+    return staging
+
+
+def publish_output(staging, output_path):
+    if not os.path.exists(output_path):
+        os.replace(staging, output_path)
+        return
+    old = output_path + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    os.replace(output_path, old)
+    os.replace(staging, output_path)
+    shutil.rmtree(old, ignore_errors=True)
@@ -1,104 +1,114 @@
 import os
-import re
 
-MODEL_NAME_REGEX = re.compile(r"<modelName>\s*(.*?)\s*</modelName>", re.IGNORECASE)
-AUDIO_NAME_REGEX = re.compile(r"<audioNameHash>\s*(.*?)\s*</audioNameHash>", re.IGNORECASE)
+from .archive_input import scan_source
+from .meta_cache import read_entry_metadata
+from .meta_merge import iter_merged_meta
+from .tracing import traced
 
-def parse_model_names_from_file(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    return MODEL_NAME_REGEX.findall(content)
 
-
-def parse_model_names_from_content(content):
-    return MODEL_NAME_REGEX.findall(content)
-
-
-def extract_audio_name_from_file(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    match = AUDIO_NAME_REGEX.search(content)
-    return match.group(1).strip().lower() if match else None
+def write_text_if_changed(path, text):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    # Replaced rather than rewritten, so nothing hard-linked to the old file changes with it.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+@traced()
+def find_model_name(folder, inventory=None, meta_cache=None):
+    if inventory is None:
+        inventory = scan_source(folder)
+    vehicles_meta = inventory.find("vehicles.meta")
+    if vehicles_meta is None:
+        return None
+    try:
+        names = read_entry_metadata(vehicles_meta, meta_cache)["model_names"]
+    except Exception as e:
+        print(f"Error reading or parsing vehicles.meta: {e}")
+        return None
+    return names[0] if names else None
+
+
+@traced()
+def get_fallback_model_name(folder, inventory=None):
+    if inventory is None:
+        inventory = scan_source(folder)
+    for entry in inventory.entries:
+        if entry.name.endswith(".yft") and "_hi" not in entry.name.lower():
+            return os.path.splitext(entry.name)[0]
+    return "unknown_model"
 
 
-def get_fallback_model_name(folder):
-    for root, _, files in os.walk(folder):
-        for file in files:
-            if file.endswith(".yft") and "_hi" not in file.lower():
-                return os.path.splitext(file)[0]
-    return "unknown_model"
+@traced()
+def render_vehicle_names_lua(model_names):
+    return "".join(f"AddTextEntry('{name}', '{name}')\n" for name in sorted(model_names))
 
 
+@traced()
 def generate_vehicle_names_lua(output_folder, model_names):
     lua_path = os.path.join(output_folder, "vehicle_names.lua")
-    with open(lua_path, "w", encoding="utf-8") as f:
-        for name in sorted(model_names):
-            f.write(f"AddTextEntry('{name}', '{name}')\n")
+    write_text_if_changed(lua_path, render_vehicle_names_lua(model_names))
 
 
-def write_fxmanifest(output_path, meta_files):
+@traced()
+def write_fxmanifest(output_path, meta_files, audio_files=None, sfx_name=None):
     fxmanifest_path = os.path.join(output_path, "fxmanifest.lua")
-    audio_path = os.path.join(output_path, "audioconfig")
-
-    with open(fxmanifest_path, "w", encoding="utf-8") as f:
-        f.write("fx_version 'cerulean'\ngame 'gta5'\n\nfiles {\n")
-        for meta in meta_files:
-            f.write(f"    'data/{meta}',\n")
-        f.write("    'audioconfig/*.rel',\n")
-        f.write("    'sfx/**/*.awc'\n")
-        f.write("}\n\n")
-
-        for meta in meta_files:
-            if meta == "vehicles.meta":
-                f.write("data_file 'VEHICLE_METADATA_FILE' 'data/vehicles.meta'\n")
-            elif meta == "handling.meta":
-                f.write("data_file 'HANDLING_FILE' 'data/handling.meta'\n")
-            elif meta == "carvariations.meta":
-                f.write("data_file 'VEHICLE_VARIATION_FILE' 'data/carvariations.meta'\n")
-            elif meta == "carcols.meta":
-                f.write("data_file 'CARCOLS_FILE' 'data/carcols.meta'\n")
-            elif meta == "dlctext.meta":
-                f.write("data_file 'DLCTEXT_FILE' 'data/dlctext.meta'\n")
-
-        if os.path.exists(audio_path):
-            for name in os.listdir(audio_path):
-                if name.endswith(".dat151.rel"):
-                    f.write(f"data_file 'AUDIO_GAMEDATA' 'audioconfig/{name}'\n")
-                elif name.endswith(".dat54.rel"):
-                    f.write(f"data_file 'AUDIO_SOUNDDATA' 'audioconfig/{name}'\n")
-                elif name.endswith(".dat10.rel"):
-                    f.write(f"data_file 'AUDIO_SYNTHDATA' 'audioconfig/{name}'\n")
-
-        model = "unknown"
+
+    if audio_files is None:
+        audio_path = os.path.join(output_path, "audioconfig")
+        audio_files = os.listdir(audio_path) if os.path.exists(audio_path) else []
+    if sfx_name is None:
         sfx_root = os.path.join(output_path, "sfx")
         if os.path.exists(sfx_root):
             for name in os.listdir(sfx_root):
                 if name.startswith("dlc_"):
-                    model = name[4:]
+                    sfx_name = name[4:]
                     break
-        f.write(f"data_file 'AUDIO_WAVEPACK' 'sfx/dlc_{model}'\n")
-        f.write("\nclient_script 'vehicle_names.lua'\n")
-
 
+    write_text_if_changed(fxmanifest_path, render_fxmanifest(meta_files, audio_files, sfx_name))
+
+
+@traced()
+def render_fxmanifest(meta_files, audio_files, sfx_name=None):
+    lines = ["fx_version 'cerulean'\ngame 'gta5'\n\nfiles {\n"]
+    for meta in meta_files:
+        lines.append(f"    'data/{meta}',\n")
+    lines.append("    'audioconfig/*.rel',\n")
+    lines.append("    'sfx/**/*.awc'\n")
+    lines.append("}\n\n")
+
+    for meta in meta_files:
+        if meta == "vehicles.meta":
+            lines.append("data_file 'VEHICLE_METADATA_FILE' 'data/vehicles.meta'\n")
+        elif meta == "handling.meta":
+            lines.append("data_file 'HANDLING_FILE' 'data/handling.meta'\n")
+        elif meta == "carvariations.meta":
+            lines.append("data_file 'VEHICLE_VARIATION_FILE' 'data/carvariations.meta'\n")
+        elif meta == "carcols.meta":
+            lines.append("data_file 'CARCOLS_FILE' 'data/carcols.meta'\n")
+        elif meta == "dlctext.meta":
+            lines.append("data_file 'DLCTEXT_FILE' 'data/dlctext.meta'\n")
+
+    for name in audio_files:
+        if name.endswith(".dat151.rel"):
+            lines.append(f"data_file 'AUDIO_GAMEDATA' 'audioconfig/{name}'\n")
+        elif name.endswith(".dat54.rel"):
+            lines.append(f"data_file 'AUDIO_SOUNDDATA' 'audioconfig/{name}'\n")
+        elif name.endswith(".dat10.rel"):
+            lines.append(f"data_file 'AUDIO_SYNTHDATA' 'audioconfig/{name}'\n")
+
+    lines.append(f"data_file 'AUDIO_WAVEPACK' 'sfx/dlc_{sfx_name or 'unknown'}'\n")
+    lines.append("\nclient_script 'vehicle_names.lua'\n")
+    return "".join(lines)
+
+
+@traced()
 def merge_meta_files(meta_type, file_paths):
-    tags = {
-        "vehicles.meta": ("<CVehicleModelInfo__InitDataList>", "</CVehicleModelInfo__InitDataList>"),
-        "handling.meta": ("<CHandlingDataMgr>", "</CHandlingDataMgr>"),
-        "carvariations.meta": ("<CVehicleModelInfoVariation>", "</CVehicleModelInfoVariation>"),
-        "carcols.meta": ("<CVehicleModelInfoVarGlobal>", "</CVehicleModelInfoVarGlobal>"),
-        "dlctext.meta": ("<CExtraTextMetaFile>", "</CExtraTextMetaFile>"),
-        "vehiclelayouts.meta": ("<CVehicleMetadataMgr>", "</CVehicleMetadataMgr>")
-    }[meta_type]
-
-    open_tag, close_tag = tags
-    content_list = [open_tag]
-
-    for path in file_paths:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        inner = re.findall(f"<{open_tag.strip('<>')}[^>]*?>(.*?)</{close_tag.strip('</>')}>", content, re.DOTALL | re.IGNORECASE)
-        if inner:
-            content_list.append(inner[0].strip())
-
-    content_list.append(close_tag)
-    return '\n'.join(content_list)
\ No newline at end of file
+    return "".join(iter_merged_meta(meta_type, file_paths))
\ No newline at end of file
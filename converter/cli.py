@@ -0,0 +1,602 @@
+import argparse
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .c_utils import find_model_name
+from .convert import build_fivem_resource
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .dedup import CONFLICT_POLICIES, DEFAULT_CONFLICT_POLICY, StreamConflictError
+from .deploy import deploy_resource
+from .events import iter_conversion_events
+from .fast_copy import COPY_MODES
+from .integrity import MANIFEST_FILE, find_resources, verify_resources
+from .archive_input import is_archive, scan_source, source_name
+from .asset_budget import AssetLimits, format_asset_report
+from .texture_downscale import format_texture_report
+from .meta_cache import DEFAULT_CACHE_PATH, open_meta_cache
+from .multi_convert import build_combined_fivem_resource
+from .sharding import build_sharded_fivem_resources, parse_size
+from .tracing import start_tracing, stop_tracing
+from .watch import SourceWatcher
+
+
+def scan_vehicle(full_path):
+    if not (os.path.isdir(full_path) or is_archive(full_path)):
+        return None
+    try:
+        inventory = scan_source(full_path)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        print(f"Skipping unreadable archive {full_path}: {e}", file=sys.stderr)
+        return None
+    return inventory if inventory.is_vehicle() else None
+
+
+def discover_vehicle_folders(root):
+    inventories = []
+    for name in sorted(os.listdir(root)):
+        inventory = scan_vehicle(os.path.join(root, name))
+        if inventory is not None:
+            inventories.append(inventory)
+    return inventories
+
+
+def plan_jobs(inventories, output_dir, meta_cache=None):
+    jobs = []
+    used = set()
+    for inventory in inventories:
+        folder = inventory.root
+        name = find_model_name(folder, inventory, meta_cache) or source_name(folder)
+        if name.lower() in used:
+            name = f"{name}_{source_name(folder)}"
+        used.add(name.lower())
+        jobs.append((inventory, os.path.join(output_dir, name)))
+    return jobs
+
+
+def format_rate(byte_count, seconds):
+    return f"{byte_count / max(seconds, 0.001) / (1024 * 1024):.1f} MB/s"
+
+
+def format_methods(copy_report):
+    methods = Counter(r.method for r in copy_report)
+    return ", ".join(f"{m}: {n}" for m, n in sorted(methods.items()))
+
+
+class JobStats:
+    def __init__(self):
+        self.warnings = []
+        self.bytes_copied = 0
+
+    def on_event(self, event):
+        if event.kind == "warning":
+            self.warnings.append(event.message)
+        elif event.kind == "bytes_copied":
+            self.bytes_copied = event.bytes_done
+
+
+def run_job(inventory, output_folder, options, meta_cache_path=None, trace=False):
+    tracer = start_tracing() if trace else None
+    started = time.perf_counter()
+    result = {"folder": inventory.root, "output": output_folder}
+    copy_report = []
+    asset_report = []
+    texture_report = []
+    stats = JobStats()
+    meta_cache = open_meta_cache(meta_cache_path) if meta_cache_path else None
+    try:
+        stream_files, meta_files, audio_files = build_fivem_resource(
+            inventory.root, output_folder, inventory=inventory, copy_report=copy_report,
+            asset_report=asset_report, texture_report=texture_report, meta_cache=meta_cache,
+            on_event=stats.on_event, **options
+        )
+        result.update(
+            ok=True,
+            stream_files=len(stream_files),
+            meta_files=len(meta_files),
+            audio_files=len(audio_files),
+            copy_methods=format_methods(copy_report),
+        )
+    except Exception as e:
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        if meta_cache is not None:
+            meta_cache.close()
+        if tracer is not None:
+            stop_tracing()
+    result["seconds"] = time.perf_counter() - started
+    if tracer is not None:
+        result["trace_events"] = tracer.events
+    result["bytes_copied"] = stats.bytes_copied
+    result["warnings"] = stats.warnings
+    result["assets"] = asset_report
+    result["textures"] = texture_report
+    return result
+
+
+def run_batch(jobs, options, workers=None, meta_cache_path=None, tracer=None):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_job, inventory, output, options, meta_cache_path, tracer is not None)
+            for inventory, output in jobs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if tracer is not None:
+                tracer.extend(result.pop("trace_events", []))
+            print_result(result)
+            results.append(result)
+    return results
+
+
+def run_combined(inventories, output_folder, options, conflict_policy=DEFAULT_CONFLICT_POLICY, meta_cache=None,
+                 digest_cache=None, shard_size=None, jobs=1, asset_report=None, texture_report=None,
+                 dedupe_metas=False, remap_kit_ids=False, built=None):
+    started = time.perf_counter()
+    name = os.path.basename(output_folder)
+    copy_report = []
+    conflicts = []
+    stats = JobStats()
+    phase = None
+    build, extra = build_combined_fivem_resource, {}
+    if shard_size:
+        build, extra = build_sharded_fivem_resources, {"shard_size": shard_size, "jobs": jobs}
+    try:
+        for event in iter_conversion_events(
+            build,
+            [inventory.root for inventory in inventories], output_folder,
+            inventories=inventories, copy_report=copy_report, asset_report=asset_report,
+            texture_report=texture_report,
+            conflict_policy=conflict_policy, conflict_report=conflicts,
+            dedupe_metas=dedupe_metas, remap_kit_ids=remap_kit_ids,
+            meta_cache=meta_cache, digest_cache=digest_cache, **extra, **options
+        ):
+            stats.on_event(event)
+            if event.kind == "phase_started" and event.phase != phase:
+                phase = event.phase
+                print(f"  {phase}...")
+            elif event.kind == "warning":
+                print(f"  {event.message}")
+            elif event.kind == "finished":
+                result = event.data
+    except StreamConflictError as e:
+        print(f"[FAIL] {name}: {e}")
+        for conflict in e.conflicts:
+            print_conflict(conflict)
+        return False
+    except Exception as e:
+        print(f"[FAIL] {name}: {type(e).__name__}: {e}")
+        return False
+
+    seconds = time.perf_counter() - started
+    if shard_size:
+        for shard in result:
+            print(
+                f"[ OK ] {shard['name']}: {len(shard['vehicles'])} vehicles, {len(shard['streamed'])} stream, "
+                f"{len(shard['metas'])} meta, {shard['bytes'] / (1024 * 1024):.1f} MB"
+            )
+        print(f"{len(result)} shards in {seconds:.2f}s [{format_methods(copy_report)}], ensure lines in {output_folder}.cfg:")
+        for shard in result:
+            print(f"  ensure {shard['name']}")
+        if built is not None:
+            built.extend(shard["output"] for shard in result)
+    else:
+        streamed, metas = result
+        print(
+            f"[ OK ] {name}: {len(inventories)} vehicles, {len(streamed)} stream, {len(metas)} meta "
+            f"({seconds:.2f}s, {format_rate(stats.bytes_copied, seconds)}) [{format_methods(copy_report)}]"
+        )
+        if built is not None:
+            built.append(output_folder)
+    for conflict in conflicts:
+        print_conflict(conflict)
+    return True
+
+
+def print_conflict(conflict):
+    print(f"  conflict: {conflict['name']} ({conflict['action']})")
+    for variant in conflict["variants"]:
+        print(f"    {variant['digest'][:12]}: {', '.join(variant['folders'])}")
+    for name in conflict.get("renamed", []):
+        print(f"    renamed to {name}")
+
+
+def print_result(result):
+    name = os.path.basename(result["output"])
+    if result["ok"]:
+        print(
+            f"[ OK ] {name}: {result['stream_files']} stream, {result['meta_files']} meta, "
+            f"{result['audio_files']} audio ({result['seconds']:.2f}s, "
+            f"{format_rate(result['bytes_copied'], result['seconds'])}) [{result['copy_methods']}]"
+        )
+        for warning in result["warnings"]:
+            print(f"  {warning}")
+    else:
+        print(f"[FAIL] {name}: {result['error']} ({result['folder']})")
+    sys.stdout.flush()
+
+
+def print_summary(results, elapsed):
+    failed = [r for r in results if not r["ok"]]
+    print()
+    print(f"Converted {len(results) - len(failed)}/{len(results)} vehicles in {elapsed:.2f}s")
+    for result in failed:
+        print(f"  failed: {result['folder']}: {result['error']}")
+
+
+def changed_vehicles(changed, source):
+    # Vehicles are the direct children of the source folder; a change anywhere
+    # below one of them only rebuilds that vehicle.
+    names = set()
+    root = os.path.abspath(source)
+    for path in changed:
+        rel = os.path.relpath(path, root)
+        if rel == ".":
+            # Overflowed or root-level directory events: check every child again.
+            names.update(os.listdir(root))
+        elif not rel.startswith(".."):
+            names.add(rel.split(os.sep)[0])
+    return names
+
+
+def watch(args, inventories, options, meta_cache_path=None):
+    vehicles = {os.path.basename(inv.root): inv for inv in inventories}
+    # Unchanged stream files keep their digests between rebuilds of a combined resource.
+    digest_cache = {}
+
+    with SourceWatcher([args.source], ignore=[args.output]) as watcher:
+        print(f"Watching {args.source} for changes ({watcher.kind}), press Ctrl+C to stop...")
+        try:
+            while True:
+                touched = changed_vehicles(watcher.wait(), args.source)
+                started = time.perf_counter()
+                rebuild = False
+                for name in sorted(touched):
+                    previous = vehicles.pop(name, None)
+                    if previous is not None:
+                        previous.close()
+                    # Rescan through the same path form as the first build so the rebuild cache matches.
+                    inventory = scan_vehicle(os.path.join(args.source, name))
+                    if inventory is not None:
+                        vehicles[name] = inventory
+                    elif previous is not None:
+                        print(f"  {name} is gone, its output was left in place")
+                    rebuild = rebuild or inventory is not None or (args.combined and previous is not None)
+                if not rebuild:
+                    continue
+
+                meta_cache = open_meta_cache(meta_cache_path) if meta_cache_path else None
+                try:
+                    current = [vehicles[name] for name in sorted(vehicles)]
+                    built = []
+                    if args.combined:
+                        run_combined(
+                            current, os.path.join(args.output, args.combined), options,
+                            conflict_policy=args.on_conflict, meta_cache=meta_cache,
+                            digest_cache=digest_cache, shard_size=args.shard_size, jobs=args.jobs,
+                            dedupe_metas=args.dedupe_metas, remap_kit_ids=args.remap_kit_ids, built=built,
+                        )
+                    else:
+                        # Rebuilding in-process avoids the pool's startup cost for the usual one-vehicle change.
+                        for inventory, output_folder in plan_jobs(current, args.output, meta_cache):
+                            if os.path.basename(inventory.root) in touched:
+                                result = run_job(inventory, output_folder, options, meta_cache_path)
+                                print_result(result)
+                                if result["ok"]:
+                                    built.append(output_folder)
+                finally:
+                    if meta_cache is not None:
+                        meta_cache.close()
+                if args.deploy:
+                    deploy(built, args)
+                print(f"Rebuilt in {time.perf_counter() - started:.2f}s")
+        except KeyboardInterrupt:
+            print("Stopped watching")
+    return 0
+
+
+def print_asset_report(assets):
+    print()
+    print("Streaming memory (from RSC7 headers):")
+    print(format_asset_report(assets))
+
+
+def print_texture_report(textures):
+    print()
+    print("Downscaled textures:")
+    print(format_texture_report(textures))
+
+
+def verify(args):
+    roots = find_resources(args.source)
+    if not roots:
+        print(f"No {MANIFEST_FILE} found in {args.source} or its subfolders", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    stats = JobStats()
+    try:
+        results = verify_resources(roots, args.copy_workers, stats.on_event)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for result in results:
+        name = os.path.basename(os.path.normpath(result["root"]))
+        if result["ok"]:
+            print(f"[ OK ] {name}: {result['files']} files")
+            continue
+        print(f"[FAIL] {name}: {len(result['changed'])} changed, {len(result['missing'])} missing, "
+              f"{len(result['extra'])} not in {MANIFEST_FILE}")
+        for label in ("changed", "missing", "extra"):
+            for rel in result[label]:
+                print(f"  {label}: {rel}")
+    seconds = time.perf_counter() - started
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"{len(results) - failed}/{len(results)} resources match ({seconds:.2f}s, "
+          f"{format_rate(stats.bytes_copied, seconds)})")
+    return 1 if failed else 0
+
+
+def deploy(outputs, args):
+    ok = True
+    for output in outputs:
+        name = os.path.basename(os.path.normpath(output))
+        started = time.perf_counter()
+        stats = JobStats()
+        try:
+            report = deploy_resource(
+                output, os.path.join(args.deploy, name), args.copy_workers, args.copy_mode, stats.on_event
+            )
+        except Exception as e:
+            print(f"[FAIL] deploy {name}: {type(e).__name__}: {e}")
+            ok = False
+            continue
+        seconds = time.perf_counter() - started
+        print(f"[DEPLOY] {name}: {len(report['copied'])} copied, {len(report['deleted'])} deleted, "
+              f"{report['unchanged']} unchanged ({seconds:.2f}s, {format_rate(report['bytes'], seconds)})")
+        for warning in stats.warnings:
+            print(f"  {warning}")
+    sys.stdout.flush()
+    return ok
+
+
+def write_trace(tracer, path):
+    if tracer is None:
+        return
+    tracer.write(path)
+    print()
+    print(tracer.summary())
+    print(f"Trace written to {path}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m converter",
+        description="Convert every vehicle folder under a directory into a FiveM resource.",
+    )
+    parser.add_argument("source", help="Directory containing one vehicle mod per subfolder, .zip or .tar archive")
+    parser.add_argument("-o", "--output", help="Directory to write the resources into")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1,
+        help="Number of vehicles converted in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--copy-workers", type=int, default=None,
+        help=f"Copy threads per vehicle (default: {DEFAULT_COPY_WORKERS})",
+    )
+    parser.add_argument(
+        "--copy-mode", choices=COPY_MODES, default="copy",
+        help="How files are placed in the output: 'copy' always copies bytes, 'fast' tries "
+             "reflink/copy_file_range/sendfile first, 'link' also tries hardlinks (default: copy)",
+    )
+    parser.add_argument(
+        "--full-rebuild", action="store_true",
+        help="Ignore the rebuild cache and copy every file again",
+    )
+    parser.add_argument(
+        "--zip", action="store_true",
+        help="Write each resource straight into NAME.zip instead of a folder",
+    )
+    parser.add_argument(
+        "--combined", metavar="NAME",
+        help="Build one combined resource called NAME instead of one resource per vehicle",
+    )
+    parser.add_argument(
+        "--shard-size", metavar="SIZE",
+        help="With --combined, split the vehicles into several resources of at most SIZE "
+             "(for example 500M or 2G); --jobs of them are built at the same time",
+    )
+    parser.add_argument(
+        "--on-conflict", choices=CONFLICT_POLICIES, default=DEFAULT_CONFLICT_POLICY,
+        help="What to do when vehicles ship different stream files with the same name "
+             f"in a combined resource: keep the last or first vehicle's file, rename the others "
+             f"or fail (default: {DEFAULT_CONFLICT_POLICY})",
+    )
+    parser.add_argument(
+        "--dedupe-metas", action="store_true",
+        help="In a combined resource, drop vehicles.meta, handling.meta and carcols.meta entries "
+             "that repeat an identical entry with the same modelName, handlingName or kit ID",
+    )
+    parser.add_argument(
+        "--remap-kit-ids", action="store_true",
+        help="In a combined resource, give modkits that reuse another vehicle's kit ID a free ID",
+    )
+    parser.add_argument(
+        "--max-asset-size", metavar="SIZE", default="16M",
+        help="Warn about stream assets needing more than SIZE of system or graphics memory "
+             "according to their RSC7 header, 0 to turn off (default: 16M)",
+    )
+    parser.add_argument(
+        "--max-vehicle-size", metavar="SIZE",
+        help="Warn about vehicles whose stream assets need more than SIZE of memory in total",
+    )
+    parser.add_argument(
+        "--max-pack-size", metavar="SIZE",
+        help="Warn when a resource's stream assets need more than SIZE of memory in total",
+    )
+    parser.add_argument(
+        "--fail-over-budget", action="store_true",
+        help="Fail the build instead of warning when one of the size limits is exceeded",
+    )
+    parser.add_argument(
+        "--asset-report", action="store_true",
+        help="Print the memory each vehicle's stream assets need and the heaviest assets",
+    )
+    parser.add_argument(
+        "--max-texture-size", metavar="PIXELS", type=int,
+        help="Shrink textures wider or taller than PIXELS by dropping their largest mip levels "
+             "(for example 2048); the source files are left untouched",
+    )
+    parser.add_argument(
+        "--meta-cache", metavar="PATH", default=DEFAULT_CACHE_PATH,
+        help=f"SQLite file caching parsed vehicles.meta data between runs (default: {DEFAULT_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--no-meta-cache", action="store_true",
+        help="Parse every vehicles.meta again instead of using the metadata cache",
+    )
+    parser.add_argument(
+        "--checksums", action="store_true",
+        help=f"Write {MANIFEST_FILE} into each resource, with the size and checksum of every file; "
+             "files are hashed while they are copied",
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help=f"Instead of converting, check that the resources in SOURCE (a resource, or a folder of them) "
+             f"still match their {MANIFEST_FILE}",
+    )
+    parser.add_argument(
+        "--deploy", metavar="DIR",
+        help="After each build, sync the built resources into DIR (e.g. the server's resources folder), "
+             "copying only files that changed and replacing fxmanifest.lua last",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running after the first build and rebuild vehicles whose source files change",
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help="Record how long each phase takes and write it to FILE as a Chrome trace "
+             "(open in chrome://tracing or ui.perfetto.dev)",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        print(f"Source directory not found: {args.source}", file=sys.stderr)
+        return 2
+    if args.verify:
+        return verify(args)
+    if not args.output:
+        print("-o/--output is required", file=sys.stderr)
+        return 2
+    if args.jobs < 1:
+        print("--jobs must be at least 1", file=sys.stderr)
+        return 2
+    if args.copy_workers is not None and args.copy_workers < 1:
+        print("--copy-workers must be at least 1", file=sys.stderr)
+        return 2
+    if args.max_texture_size is not None and args.max_texture_size < 4:
+        print("--max-texture-size must be at least 4", file=sys.stderr)
+        return 2
+    if args.deploy and args.zip:
+        print("--deploy needs folder output, not --zip", file=sys.stderr)
+        return 2
+    if args.deploy and os.path.abspath(args.deploy) == os.path.abspath(args.output):
+        print("--deploy must be a different directory from --output", file=sys.stderr)
+        return 2
+    if args.shard_size is not None and not args.combined:
+        print("--shard-size needs --combined", file=sys.stderr)
+        return 2
+    try:
+        for option in ("shard_size", "max_asset_size", "max_vehicle_size", "max_pack_size"):
+            if getattr(args, option) is not None:
+                setattr(args, option, parse_size(getattr(args, option)))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.shard_size is not None and args.shard_size <= 0:
+        print("--shard-size must be positive", file=sys.stderr)
+        return 2
+
+    if not args.trace:
+        return convert(args)
+    tracer = start_tracing()
+    try:
+        return convert(args, tracer)
+    finally:
+        stop_tracing()
+        write_trace(tracer, args.trace)
+
+
+def convert(args, tracer=None):
+    inventories = discover_vehicle_folders(args.source)
+    if not inventories:
+        print(f"No vehicle folders found in {args.source}", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {
+        "workers": args.copy_workers,
+        "copy_mode": args.copy_mode,
+        "incremental": not args.full_rebuild,
+        "output_format": "zip" if args.zip else "folder",
+        "asset_limits": AssetLimits(
+            asset=args.max_asset_size, vehicle=args.max_vehicle_size,
+            pack=args.max_pack_size, fail=args.fail_over_budget,
+        ),
+        "texture_max_size": args.max_texture_size,
+        # A deploy compares against resource.sha instead of reading every built file again.
+        "checksums": args.checksums or bool(args.deploy),
+    }
+    meta_cache_path = None if args.no_meta_cache else args.meta_cache
+    meta_cache = open_meta_cache(meta_cache_path) if meta_cache_path else None
+
+    try:
+        if args.combined:
+            print(f"Combining {len(inventories)} vehicles into {args.combined}...")
+            assets = []
+            textures = []
+            built = []
+            ok = run_combined(
+                inventories, os.path.join(args.output, args.combined), options,
+                conflict_policy=args.on_conflict, meta_cache=meta_cache,
+                shard_size=args.shard_size, jobs=args.jobs, asset_report=assets, texture_report=textures,
+                dedupe_metas=args.dedupe_metas, remap_kit_ids=args.remap_kit_ids, built=built,
+            )
+        else:
+            jobs = plan_jobs(inventories, args.output, meta_cache)
+    finally:
+        if meta_cache is not None:
+            meta_cache.close()
+
+    if not args.combined:
+        print(f"Converting {len(jobs)} vehicles with {args.jobs} workers...")
+        started = time.perf_counter()
+        results = run_batch(jobs, options, workers=args.jobs, meta_cache_path=meta_cache_path, tracer=tracer)
+        print_summary(results, time.perf_counter() - started)
+        ok = all(r["ok"] for r in results)
+        built = [r["output"] for r in results if r["ok"]]
+        assets = [asset for result in results for asset in result["assets"]]
+        textures = [texture for result in results for texture in result["textures"]]
+
+    if args.asset_report and assets:
+        print_asset_report(assets)
+    if textures:
+        print_texture_report(textures)
+
+    if args.deploy and built:
+        print()
+        print(f"Deploying {len(built)} resources to {args.deploy}...")
+        ok = deploy(built, args) and ok
+
+    if args.watch:
+        return watch(args, inventories, options, meta_cache_path)
+    return 0 if ok else 1
@@ -1,73 +1,159 @@
 from .c_utils import (
-    parse_model_names_from_file,
     get_fallback_model_name,
     generate_vehicle_names_lua,
-    write_fxmanifest,
-    extract_audio_name_from_file
+    render_fxmanifest,
+    render_vehicle_names_lua,
+    write_fxmanifest
 )
+from .build_cache import BuildCache, begin_output, publish_output
+from .copy_engine import copy_files
+from .integrity import write_manifest
+from .events import check_cancelled, emit, warn
+from .archive_input import in_archive_order, scan_source, source_name
+from .asset_budget import check_asset_budget
+from .meta_cache import read_entry_metadata
+from .texture_downscale import downscale_textures, estimate_downscaled
+from .tracing import traced
+from .zip_output import OUTPUT_FORMATS, ZipPackage, write_files
 import os
-import shutil
+from functools import partial
 
 
-def build_fivem_resource(extracted_path, output_path):
-    stream_path = os.path.join(output_path, "stream")
-    data_path = os.path.join(output_path, "data")
-    audio_path = os.path.join(output_path, "audioconfig")
-    sfx_path = os.path.join(output_path, "sfx")
-    os.makedirs(stream_path, exist_ok=True)
-    os.makedirs(data_path, exist_ok=True)
-    os.makedirs(audio_path, exist_ok=True)
+@traced()
+def build_fivem_resource(extracted_path, output_path, inventory=None, workers=None,
+                         copy_mode="copy", copy_report=None, incremental=True,
+                         meta_cache=None, on_event=None, cancel_token=None, output_format="folder",
+                         asset_limits=None, asset_report=None, texture_max_size=None, texture_report=None,
+                         checksums=False):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    emit(on_event, "scan_started", phase="scan", path=extracted_path)
+    owns_inventory = inventory is None
+    if owns_inventory:
+        inventory = scan_source(extracted_path)
+    package = None
+    cache = None
+    try:
+        if on_event is not None:
+            for entry in inventory.entries:
+                emit(on_event, "file_classified", phase="scan", path=entry.path,
+                     bytes_total=entry.size, message=entry.kind)
+        check_cancelled(cancel_token)
 
-    meta_files = []
-    stream_files = []
-    model_names = set()
-    audio_name = None
-    audio_files = []
+        if asset_limits is not None or asset_report is not None:
+            emit(on_event, "phase_started", phase="budget")
+            estimate = partial(estimate_downscaled, max_size=texture_max_size) if texture_max_size else None
+            check_asset_budget([inventory], asset_limits, asset_report, on_event, cancel_token, estimate=estimate)
 
-    for root, _, files in os.walk(extracted_path):
-        for file in files:
-            full_path = os.path.join(root, file)
-            lower = file.lower()
+        build_path = output_path
+        if output_format == "zip":
+            package = ZipPackage(output_path, checksums)
+        else:
+            build_path = begin_output(output_path, incremental, workers)
+        stream_path = os.path.join(build_path, "stream")
+        data_path = os.path.join(build_path, "data")
+        audio_path = os.path.join(build_path, "audioconfig")
+        sfx_path = os.path.join(build_path, "sfx")
+        if package is None:
+            os.makedirs(stream_path, exist_ok=True)
+            os.makedirs(data_path, exist_ok=True)
+            os.makedirs(audio_path, exist_ok=True)
 
-            if file == "vehicles.meta":
-                try:
-                    model_names.update(parse_model_names_from_file(full_path))
-                    audio_name = extract_audio_name_from_file(full_path)
-                except Exception as e:
-                    print(f"Error parsing model or audio name: {e}")
+        meta_files = []
+        stream_files = []
+        model_names = set()
+        audio_name = None
+        audio_files = []
 
-            if lower.endswith((".yft", ".ytd", ".ydr", ".ymt")):
-                target_file = os.path.join(stream_path, file)
-                if not os.path.exists(target_file):
-                    shutil.copy(full_path, target_file)
-                    stream_files.append(file)
+        emit(on_event, "phase_started", phase="metadata")
+        for entry in inventory.find_all("vehicles.meta"):
+            try:
+                metadata = read_entry_metadata(entry, meta_cache)
+                model_names.update(metadata["model_names"])
+                audio_name = metadata["audio_names"][0].lower() if metadata["audio_names"] else None
+            except Exception as e:
+                warn(on_event, f"Error parsing model or audio name: {e}", entry.path)
 
-            elif file in {
-                "vehicles.meta", "handling.meta", "carvariations.meta",
-                "carcols.meta", "dlctext.meta", "vehiclelayouts.meta"
-            }:
-                shutil.copy(full_path, os.path.join(data_path, file))
-                meta_files.append(file)
+        sfx_name = audio_name if audio_name else (list(model_names)[0] if model_names else "vehicle")
+        config_files = []
+        streamed = set()
 
-            elif lower.endswith(".rel") or "nametable" in lower:
-                shutil.copy(full_path, os.path.join(audio_path, file))
-                audio_files.append(file)
+        # Later duplicates overwrite earlier ones (except stream files, where the
+        # first one wins), so resolve targets up front before copying in parallel.
+        copies = {}
+        for entry in inventory.entries:
+            if entry.kind == "stream":
+                if entry.name not in streamed:
+                    copies[os.path.join(stream_path, entry.name)] = entry
+                    stream_files.append(entry.name)
+                    streamed.add(entry.name)
 
-            elif lower.endswith(".awc"):
-                name = audio_name if audio_name else (list(model_names)[0] if model_names else "vehicle")
-                sfx_target = os.path.join(sfx_path, f"dlc_{name}")
-                os.makedirs(sfx_target, exist_ok=True)
-                shutil.copy(full_path, os.path.join(sfx_target, file))
-                audio_files.append(file)
+            elif entry.kind == "meta":
+                copies[os.path.join(data_path, entry.name)] = entry
+                meta_files.append(entry.name)
 
-    if not model_names:
-        fallback = get_fallback_model_name(extracted_path)
-        print(f"\u26a0\ufe0f Using fallback model name: {fallback}")
-        model_names.add(fallback)
+            elif entry.kind == "audio":
+                copies[os.path.join(audio_path, entry.name)] = entry
+                audio_files.append(entry.name)
+                if entry.name not in config_files:
+                    config_files.append(entry.name)
 
-    if model_names:
-        generate_vehicle_names_lua(output_path, model_names)
+            elif entry.kind == "awc":
+                sfx_target = os.path.join(sfx_path, f"dlc_{sfx_name}")
+                if package is None:
+                    os.makedirs(sfx_target, exist_ok=True)
+                copies[os.path.join(sfx_target, entry.name)] = entry
+                audio_files.append(entry.name)
 
-    write_fxmanifest(output_path, meta_files)
+        if inventory.sequential:
+            # Compressed tarballs are read front to back, one member at a time.
+            copies = in_archive_order(copies)
+            workers = 1
+        digests = {} if checksums and package is None else None
+        if package is None:
+            cache = BuildCache(build_path, incremental=incremental)
+            if cache.resumed:
+                warn(on_event, f"Resuming an interrupted build, {cache.resumed} files were already written")
+            cache.remove_stale(copies)
+            cache.plan(copies)
+        if texture_max_size:
+            vehicle_of = {entry.path: source_name(inventory.root) for entry in copies.values()}
+            copies = downscale_textures(copies, texture_max_size, None, cache, package, texture_report,
+                                        on_event, cancel_token, vehicle_of, digests)
+        if package is not None:
+            write_files(copies, package, copy_report, on_event, cancel_token)
+        else:
+            copy_files(copies, workers, copy_mode, cache, copy_report, on_event, cancel_token, digests)
+            cache.save()
+        check_cancelled(cancel_token)
 
-    return stream_files, meta_files, audio_files
\ No newline at end of file
+        emit(on_event, "phase_started", phase="manifest")
+        if not model_names:
+            fallback = get_fallback_model_name(extracted_path, inventory)
+            warn(on_event, f"\u26a0\ufe0f Using fallback model name: {fallback}")
+            model_names.add(fallback)
+
+        has_sfx = any(entry.kind == "awc" for entry in inventory.entries)
+        manifest_sfx = sfx_name if has_sfx else "unknown"
+        if package is not None:
+            package.write_text(os.path.join(output_path, "vehicle_names.lua"), render_vehicle_names_lua(model_names))
+            package.write_text(os.path.join(output_path, "fxmanifest.lua"),
+                               render_fxmanifest(meta_files, config_files, manifest_sfx))
+            package.close()
+            emit(on_event, "manifest_written", phase="manifest", path=package.path)
+        else:
+            generate_vehicle_names_lua(build_path, model_names)
+            write_fxmanifest(build_path, meta_files, config_files, manifest_sfx)
+            if checksums:
+                write_manifest(build_path, digests, workers)
+            publish_output(build_path, output_path)
+            emit(on_event, "manifest_written", phase="manifest", path=os.path.join(output_path, "fxmanifest.lua"))
+
+        return stream_files, meta_files, audio_files
+    finally:
+        if package is not None:
+            package.discard()
+        if cache is not None:
+            cache.close()
+        if owns_inventory:
+            inventory.close()
@@ -0,0 +1,167 @@
+import os
+import shutil
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .events import check_cancelled, emit
+from .fast_copy import COPY_MODES, copy_file
+from .hashing import CHUNK_SIZE, hash_file, new_digest
+from .tracing import bind_tracer, span, traced
+
+DEFAULT_COPY_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+DEFAULT_MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+CopyResult = namedtuple("CopyResult", ["src", "dst", "method", "digest"])
+
+
+class CopyEngine:
+    def __init__(self, workers=None, max_inflight_bytes=DEFAULT_MAX_INFLIGHT_BYTES, mode="copy",
+                 digest=False, on_done=None, cancel_token=None):
+        if mode not in COPY_MODES:
+            raise ValueError(f"Unknown copy mode: {mode!r} (expected one of {', '.join(COPY_MODES)})")
+        self.workers = workers or DEFAULT_COPY_WORKERS
+        self.mode = mode
+        self.digest = digest
+        self.on_done = on_done
+        self.cancel_token = cancel_token
+        self.method_counts = Counter()
+        self.max_inflight_bytes = max_inflight_bytes
+        self._inflight_bytes = 0
+        self._budget = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="copy")
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+        self._pool.shutdown(wait=True)
+        return False
+
+    def _reserve(self, size):
+        # A file larger than the whole budget is still copied, just on its own.
+        size = min(size, self.max_inflight_bytes)
+        with self._budget:
+            while self._inflight_bytes and self._inflight_bytes + size > self.max_inflight_bytes:
+                self._budget.wait()
+            self._inflight_bytes += size
+        return size
+
+    def _release(self, size):
+        with self._budget:
+            self._inflight_bytes -= size
+            self._budget.notify_all()
+
+    def _copy(self, src, dst, size, reserved):
+        try:
+            check_cancelled(self.cancel_token)
+            with span("copy_file", path=dst, bytes=size) as copy_span:
+                if isinstance(src, str) and self.digest and self.mode == "copy":
+                    # Hashed on the way through, so nothing is read twice.
+                    digest = _stream_copy(lambda: open(src, 'rb'), dst, True)
+                    shutil.copymode(src, dst)
+                    result = CopyResult(src, dst, "copy", digest)
+                elif isinstance(src, str):
+                    method = copy_file(src, dst, self.mode)
+                    # The kernel moved the bytes without us seeing them; the source was just
+                    # read, so hashing it again is served from the page cache.
+                    digest = hash_file(src) if self.digest else None
+                    result = CopyResult(src, dst, method, digest)
+                else:
+                    digest = _stream_copy(src.open, dst, self.digest)
+                    result = CopyResult(src.path, dst, "stream", digest)
+                copy_span.set(method=result.method)
+        finally:
+            self._release(reserved)
+        if self.on_done is not None:
+            self.on_done(result, size)
+        return result
+
+    def submit(self, src, dst, size=None):
+        # src is a file path, or an inventory entry that can only be opened (archive members).
+        if size is None:
+            size = os.path.getsize(src) if isinstance(src, str) else src.size
+        check_cancelled(self.cancel_token)
+        reserved = self._reserve(size)
+        future = self._pool.submit(bind_tracer(self._copy), src, dst, size, reserved)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        results = []
+        error = None
+        for future in self._futures:
+            try:
+                result = future.result()
+                self.method_counts[result.method] += 1
+                results.append(result)
+            except Exception as e:
+                if error is None:
+                    error = e
+        self._futures = []
+        if error is not None:
+            raise error
+        return results
+
+
+def _stream_copy(open_src, dst, digest):
+    hasher = new_digest() if digest else None
+    # Never write through an existing output: it may be a hardlink to a source file.
+    if os.path.lexists(dst):
+        os.remove(dst)
+    with open_src() as fsrc, open(dst, 'wb') as fdst:
+        while chunk := fsrc.read(CHUNK_SIZE):
+            fdst.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+    return hasher.hexdigest() if hasher is not None else None
+
+
+@traced()
+def copy_files(copies, workers=None, mode="copy", cache=None, report=None,
+               on_event=None, cancel_token=None, digests=None):
+    # digests, when given, collects target -> digest of every file for the checksum manifest.
+    pending = {}
+    for target, entry in copies.items():
+        if cache is not None and cache.is_fresh(entry, target):
+            if report is not None:
+                report.append(CopyResult(entry.path, target, "cached", None))
+            if digests is not None:
+                digests[target] = cache.output_digest(target)
+        else:
+            pending[target] = entry
+
+    files_total = len(copies)
+    bytes_total = sum(entry.size for entry in pending.values())
+    counters = {"files": files_total - len(pending), "bytes": 0}
+    lock = threading.Lock()
+
+    def on_done(result, size):
+        if digests is not None:
+            digests[result.dst] = result.digest
+        if cache is not None:
+            # Journaled right away, so an interrupted build keeps the files it finished.
+            cache.record(pending[result.dst], result.dst, result.digest)
+        with lock:
+            counters["files"] += 1
+            counters["bytes"] += size
+            emit(on_event, "bytes_copied", phase="copy", path=result.dst, done=counters["files"],
+                 total=files_total, bytes_done=counters["bytes"], bytes_total=bytes_total,
+                 data=result)
+
+    emit(on_event, "phase_started", phase="copy", done=counters["files"], total=files_total,
+         bytes_total=bytes_total)
+    digest = (cache is not None and cache.enabled) or digests is not None
+    with CopyEngine(workers, mode=mode, digest=digest, on_done=on_done,
+                    cancel_token=cancel_token) as engine:
+        for target, entry in pending.items():
+            engine.submit(entry.path if entry.is_local_file else entry, target, entry.size)
+        results = engine.wait()
+
+    if report is not None:
+        report.extend(results)
+    return results
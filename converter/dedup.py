@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .hashing import hash_entry
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .tracing import traced
+
+CONFLICT_POLICIES = ("fail", "keep_last", "keep_first", "rename")
+# Folder-by-folder copying let the last vehicle's file win, and existing packs rely on that.
+DEFAULT_CONFLICT_POLICY = "keep_last"
+
+
+class StreamConflictError(Exception):
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        names = ", ".join(c["name"] for c in conflicts[:10])
+        more = f" and {len(conflicts) - 10} more" if len(conflicts) > 10 else ""
+        super().__init__(f"{len(conflicts)} stream files differ between vehicles: {names}{more}")
+
+
+def _hash_groups(groups, workers, digest_cache=None):
+    to_hash = []
+    digests = {}
+    for entries in groups.values():
+        # Files of different sizes can't be identical, so a group only needs
+        # hashing when at least two of its files share a size.
+        sizes = [e.size for e in entries]
+        if len(set(sizes)) < len(sizes):
+            for entry in entries:
+                key = (entry.path, entry.size, entry.mtime)
+                if digest_cache is not None and key in digest_cache:
+                    digests[entry.path] = digest_cache[key]
+                else:
+                    to_hash.append(entry)
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_COPY_WORKERS) as pool:
+        for entry, digest in zip(to_hash, pool.map(hash_entry, to_hash)):
+            digests[entry.path] = digest
+            if digest_cache is not None:
+                digest_cache[(entry.path, entry.size, entry.mtime)] = digest
+
+    for entries in groups.values():
+        for entry in entries:
+            if entry.path not in digests:
+                digests[entry.path] = f"size:{entry.size}"
+    return digests
+
+
+def _renamed(name, digest, taken):
+    stem, ext = os.path.splitext(name)
+    candidate = f"{stem}_{digest[:8]}{ext}"
+    counter = 2
+    while candidate.lower() in taken:
+        candidate = f"{stem}_{digest[:8]}_{counter}{ext}"
+        counter += 1
+    return candidate
+
+
+@traced("dedup")
+def resolve_stream_entries(inventories, policy=DEFAULT_CONFLICT_POLICY, workers=None, kinds=("stream", "awc"),
+                           digest_cache=None):
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy: {policy!r} (expected one of {', '.join(CONFLICT_POLICIES)})")
+
+    groups = {}
+    for inventory in inventories:
+        for entry in inventory.of_kind(*kinds):
+            groups.setdefault(entry.name.lower(), []).append((inventory.root, entry))
+
+    multi = {key: [e for _, e in items] for key, items in groups.items() if len(items) > 1}
+    digests = _hash_groups(multi, workers, digest_cache)
+
+    resolved = {}
+    conflicts = []
+    duplicates = 0
+    taken = set(groups)
+    for key, items in groups.items():
+        first_root, first = items[0]
+        kept = items[-1][1] if policy == "keep_last" else first
+        resolved[kept.name] = kept
+        if len(items) == 1:
+            continue
+
+        variants = {}
+        for root, entry in items:
+            variants.setdefault(digests[entry.path], []).append((root, entry))
+        duplicates += len(items) - len(variants)
+        if len(variants) == 1:
+            continue
+
+        conflict = {
+            "name": first.name,
+            "variants": [
+                {"digest": digest, "folders": [root for root, _ in owners]}
+                for digest, owners in variants.items()
+            ],
+            "action": policy,
+        }
+        if policy == "rename":
+            renamed = []
+            for digest, owners in list(variants.items())[1:]:
+                new_name = _renamed(first.name, digest, taken)
+                taken.add(new_name.lower())
+                resolved[new_name] = owners[0][1]
+                renamed.append(new_name)
+            conflict["renamed"] = renamed
+        conflicts.append(conflict)
+
+    if conflicts and policy == "fail":
+        raise StreamConflictError(conflicts)
+    return resolved, conflicts, duplicates
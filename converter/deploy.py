@@ -0,0 +1,176 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .events import check_cancelled, emit, warn
+from .fast_copy import copy_file
+from .hashing import hash_file
+from .integrity import (
+    DEPLOY_STATE_FILE,
+    MANIFEST_FILE,
+    load_manifest,
+    manifest_files,
+    render_manifest,
+    walk_resource,
+)
+from .tracing import traced
+
+DEPLOY_STATE_VERSION = 1
+# The server finds a resource's files through its fxmanifest.lua, so it's replaced
+# only once everything it lists is in place.
+SWAP_LAST = "fxmanifest.lua"
+TEMP_SUFFIX = ".packer-tmp"
+
+
+def _source_files(source, workers=None):
+    # The build's resource.sha, as long as nothing in the resource is newer than it.
+    manifest_path = os.path.join(source, MANIFEST_FILE)
+    present = walk_resource(source)
+    try:
+        listed = load_manifest(source)["files"]
+        written = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        listed = None
+    if listed is not None and set(listed) == set(present):
+        files = {}
+        for rel, item in listed.items():
+            st = os.stat(present[rel])
+            if st.st_size != item["size"] or st.st_mtime_ns > written:
+                break
+            files[rel] = (item["size"], item["digest"])
+        else:
+            return files
+    return manifest_files(source, workers=workers)
+
+
+def _load_state(target):
+    try:
+        with open(os.path.join(target, DEPLOY_STATE_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("version") != DEPLOY_STATE_VERSION:
+        return {}
+    return state.get("files", {})
+
+
+def _write_atomic(path, text):
+    tmp_path = path + TEMP_SUFFIX
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _place(src, dst, copy_mode):
+    # Copied next to the old file and renamed over it, so the server never reads a half-written file.
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = dst + TEMP_SUFFIX
+    try:
+        copy_file(src, tmp_path, copy_mode)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_empty_dirs(path, stop):
+    path = os.path.dirname(path)
+    while os.path.normpath(path) != os.path.normpath(stop):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
+
+
+@traced()
+def deploy_resource(source, target, workers=None, copy_mode="copy", on_event=None, cancel_token=None):
+    # Hard links would let the next build change the live resource in place.
+    if copy_mode == "link":
+        copy_mode = "fast"
+    files = _source_files(source, workers)
+    state = _load_state(target)
+    present = walk_resource(target) if os.path.isdir(target) else {}
+
+    to_copy = []
+    to_compare = []
+    for rel, (size, digest) in files.items():
+        path = present.get(rel)
+        if path is None:
+            to_copy.append(rel)
+            continue
+        st = os.stat(path)
+        record = state.get(rel)
+        if (record and record["digest"] == digest and record["size"] == size == st.st_size
+                and record["mtime_ns"] == st.st_mtime_ns):
+            continue
+        if st.st_size != size:
+            to_copy.append(rel)
+        else:
+            # Edited on the server, or deployed before there was a state file: compare contents.
+            to_compare.append(rel)
+
+    workers = workers or DEFAULT_COPY_WORKERS
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deploy") as pool:
+        futures = {pool.submit(hash_file, present[rel]): rel for rel in to_compare}
+        for future in as_completed(futures):
+            check_cancelled(cancel_token)
+            rel = futures[future]
+            if future.result() != files[rel][1]:
+                to_copy.append(rel)
+
+        to_copy.sort(key=lambda rel: (rel == SWAP_LAST, rel))
+        last = [rel for rel in to_copy if rel == SWAP_LAST]
+        first = [rel for rel in to_copy if rel != SWAP_LAST]
+        bytes_total = sum(files[rel][0] for rel in to_copy)
+        progress = {"files": 0, "bytes": 0}
+        emit(on_event, "phase_started", phase="deploy", path=target, total=len(to_copy), bytes_total=bytes_total)
+        for batch in (first, last):
+            futures = {
+                pool.submit(_place, os.path.join(source, rel), os.path.join(target, rel), copy_mode): rel
+                for rel in batch
+            }
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    check_cancelled(cancel_token)
+                    rel = futures[future]
+                    progress["files"] += 1
+                    progress["bytes"] += files[rel][0]
+                    emit(on_event, "bytes_copied", phase="deploy", path=os.path.join(target, rel),
+                         done=progress["files"], total=len(to_copy), bytes_done=progress["bytes"],
+                         bytes_total=bytes_total)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    # Removed only once the new fxmanifest.lua no longer lists them, and only
+    # files an earlier deploy put there: anything else was added on the server.
+    deleted = sorted(rel for rel in present if rel not in files and rel in state)
+    for rel in deleted:
+        os.remove(present[rel])
+        _remove_empty_dirs(present[rel], target)
+    unknown = sorted(rel for rel in present if rel not in files and rel not in state)
+    if unknown:
+        names = ", ".join(unknown[:5]) + (f" and {len(unknown) - 5} more" if len(unknown) > 5 else "")
+        warn(on_event, f"Left {len(unknown)} files in {target} that the build doesn't have: {names}", target)
+
+    new_state = {}
+    for rel, (size, digest) in files.items():
+        st = os.stat(os.path.join(target, rel))
+        new_state[rel] = {"size": size, "digest": digest, "mtime_ns": st.st_mtime_ns}
+    _write_atomic(os.path.join(target, MANIFEST_FILE), render_manifest(files))
+    _write_atomic(os.path.join(target, DEPLOY_STATE_FILE),
+                  json.dumps({"version": DEPLOY_STATE_VERSION, "files": new_state}))
+
+    return {
+        "source": source,
+        "target": target,
+        "copied": sorted(to_copy),
+        "deleted": deleted,
+        "unchanged": len(files) - len(to_copy),
+        "unknown": unknown,
+        "bytes": sum(files[rel][0] for rel in to_copy),
+    }
@@ -0,0 +1,108 @@
+import contextvars
+import queue
+import threading
+import time
+
+EVENT_KINDS = (
+    "scan_started",
+    "file_classified",
+    "phase_started",
+    "bytes_copied",
+    "meta_merged",
+    "manifest_written",
+    "warning",
+    "error",
+    "finished",
+    "rebuilt",
+    "vehicle_scanned",
+)
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+class CancelToken(threading.Event):
+    def cancel(self):
+        self.set()
+
+    @property
+    def cancelled(self):
+        return self.is_set()
+
+    def raise_if_cancelled(self):
+        check_cancelled(self)
+
+
+class ConversionEvent:
+    __slots__ = ("kind", "phase", "path", "done", "total", "bytes_done", "bytes_total",
+                 "message", "data", "time")
+
+    def __init__(self, kind, phase=None, path=None, done=0, total=0, bytes_done=0,
+                 bytes_total=0, message=None, data=None):
+        self.kind = kind
+        self.phase = phase
+        self.path = path
+        self.done = done
+        self.total = total
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.message = message
+        self.data = data
+        self.time = time.monotonic()
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != "data"}
+
+    def __repr__(self):
+        return f"ConversionEvent({self.kind!r}, phase={self.phase!r}, path={self.path!r})"
+
+
+def check_cancelled(cancel_token):
+    if cancel_token is not None and cancel_token.is_set():
+        raise ConversionCancelled("Conversion cancelled")
+
+
+def emit(on_event, kind, **fields):
+    if on_event is not None:
+        on_event(ConversionEvent(kind, **fields))
+
+
+def warn(on_event, message, path=None):
+    # Without a listener, keep the console output the converter always had.
+    if on_event is None:
+        print(message)
+    else:
+        on_event(ConversionEvent("warning", path=path, message=message))
+
+
+def iter_conversion_events(build, *args, cancel_token=None, **kwargs):
+    if cancel_token is None:
+        cancel_token = CancelToken()
+    events = queue.Queue()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = build(*args, on_event=events.put, cancel_token=cancel_token, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            events.put(None)
+
+    # Run in a copy of the caller's context, so the build records into the caller's tracer.
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(run,), name="conversion", daemon=True)
+    thread.start()
+    try:
+        while (event := events.get()) is not None:
+            yield event
+    finally:
+        # Closing the generator early cancels the build.
+        cancel_token.cancel()
+        thread.join()
+
+    if "error" in outcome:
+        error = outcome["error"]
+        yield ConversionEvent("error", message=str(error), data=error)
+        raise error
+    yield ConversionEvent("finished", data=outcome["result"])
@@ -0,0 +1,101 @@
+import errno
+import os
+import shutil
+import sys
+
+COPY_MODES = ("copy", "fast", "link")
+
+# Linux ioctl that makes dst share src's extents (btrfs, xfs, bcachefs...).
+FICLONE = 0x40049409
+
+# (method, src_dev, dst_dev) pairs that already failed, so we stop retrying them.
+_unsupported = set()
+# Failures that mean the method can't work between these two filesystems at all. Anything
+# else (EMLINK, ENOSPC, ENOENT...) is about this one file and only skips the method for it.
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+}
+
+
+def _try_hardlink(src, dst):
+    os.link(src, dst)
+
+
+def _try_reflink(src, dst):
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _try_copy_file_range(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                raise OSError("copy_file_range made no progress")
+            remaining -= copied
+
+
+def _try_sendfile(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        offset = 0
+        while remaining > 0:
+            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, remaining)
+            if sent == 0:
+                raise OSError("sendfile made no progress")
+            offset += sent
+            remaining -= sent
+
+
+def _strategies(mode):
+    strategies = []
+    if mode == "link":
+        strategies.append(("hardlink", _try_hardlink))
+    if mode in ("fast", "link") and sys.platform.startswith("linux"):
+        strategies.append(("reflink", _try_reflink))
+        if hasattr(os, "copy_file_range"):
+            strategies.append(("copy_file_range", _try_copy_file_range))
+        if hasattr(os, "sendfile"):
+            strategies.append(("sendfile", _try_sendfile))
+    return strategies
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def copy_file(src, dst, mode="copy"):
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown copy mode: {mode!r} (expected one of {', '.join(COPY_MODES)})")
+
+    # Never write through an existing output: it may be a hardlink to a source file.
+    if os.path.lexists(dst):
+        _remove(dst)
+
+    strategies = _strategies(mode)
+    if strategies:
+        src_dev = os.stat(src).st_dev
+        dst_dev = os.stat(os.path.dirname(dst) or ".").st_dev
+        for method, attempt in strategies:
+            key = (method, src_dev, dst_dev)
+            if key in _unsupported:
+                continue
+            try:
+                attempt(src, dst)
+            except OSError as e:
+                if e.errno in UNSUPPORTED_ERRNOS:
+                    _unsupported.add(key)
+                _remove(dst)
+                continue
+            if method != "hardlink":
+                shutil.copymode(src, dst)
+            return method
+
+    shutil.copy(src, dst)
+    return "copy"
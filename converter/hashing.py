@@ -0,0 +1,32 @@
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+# Recorded in checksum manifests, so they can be checked without guessing.
+DIGEST_ALGORITHM = "blake2b-128"
+
+
+def new_digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_bytes(data):
+    digest = new_digest()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_stream(f, chunk_size=CHUNK_SIZE):
+    digest = new_digest()
+    while chunk := f.read(chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        return hash_stream(f, chunk_size)
+
+
+def hash_entry(entry, chunk_size=CHUNK_SIZE):
+    with entry.open() as f:
+        return hash_stream(f, chunk_size)
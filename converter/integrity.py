@@ -0,0 +1,140 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .build_cache import CACHE_FILE, JOURNAL_FILE
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .events import check_cancelled, emit
+from .hashing import DIGEST_ALGORITHM, hash_file
+from .tracing import traced
+
+MANIFEST_FILE = "resource.sha"
+MANIFEST_VERSION = 1
+# What a deploy left in its target, to spot files changed there since.
+DEPLOY_STATE_FILE = ".packer_deploy.json"
+# Build and deploy bookkeeping that sits next to the resource files but isn't part of it.
+UNLISTED_FILES = (MANIFEST_FILE, CACHE_FILE, JOURNAL_FILE, DEPLOY_STATE_FILE)
+
+
+def render_manifest(files):
+    # files: relative path -> (size, digest)
+    return json.dumps({
+        "version": MANIFEST_VERSION,
+        "algorithm": DIGEST_ALGORITHM,
+        "files": {rel: {"size": size, "digest": digest} for rel, (size, digest) in sorted(files.items())},
+    }, indent=1) + "\n"
+
+
+def _walk(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if rel not in UNLISTED_FILES:
+                yield rel, path
+
+
+def walk_resource(root):
+    return dict(_walk(root))
+
+
+def manifest_files(root, digests=None, workers=None):
+    # Digests taken while files were copied are used as they are; only the files
+    # written some other way (merged metas, fxmanifest.lua...) are read again.
+    known = {os.path.normpath(path): digest for path, digest in (digests or {}).items() if digest}
+    files = {}
+    to_hash = []
+    for rel, path in _walk(root):
+        size = os.path.getsize(path)
+        digest = known.get(os.path.normpath(path))
+        if digest is None:
+            to_hash.append((rel, path, size))
+        else:
+            files[rel] = (size, digest)
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=workers or DEFAULT_COPY_WORKERS) as pool:
+            for (rel, _, size), digest in zip(to_hash, pool.map(hash_file, [path for _, path, _ in to_hash])):
+                files[rel] = (size, digest)
+    return files
+
+
+@traced()
+def write_manifest(root, digests=None, workers=None):
+    files = manifest_files(root, digests, workers)
+    path = os.path.join(root, MANIFEST_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(render_manifest(files))
+    os.replace(path + ".tmp", path)
+    return files
+
+
+def load_manifest(root):
+    with open(os.path.join(root, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported {MANIFEST_FILE} version in {root}: {manifest.get('version')!r}")
+    if manifest.get("algorithm") != DIGEST_ALGORITHM:
+        raise ValueError(f"Unsupported digest in {root}: {manifest.get('algorithm')!r}")
+    return manifest
+
+
+def find_resources(path):
+    # A resource folder, or a folder of resources such as a server's resources/ directory.
+    if os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+        return [path]
+    return [
+        os.path.join(path, name) for name in sorted(os.listdir(path))
+        if os.path.isfile(os.path.join(path, name, MANIFEST_FILE))
+    ]
+
+
+def _check(path, expected):
+    return hash_file(path) == expected
+
+
+@traced()
+def verify_resources(roots, workers=None, on_event=None, cancel_token=None):
+    # One pool for every resource, so a folder of small resources is checked in parallel too.
+    results = []
+    checks = []
+    for root in roots:
+        listed = load_manifest(root)["files"]
+        present = walk_resource(root)
+        result = {
+            "root": root, "files": len(listed), "missing": [], "changed": [],
+            "extra": sorted(set(present) - set(listed)),
+        }
+        results.append(result)
+        for rel, expected in listed.items():
+            path = present.get(rel)
+            if path is None:
+                result["missing"].append(rel)
+            elif os.path.getsize(path) != expected["size"]:
+                result["changed"].append(rel)
+            else:
+                checks.append((result, rel, path, expected))
+
+    bytes_total = sum(expected["size"] for _, _, _, expected in checks)
+    bytes_done = 0
+    emit(on_event, "phase_started", phase="verify", total=len(checks), bytes_total=bytes_total)
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_COPY_WORKERS) as pool:
+        futures = {pool.submit(_check, path, expected["digest"]): (result, rel, expected)
+                   for result, rel, path, expected in checks}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                check_cancelled(cancel_token)
+                result, rel, expected = futures[future]
+                if not future.result():
+                    result["changed"].append(rel)
+                bytes_done += expected["size"]
+                emit(on_event, "bytes_copied", phase="verify", path=rel, done=done, total=len(checks),
+                     bytes_done=bytes_done, bytes_total=bytes_total)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    for result in results:
+        result["changed"].sort()
+        result["ok"] = not (result["missing"] or result["changed"] or result["extra"])
+    return results
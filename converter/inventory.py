@@ -0,0 +1,116 @@
+import os
+
+from .tracing import span
+
+STREAM_EXTENSIONS = (".yft", ".ytd", ".ydr", ".ymt")
+META_FILES = (
+    "vehicles.meta", "handling.meta", "carvariations.meta",
+    "carcols.meta", "dlctext.meta", "vehiclelayouts.meta"
+)
+
+
+def classify_file(name):
+    lower = name.lower()
+    if lower.endswith(STREAM_EXTENSIONS):
+        return "stream"
+    if name in META_FILES:
+        return "meta"
+    if lower.endswith(".rel") or "nametable" in lower:
+        return "audio"
+    if lower.endswith(".awc"):
+        return "awc"
+    return "other"
+
+
+class InventoryEntry:
+    __slots__ = ("name", "path", "rel_path", "size", "mtime", "kind")
+
+    def __init__(self, name, path, rel_path, size, mtime, kind):
+        self.name = name
+        self.path = path
+        self.rel_path = rel_path
+        self.size = size
+        self.mtime = mtime
+        self.kind = kind
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    @property
+    def is_local_file(self):
+        return True
+
+    def __repr__(self):
+        return f"InventoryEntry({self.rel_path!r}, kind={self.kind!r}, size={self.size})"
+
+
+class FolderInventory:
+    def __init__(self, root, entries):
+        self.root = root
+        self.entries = entries
+
+    @classmethod
+    def scan(cls, root):
+        entries = []
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as it:
+                    items = sorted(it, key=lambda e: e.name)
+            except OSError as e:
+                print(f"Skipping unreadable folder {current}: {e}")
+                continue
+
+            subdirs = []
+            for item in items:
+                if item.is_dir(follow_symlinks=False):
+                    subdirs.append(item.path)
+                elif item.is_file():
+                    st = item.stat()
+                    entries.append(InventoryEntry(
+                        item.name,
+                        item.path,
+                        os.path.relpath(item.path, root),
+                        st.st_size,
+                        st.st_mtime,
+                        classify_file(item.name),
+                    ))
+            pending.extend(reversed(subdirs))
+        return cls(root, entries)
+
+    @property
+    def sequential(self):
+        return False
+
+    def close(self):
+        pass
+
+    def of_kind(self, *kinds):
+        return [e for e in self.entries if e.kind in kinds]
+
+    def find(self, name):
+        for entry in self.entries:
+            if entry.name == name:
+                return entry
+        return None
+
+    def find_all(self, name):
+        return [e for e in self.entries if e.name == name]
+
+    @property
+    def total_bytes(self):
+        return sum(e.size for e in self.entries)
+
+    def is_vehicle(self):
+        return any(
+            e.name == "vehicles.meta" or e.name.lower().endswith(".yft")
+            for e in self.entries
+        )
+
+
+def scan_folder(root):
+    with span("scan", path=root) as scan_span:
+        inventory = FolderInventory.scan(root)
+        scan_span.set(files=len(inventory.entries))
+    return inventory
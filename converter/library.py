@@ -0,0 +1,79 @@
+import os
+import tarfile
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .archive_input import is_archive, scan_source, source_name
+from .copy_engine import DEFAULT_COPY_WORKERS
+from .events import check_cancelled, emit
+from .meta_cache import read_entry_metadata
+from .tracing import bind_tracer, traced
+
+VehicleSummary = namedtuple(
+    "VehicleSummary",
+    ["path", "name", "model_names", "files", "stream_files", "meta_files", "bytes", "is_vehicle", "warnings"],
+)
+
+
+def summarize_vehicle(inventory, meta_cache=None):
+    warnings = []
+    model_names = []
+    metas = inventory.find_all("vehicles.meta")
+    for entry in metas:
+        try:
+            model_names.extend(read_entry_metadata(entry, meta_cache)["model_names"])
+        except Exception as e:
+            warnings.append(f"Could not read {entry.rel_path}: {e}")
+    streams = inventory.of_kind("stream")
+    is_vehicle = inventory.is_vehicle()
+    if not is_vehicle:
+        warnings.append("No vehicles.meta or .yft models")
+    elif not metas:
+        warnings.append("No vehicles.meta, only stream files")
+    elif not model_names:
+        warnings.append("No <modelName> in vehicles.meta")
+    elif not any(entry.name.lower().endswith(".yft") for entry in streams):
+        warnings.append("No .yft models")
+    return VehicleSummary(
+        inventory.root, source_name(inventory.root), sorted(set(model_names)), len(inventory.entries),
+        len(streams), len(inventory.of_kind("meta")), inventory.total_bytes, is_vehicle, warnings,
+    )
+
+
+def _scan_one(path, meta_cache, cancel_token):
+    check_cancelled(cancel_token)
+    try:
+        inventory = scan_source(path)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        return VehicleSummary(path, source_name(path), [], 0, 0, 0, 0, False, [f"Unreadable: {e}"])
+    try:
+        return summarize_vehicle(inventory, meta_cache)
+    finally:
+        inventory.close()
+
+
+@traced()
+def scan_library(root, meta_cache=None, workers=None, skip=None, on_event=None, cancel_token=None):
+    # One row per child folder or archive, reported as soon as it's scanned.
+    paths = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if (os.path.isdir(path) or is_archive(path)) and not (skip and skip(name)):
+            paths.append(path)
+
+    emit(on_event, "phase_started", phase="scan", path=root, done=0, total=len(paths))
+    summaries = []
+    pool = ThreadPoolExecutor(max_workers=workers or DEFAULT_COPY_WORKERS, thread_name_prefix="library-scan")
+    try:
+        futures = [pool.submit(bind_tracer(_scan_one), path, meta_cache, cancel_token) for path in paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            summary = future.result()
+            summaries.append(summary)
+            emit(on_event, "vehicle_scanned", phase="scan", path=summary.path, done=done, total=len(paths),
+                 bytes_done=summary.bytes, data=summary)
+    finally:
+        # Don't start the rest after a cancel or an error.
+        pool.shutdown(wait=True, cancel_futures=True)
+    summaries.sort(key=lambda summary: summary.name.lower())
+    return summaries
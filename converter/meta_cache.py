@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from .hashing import hash_bytes
+from .tracing import span
+
+
+def _default_cache_dir():
+    # %APPDATA% on Windows, the XDG cache folder elsewhere.
+    if os.getenv("APPDATA"):
+        return os.path.join(os.getenv("APPDATA"), "fivem_converter")
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "fivem_converter")
+
+
+DEFAULT_CACHE_PATH = os.path.join(_default_cache_dir(), "meta_cache.sqlite")
+
+VEHICLE_FIELDS = {
+    "modelname": "model_names",
+    "audionamehash": "audio_names",
+    "txdname": "txd_names",
+    "handlingid": "handling_ids",
+}
+VEHICLE_FIELDS_REGEX = re.compile(
+    r"<(modelName|audioNameHash|txdName|handlingId)>\s*(.*?)\s*</\1>", re.IGNORECASE
+)
+
+
+def extract_vehicle_metadata_from_content(content):
+    with span("regex_parse", bytes=len(content)):
+        metadata = {key: [] for key in VEHICLE_FIELDS.values()}
+        for field, value in VEHICLE_FIELDS_REGEX.findall(content):
+            metadata[VEHICLE_FIELDS[field.lower()]].append(value)
+    return metadata
+
+
+def extract_vehicle_metadata(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return extract_vehicle_metadata_from_content(f.read())
+
+
+class MetaCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vehicle_meta ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT, data TEXT)"
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _store(self, path, size, mtime, digest, metadata):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO vehicle_meta (path, size, mtime, hash, data) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime, digest, json.dumps(metadata)),
+            )
+            self._db.commit()
+
+    def _try_store(self, path, size, mtime, digest, metadata):
+        # A locked or read-only cache only costs the next run a re-parse.
+        try:
+            self._store(path, size, mtime, digest, metadata)
+        except sqlite3.Error as e:
+            print(f"Could not update metadata cache {self.path}: {e}")
+
+    def get(self, path, size=None, mtime=None):
+        if size is None or mtime is None:
+            st = os.stat(path)
+            size, mtime = st.st_size, st.st_mtime
+        key = os.path.abspath(path)
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime, hash, data FROM vehicle_meta WHERE path = ?", (key,)
+            ).fetchone()
+
+        if row and row[0] == size and row[1] == mtime:
+            self.hits += 1
+            return json.loads(row[3])
+
+        # Read once: the same bytes are hashed and, if they changed, parsed.
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hash_bytes(data)
+        if row and row[0] == size and digest == row[2]:
+            # Same size but touched, and the contents didn't change.
+            self.hits += 1
+            self._try_store(key, size, mtime, digest, json.loads(row[3]))
+            return json.loads(row[3])
+
+        self.misses += 1
+        metadata = extract_vehicle_metadata_from_content(data.decode('utf-8'))
+        self._try_store(key, size, mtime, digest, metadata)
+        return metadata
+
+
+def read_vehicle_metadata(path, meta_cache=None, size=None, mtime=None):
+    if meta_cache is None:
+        return extract_vehicle_metadata(path)
+    return meta_cache.get(path, size, mtime)
+
+
+def read_entry_metadata(entry, meta_cache=None):
+    with span("read_metadata", path=entry.path, bytes=entry.size):
+        if not entry.is_local_file:
+            # Archive members have no stable path on disk to key the cache on.
+            with entry.open() as f:
+                return extract_vehicle_metadata_from_content(f.read().decode('utf-8'))
+        return read_vehicle_metadata(entry.path, meta_cache, entry.size, entry.mtime)
+
+
+def open_meta_cache(path=DEFAULT_CACHE_PATH):
+    try:
+        return MetaCache(path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Metadata cache unavailable ({path}): {e}")
+        return None
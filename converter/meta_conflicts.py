@@ -0,0 +1,178 @@
+import hashlib
+import os
+import re
+
+# meta type -> (list holding the entries, identifier of each entry)
+INDEXED_FIELDS = {
+    "vehicles.meta": ("InitDatas", "modelName"),
+    "handling.meta": ("HandlingData", "handlingName"),
+    "carcols.meta": ("Kits", "id"),
+}
+# Remapped kits count down from the top of the range, away from the IDs mods usually pick.
+KIT_ID_MAX = 65535
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _item_value(item, field):
+    for child in item:
+        if isinstance(child.tag, str) and _local_name(child.tag) == field.lower():
+            value = child.get("value") if field == "id" else child.text
+            value = (value or "").strip()
+            return value or None
+    return None
+
+
+def _fingerprint(item):
+    # Formatting and comments differ between mods that ship the same entry, so only
+    # tags, attributes and text count.
+    digest = hashlib.blake2b(digest_size=16)
+
+    def walk(elem):
+        digest.update(f"<{_local_name(elem.tag)}".encode())
+        for key, value in sorted(elem.attrib.items()):
+            digest.update(f" {key}={value!r}".encode())
+        digest.update(f">{(elem.text or '').strip()!r}".encode())
+        for child in elem:
+            if isinstance(child.tag, str):
+                walk(child)
+        digest.update(b"/")
+
+    walk(item)
+    return digest.hexdigest()
+
+
+class MetaConflictIndex:
+    def __init__(self, dedupe=False, remap_kit_ids=False, vehicle_of=None):
+        self.dedupe = dedupe
+        self.remap_kit_ids = remap_kit_ids
+        self.vehicle_of = vehicle_of or {}
+        # (meta type, lowercased identifier) -> {fingerprint: first folder}
+        self.entries = {}
+        self.collisions = {}
+        self.kit_ids = set()
+        self.next_kit_id = KIT_ID_MAX
+        # Undoes what the current file added, in case it turns out not to parse halfway through.
+        self._undo = []
+
+    @property
+    def transform(self):
+        # Recorded in the rebuild cache: merged metas only match a build with the same options.
+        options = [name for name, on in (("dedupe", self.dedupe), ("remap_kit_ids", self.remap_kit_ids)) if on]
+        return ",".join(options) or None
+
+    def indexes(self, meta_type):
+        return meta_type in INDEXED_FIELDS
+
+    def _folder(self, source):
+        path = getattr(source, "path", source)
+        return self.vehicle_of.get(path) or os.path.basename(os.path.dirname(os.path.dirname(path)))
+
+    def begin(self):
+        self._undo = []
+
+    def rollback(self):
+        while self._undo:
+            self._undo.pop()()
+
+    def _set(self, mapping, key, value):
+        if key not in mapping:
+            mapping[key] = value
+            self._undo.append(lambda: mapping.pop(key))
+
+    def _use_kit_id(self, kit_id):
+        if kit_id not in self.kit_ids:
+            self.kit_ids.add(kit_id)
+            self._undo.append(lambda: self.kit_ids.discard(kit_id))
+
+    def _free_kit_id(self):
+        next_kit_id = self.next_kit_id
+        self._undo.append(lambda: setattr(self, "next_kit_id", next_kit_id))
+        while self.next_kit_id in self.kit_ids:
+            self.next_kit_id -= 1
+        if self.next_kit_id < 0:
+            return None
+        self._use_kit_id(self.next_kit_id)
+        return self.next_kit_id
+
+    def _add(self, meta_type, field, value, fingerprint, folder, rewritable=True):
+        if field == "id" and value.isdigit():
+            self._use_kit_id(int(value))
+        key = (meta_type, value.lower())
+        seen = self.entries.get(key)
+        if seen is None:
+            self._set(self.entries, key, {fingerprint: folder})
+            return None
+
+        identical = fingerprint is not None and fingerprint in seen
+        new_id = None
+        if identical:
+            action = "deduped" if self.dedupe and rewritable else "identical"
+        elif field == "id" and self.remap_kit_ids and rewritable and (new_id := self._free_kit_id()) is not None:
+            action = f"remapped to {new_id}"
+            self._set(self.entries, (meta_type, str(new_id)), {fingerprint: folder})
+        else:
+            action = "different"
+            self._set(seen, fingerprint, folder)
+
+        self._set(self.collisions, key, {
+            "meta": meta_type, "field": field, "value": value, "folders": [next(iter(seen.values()))], "actions": [],
+        })
+        collision = self.collisions[key]
+        collision["folders"].append(folder)
+        collision["actions"].append(action)
+        self._undo.append(lambda: (collision["folders"].pop(), collision["actions"].pop()))
+        return action, new_id
+
+    def visit(self, meta_type, source, child):
+        # Called with each top-level element of a meta while it's merged, before it's written out.
+        container, field = INDEXED_FIELDS[meta_type]
+        if not isinstance(child.tag, str) or _local_name(child.tag) != container.lower():
+            return
+        folder = self._folder(source)
+        for item in list(child):
+            if not isinstance(item.tag, str):
+                continue
+            value = _item_value(item, field)
+            if value is None:
+                continue
+            result = self._add(meta_type, field, value, _fingerprint(item), folder)
+            if result is None:
+                continue
+            action, new_id = result
+            if action == "deduped":
+                child.remove(item)
+            elif new_id is not None:
+                for element in item:
+                    if isinstance(element.tag, str) and _local_name(element.tag) == "id":
+                        element.set("value", str(new_id))
+                        break
+
+    def scan_text(self, meta_type, source, body):
+        # Metas that aren't well-formed XML are merged as text: collisions are reported, never rewritten.
+        container, field = INDEXED_FIELDS[meta_type]
+        if field == "id":
+            blocks = re.findall(r"<Kits>(.*?)</Kits>", body, re.DOTALL | re.IGNORECASE)
+            values = [v for block in blocks for v in re.findall(r'<id\s+value="\s*([^"]*?)\s*"', block)]
+        else:
+            values = re.findall(rf"<{field}>\s*([^<]*?)\s*</{field}>", body, re.IGNORECASE)
+        folder = self._folder(source)
+        for value in values:
+            if value:
+                self._add(meta_type, field, value, None, folder, rewritable=False)
+
+    def restore(self, collisions):
+        # Collisions of a merged meta the rebuild cache kept from the previous build.
+        for collision in collisions:
+            self.collisions[(collision["meta"], collision["value"].lower())] = collision
+
+    def report(self, meta_type=None):
+        return [c for c in self.collisions.values() if meta_type is None or c["meta"] == meta_type]
+
+
+def describe_collision(collision):
+    actions = ", ".join(sorted(set(collision["actions"])))
+    folders = ", ".join(collision["folders"])
+    return f"Duplicate {collision['field']} {collision['value']} in {collision['meta']} of {folders} ({actions})"
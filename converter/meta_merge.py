@@ -0,0 +1,199 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from functools import partial
+
+from .tracing import span
+
+META_ROOT_TAGS = {
+    "vehicles.meta": "CVehicleModelInfo__InitDataList",
+    "handling.meta": "CHandlingDataMgr",
+    "carvariations.meta": "CVehicleModelInfoVariation",
+    "carcols.meta": "CVehicleModelInfoVarGlobal",
+    "dlctext.meta": "CExtraTextMetaFile",
+    "vehiclelayouts.meta": "CVehicleMetadataMgr"
+}
+
+
+def _escape_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attr(value):
+    return (_escape_text(value).replace('"', "&quot;")
+            .replace("\n", "&#10;").replace("\r", "&#13;").replace("\t", "&#09;"))
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class _Namespaces:
+    def __init__(self, prefixes, root_decls):
+        # uri -> prefix as declared in the file being serialized
+        self.prefixes = prefixes
+        self.root_decls = root_decls
+
+    def qname(self, name, used):
+        if not name.startswith("{"):
+            return name
+        uri, local = name[1:].split("}", 1)
+        prefix = self.prefixes.get(uri)
+        if prefix is None:
+            prefix = f"ns{len(self.prefixes)}"
+            self.prefixes[uri] = prefix
+        if self.root_decls.get(prefix) != uri:
+            used[prefix] = uri
+        return f"{prefix}:{local}" if prefix else local
+
+
+def _serialize(elem, namespaces, parts, used):
+    if elem.tag is ET.Comment:
+        parts.append(f"<!--{elem.text or ''}-->")
+    elif elem.tag is ET.ProcessingInstruction:
+        parts.append(f"<?{elem.text or ''}?>")
+    else:
+        tag = namespaces.qname(elem.tag, used)
+        attrs = "".join(
+            f' {namespaces.qname(k, used)}="{_escape_attr(v)}"' for k, v in elem.attrib.items()
+        )
+        start = len(parts)
+        parts.append(None)  # opening tag, filled in once namespace use is known
+        if elem.text:
+            parts.append(_escape_text(elem.text))
+        for child in elem:
+            _serialize(child, namespaces, parts, used)
+        if len(parts) == start + 1:
+            parts[start] = f"<{tag}{attrs} />"
+        else:
+            parts[start] = f"<{tag}{attrs}>"
+            parts.append(f"</{tag}>")
+    if elem.tail:
+        parts.append(_escape_text(elem.tail))
+
+
+def _serialize_top_level(elem, namespaces):
+    parts = []
+    used = {}
+    _serialize(elem, namespaces, parts, used)
+    if used and elem.tag is not ET.Comment and elem.tag is not ET.ProcessingInstruction:
+        decls = "".join(
+            f' xmlns="{_escape_attr(uri)}"' if not prefix else f' xmlns:{prefix}="{_escape_attr(uri)}"'
+            for prefix, uri in used.items()
+        )
+        head = parts[0]
+        cut = -3 if head.endswith(" />") else -1
+        parts[0] = head[:cut] + decls + head[cut:]
+    return "".join(parts)
+
+
+def _open_source(source):
+    # Sources are file paths or inventory entries (which may live inside an archive).
+    return open(source, 'rb') if isinstance(source, str) else source.open()
+
+
+def _parse_children(source, root_tag, root_decls, visit=None):
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True, insert_pis=True))
+    prefixes = {}
+    decls = {}
+    parts = []
+    root = None
+    depth = 0
+    namespaces = None
+    try:
+        with _open_source(source) as f:
+            for event, item in ET.iterparse(f, events=("start", "end", "start-ns"), parser=parser):
+                if event == "start-ns":
+                    prefix, uri = item
+                    prefixes.setdefault(uri, prefix)
+                    if root is None:
+                        decls[prefix] = uri
+                elif event == "start":
+                    if root is None:
+                        if _local_name(item.tag).lower() != root_tag.lower():
+                            return None
+                        root = item
+                        attrib = dict(item.attrib)
+                        namespaces = _Namespaces(prefixes, root_decls if root_decls is not None else decls)
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 1:
+                        # Flush every finished top-level child (and comments before it),
+                        # then drop them so memory stays bounded by one element.
+                        for child in list(root):
+                            if visit is not None:
+                                visit(child)
+                            parts.append(_serialize_top_level(child, namespaces))
+                        del root[:]
+    except ET.ParseError:
+        return None
+
+    if root is None:
+        return None
+    for child in list(root):
+        if visit is not None:
+            visit(child)
+        parts.append(_serialize_top_level(child, namespaces))
+    return attrib, decls, "".join(parts).strip()
+
+
+def _regex_body(source, root_tag):
+    with _open_source(source) as f:
+        content = f.read().decode('utf-8')
+    inner = re.findall(f"<{root_tag}[^>]*?>(.*?)</{root_tag}>", content, re.DOTALL | re.IGNORECASE)
+    return inner[0].strip() if inner else ""
+
+
+def _open_tag(root_tag, attrib, decls):
+    parts = [root_tag]
+    for prefix, uri in decls.items():
+        parts.append(f'xmlns:{prefix}="{_escape_attr(uri)}"' if prefix else f'xmlns="{_escape_attr(uri)}"')
+    for key, value in attrib.items():
+        if key.startswith("{"):
+            uri, local = key[1:].split("}", 1)
+            prefix = next((p for p, u in decls.items() if u == uri and p), None)
+            key = f"{prefix}:{local}" if prefix else local
+        parts.append(f'{key}="{_escape_attr(value)}"')
+    return f"<{' '.join(parts)}>"
+
+
+def iter_merged_meta(meta_type, sources, index=None):
+    root_tag = META_ROOT_TAGS[meta_type]
+    root_decls = None
+    if index is not None and not index.indexes(meta_type):
+        index = None
+
+    for source in sources:
+        with span("merge_meta_file", meta=meta_type, bytes=getattr(source, "size", 0)):
+            visit = None
+            if index is not None:
+                index.begin()
+                visit = partial(index.visit, meta_type, source)
+            parsed = _parse_children(source, root_tag, root_decls, visit)
+            if parsed is None:
+                # Plenty of mods ship metas that aren't well-formed XML; keep the
+                # old lenient extraction for those instead of dropping the vehicle.
+                attrib, decls, body = {}, {}, _regex_body(source, root_tag)
+                if index is not None:
+                    index.rollback()
+                    index.scan_text(meta_type, source, body)
+            else:
+                attrib, decls, body = parsed
+        if root_decls is None:
+            root_decls = decls
+            yield _open_tag(root_tag, attrib, decls)
+        if body:
+            yield "\n" + body
+
+    if root_decls is None:
+        yield f"<{root_tag}>"
+    yield f"\n</{root_tag}>"
+
+
+def write_merged_meta(meta_type, sources, target_path, index=None):
+    tmp_path = target_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in iter_merged_meta(meta_type, sources, index):
+            f.write(chunk)
+    os.replace(tmp_path, target_path)
@@ -1,62 +1,183 @@
 from .c_utils import (
-    parse_model_names_from_content,
     generate_vehicle_names_lua,
-    merge_meta_files,
+    render_fxmanifest,
+    render_vehicle_names_lua,
     write_fxmanifest
 )
+from .build_cache import BuildCache, begin_output, publish_output
+from .copy_engine import copy_files
+from .integrity import write_manifest
+from .dedup import DEFAULT_CONFLICT_POLICY, resolve_stream_entries
+from .events import check_cancelled, emit, warn
+from .archive_input import in_archive_order, scan_source, source_name
+from .asset_budget import check_asset_budget
+from .meta_cache import read_entry_metadata
+from .meta_conflicts import MetaConflictIndex, describe_collision
+from .meta_merge import iter_merged_meta, write_merged_meta
+from .texture_downscale import downscale_textures, estimate_downscaled
+from .tracing import traced
+from .zip_output import OUTPUT_FORMATS, ZipPackage, write_files
 import os
-import shutil
-
-
-def build_combined_fivem_resource(vehicle_folders, output_path):
-    os.makedirs(output_path, exist_ok=True)
-    stream_path = os.path.join(output_path, "stream")
-    data_path = os.path.join(output_path, "data")
-    os.makedirs(stream_path, exist_ok=True)
-    os.makedirs(data_path, exist_ok=True)
-
-    meta_files_dict = {
-        "vehicles.meta": [],
-        "handling.meta": [],
-        "carvariations.meta": [],
-        "carcols.meta": [],
-        "dlctext.meta": [],
-        "vehiclelayouts.meta": []
-    }
-    model_names = set()
-
-    for folder in vehicle_folders:
-        for root, _, files in os.walk(folder):
-            for file in files:
-                full_path = os.path.join(root, file)
-                if file.endswith((".yft", ".ytd", ".ydr", ".ymt", ".awc")):
-                    shutil.copy(full_path, os.path.join(stream_path, file))
-                elif file in meta_files_dict:
-                    meta_files_dict[file].append(full_path)
-                    if file == "vehicles.meta":
+from functools import partial
+
+
+@traced()
+def build_combined_fivem_resource(vehicle_folders, output_path, inventories=None, workers=None,
+                                  copy_mode="copy", copy_report=None, incremental=True,
+                                  conflict_policy=DEFAULT_CONFLICT_POLICY, conflict_report=None,
+                                  meta_cache=None, on_event=None, cancel_token=None,
+                                  output_format="folder", digest_cache=None, asset_limits=None,
+                                  asset_report=None, texture_max_size=None, texture_report=None,
+                                  dedupe_metas=False, remap_kit_ids=False, meta_conflict_report=None,
+                                  checksums=False):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    emit(on_event, "scan_started", phase="scan", path=output_path, total=len(vehicle_folders))
+    owned = []
+    package = None
+    cache = None
+    try:
+        if inventories is None:
+            inventories = owned
+            for index, folder in enumerate(vehicle_folders):
+                check_cancelled(cancel_token)
+                emit(on_event, "phase_started", phase="scan", path=folder, done=index, total=len(vehicle_folders))
+                owned.append(scan_source(folder))
+        if on_event is not None:
+            for inventory in inventories:
+                for entry in inventory.entries:
+                    emit(on_event, "file_classified", phase="scan", path=entry.path,
+                         bytes_total=entry.size, message=entry.kind)
+
+        emit(on_event, "phase_started", phase="dedup")
+        stream_entries, conflicts, duplicates = resolve_stream_entries(
+            inventories, conflict_policy, workers, digest_cache=digest_cache
+        )
+        for conflict in conflicts:
+            folders = ", ".join(os.path.basename(f) for v in conflict["variants"] for f in v["folders"])
+            warn(on_event, f"\u26a0\ufe0f Conflicting {conflict['name']} in {folders} ({conflict['action']})")
+        if duplicates:
+            warn(on_event, f"Skipped {duplicates} identical duplicate stream files")
+        if conflict_report is not None:
+            conflict_report.extend(conflicts)
+
+        if asset_limits is not None or asset_report is not None:
+            emit(on_event, "phase_started", phase="budget")
+            check_asset_budget(
+                inventories, asset_limits, asset_report, on_event, cancel_token,
+                pack_paths={entry.path for entry in stream_entries.values() if entry.kind == "stream"},
+                estimate=partial(estimate_downscaled, max_size=texture_max_size) if texture_max_size else None
+            )
+
+        build_path = output_path
+        if output_format == "zip":
+            package = ZipPackage(output_path, checksums)
+        else:
+            build_path = begin_output(output_path, incremental, workers)
+        stream_path = os.path.join(build_path, "stream")
+        data_path = os.path.join(build_path, "data")
+        if package is None:
+            os.makedirs(stream_path, exist_ok=True)
+            os.makedirs(data_path, exist_ok=True)
+
+        meta_files_dict = {
+            "vehicles.meta": [],
+            "handling.meta": [],
+            "carvariations.meta": [],
+            "carcols.meta": [],
+            "dlctext.meta": [],
+            "vehiclelayouts.meta": []
+        }
+        model_names = set()
+
+        emit(on_event, "phase_started", phase="metadata")
+        for inventory in inventories:
+            check_cancelled(cancel_token)
+            for entry in inventory.entries:
+                if entry.kind == "meta":
+                    meta_files_dict[entry.name].append(entry)
+                    if entry.name == "vehicles.meta":
                         try:
-                            with open(full_path, 'r', encoding='utf-8') as f:
-                                model_names.update(parse_model_names_from_content(f.read()))
+                            metadata = read_entry_metadata(entry, meta_cache)
+                            model_names.update(metadata["model_names"])
                         except Exception as e:
-                            print(f"Failed to parse model names in {file}: {e}")
+                            warn(on_event, f"Failed to parse model names in {entry.name}: {e}", entry.path)
 
-    saved_meta_files = []
-    for meta_name, paths in meta_files_dict.items():
-        if paths:
-            merged = merge_meta_files(meta_name, paths)
-            target = os.path.join(data_path, meta_name)
-            with open(target, 'w', encoding='utf-8') as f:
-                f.write(merged)
-            saved_meta_files.append(meta_name)
+        cache = BuildCache(build_path, enabled=package is None, incremental=incremental)
+        digests = {} if checksums and package is None else None
+        if cache.resumed:
+            warn(on_event, f"Resuming an interrupted build, {cache.resumed} files were already written")
+        copies = {os.path.join(stream_path, name): entry for name, entry in stream_entries.items()}
+        present_metas = {name for name, entries in meta_files_dict.items() if entries}
+        cache.remove_stale(copies, present_metas)
+        cache.plan(copies)
 
-    write_fxmanifest(output_path, saved_meta_files)
+        all_streamed = [os.path.join(output_path, "stream", name) for name in stream_entries]
+        if any(inventory.sequential for inventory in inventories):
+            # Compressed tarballs are read front to back, one member at a time.
+            copies = in_archive_order(copies)
+            workers = 1
+        if texture_max_size:
+            vehicle_of = {
+                entry.path: source_name(inventory.root) for inventory in inventories for entry in inventory.entries
+            }
+            copies = downscale_textures(copies, texture_max_size, None, cache, package, texture_report,
+                                        on_event, cancel_token, vehicle_of, digests)
+        if package is not None:
+            write_files(copies, package, copy_report, on_event, cancel_token)
+        else:
+            copy_files(copies, workers, copy_mode, cache, copy_report, on_event, cancel_token, digests)
 
-    if model_names:
-        generate_vehicle_names_lua(output_path, model_names)
+        # modelName, handlingName and kit IDs are indexed while the metas are merged.
+        meta_index = MetaConflictIndex(dedupe_metas, remap_kit_ids, {
+            entry.path: source_name(inventory.root) for inventory in inventories for entry in inventory.of_kind("meta")
+        })
+        saved_meta_files = []
+        for index, (meta_name, entries) in enumerate(meta_files_dict.items()):
+            check_cancelled(cancel_token)
+            emit(on_event, "phase_started", phase="meta", path=meta_name, done=index, total=len(meta_files_dict))
+            if entries:
+                target = os.path.join(data_path, meta_name)
+                if package is not None:
+                    package.write_chunks(target, iter_merged_meta(meta_name, entries, meta_index))
+                elif cache.meta_is_fresh(meta_name, target, entries, meta_index.transform):
+                    meta_index.restore(cache.meta_collisions(meta_name))
+                else:
+                    write_merged_meta(meta_name, entries, target, meta_index)
+                    cache.record_meta(meta_name, target, entries, meta_index.transform,
+                                      meta_index.report(meta_name))
+                saved_meta_files.append(meta_name)
+                emit(on_event, "meta_merged", phase="meta", path=target, done=index + 1,
+                     total=len(meta_files_dict), message=f"{len(entries)} files")
+        cache.save()
+        for collision in meta_index.report():
+            warn(on_event, f"\u26a0\ufe0f {describe_collision(collision)}")
+        if meta_conflict_report is not None:
+            meta_conflict_report.extend(meta_index.report())
 
-    all_streamed = []
-    for dirpath, _, filenames in os.walk(stream_path):
-        for f in filenames:
-            all_streamed.append(os.path.join(dirpath, f))
+        emit(on_event, "phase_started", phase="manifest")
+        if package is not None:
+            if model_names:
+                package.write_text(os.path.join(output_path, "vehicle_names.lua"),
+                                   render_vehicle_names_lua(model_names))
+            package.write_text(os.path.join(output_path, "fxmanifest.lua"),
+                               render_fxmanifest(saved_meta_files, [], "unknown"))
+            package.close()
+            emit(on_event, "manifest_written", phase="manifest", path=package.path)
+        else:
+            write_fxmanifest(build_path, saved_meta_files, [], "unknown")
+            if model_names:
+                generate_vehicle_names_lua(build_path, model_names)
+            if checksums:
+                write_manifest(build_path, digests, workers)
+            publish_output(build_path, output_path)
+            emit(on_event, "manifest_written", phase="manifest", path=os.path.join(output_path, "fxmanifest.lua"))
 
-    return all_streamed, saved_meta_files
\ No newline at end of file
+        return all_streamed, saved_meta_files
+    finally:
+        if package is not None:
+            package.discard()
+        if cache is not None:
+            cache.close()
+        for inventory in owned:
+            inventory.close()
@@ -0,0 +1,589 @@
+import argparse
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from .archive_input import ARCHIVE_EXTENSIONS, source_name
+from .asset_budget import DEFAULT_ASSET_LIMIT, AssetLimits
+from .c_utils import find_model_name
+from .cli import discover_vehicle_folders, format_methods, scan_vehicle
+from .convert import build_fivem_resource
+from .dedup import CONFLICT_POLICIES, DEFAULT_CONFLICT_POLICY
+from .events import CancelToken, ConversionCancelled
+from .fast_copy import COPY_MODES
+from .meta_cache import DEFAULT_CACHE_PATH, open_meta_cache
+from .multi_convert import build_combined_fivem_resource
+from .sharding import parse_size
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_MAX_UPLOAD = 4 * 1024 ** 3
+MAX_JOB_EVENTS = 1000
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+# Events a poller cares about; per-file classification and byte counts only update the progress.
+LOGGED_EVENTS = ("scan_started", "phase_started", "meta_merged", "manifest_written", "warning")
+
+
+class JobError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def parse_job_options(fields):
+    # Same names as the command line options, in JSON or a query string.
+    known = {"source", "combined", "zip", "copy_mode", "full_rebuild", "on_conflict", "max_asset_size",
+             "max_vehicle_size", "max_pack_size", "fail_over_budget", "max_texture_size", "copy_workers",
+             "dedupe_metas", "remap_kit_ids", "checksums"}
+    unknown = set(fields) - known
+    if unknown:
+        raise JobError(f"Unknown job options: {', '.join(sorted(unknown))}")
+    copy_mode = fields.get("copy_mode", "copy")
+    if copy_mode not in COPY_MODES:
+        raise JobError(f"copy_mode must be one of {', '.join(COPY_MODES)}")
+    on_conflict = fields.get("on_conflict", DEFAULT_CONFLICT_POLICY)
+    if on_conflict not in CONFLICT_POLICIES:
+        raise JobError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+    try:
+        sizes = {
+            name: parse_size(fields[name]) if fields.get(name) is not None else None
+            for name in ("max_asset_size", "max_vehicle_size", "max_pack_size")
+        }
+        max_texture_size = int(fields["max_texture_size"]) if fields.get("max_texture_size") else None
+        copy_workers = int(fields["copy_workers"]) if fields.get("copy_workers") else None
+    except ValueError as e:
+        raise JobError(str(e))
+    if max_texture_size is not None and max_texture_size < 4:
+        raise JobError("max_texture_size must be at least 4")
+    if copy_workers is not None and copy_workers < 1:
+        raise JobError("copy_workers must be at least 1")
+    options = {
+        "workers": copy_workers,
+        "copy_mode": copy_mode,
+        "incremental": not _flag(fields.get("full_rebuild", False)),
+        # Jobs are downloaded, so a zip is the default here.
+        "output_format": "zip" if _flag(fields.get("zip", True)) else "folder",
+        "asset_limits": AssetLimits(
+            asset=DEFAULT_ASSET_LIMIT if sizes["max_asset_size"] is None else sizes["max_asset_size"],
+            vehicle=sizes["max_vehicle_size"], pack=sizes["max_pack_size"],
+            fail=_flag(fields.get("fail_over_budget", False)),
+        ),
+        "texture_max_size": max_texture_size,
+        "checksums": _flag(fields.get("checksums", False)),
+    }
+    # Only combined builds merge metas from several vehicles.
+    combined_options = {
+        "conflict_policy": on_conflict,
+        "dedupe_metas": _flag(fields.get("dedupe_metas", False)),
+        "remap_kit_ids": _flag(fields.get("remap_kit_ids", False)),
+    }
+    return options, combined_options
+
+
+class Job:
+    def __init__(self, job_id, source, options, combined_options=None, combined=None, upload_dir=None):
+        self.id = job_id
+        self.source = source
+        self.options = options
+        self.combined_options = combined_options or {}
+        self.combined = combined
+        self.upload_dir = upload_dir
+        self.state = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self.dropped_events = 0
+        self.progress = {}
+        self.cancel_token = CancelToken()
+        self.phase = None
+        self.phase_started_at = None
+        self.bytes_copied = 0
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "state": self.state,
+            "source": self.source,
+            "combined": self.combined,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "output": self.output,
+            "progress": self.progress,
+            "bytes_copied": self.bytes_copied,
+            "events": len(self.events) + self.dropped_events,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ServerMetrics:
+    def __init__(self):
+        self.jobs = dict.fromkeys(JOB_STATES, 0)
+        self.bytes_copied = 0
+        self.copy_seconds = 0.0
+        self.job_seconds = 0.0
+        self.phase_seconds = {}
+        self.phase_count = {}
+
+    def add_phase(self, phase, seconds):
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+        self.phase_count[phase] = self.phase_count.get(phase, 0) + 1
+
+    def render(self, queued, running, workers):
+        lines = [
+            "# HELP converter_jobs Conversion jobs by their current state.",
+            "# TYPE converter_jobs gauge",
+        ]
+        lines.extend(f'converter_jobs{{state="{state}"}} {count}' for state, count in self.jobs.items())
+        lines += [
+            "# HELP converter_queue_length Jobs waiting for a worker.",
+            "# TYPE converter_queue_length gauge",
+            f"converter_queue_length {queued}",
+            "# HELP converter_workers_busy Workers converting a job right now.",
+            "# TYPE converter_workers_busy gauge",
+            f"converter_workers_busy {running}",
+            "# HELP converter_workers Size of the worker pool.",
+            "# TYPE converter_workers gauge",
+            f"converter_workers {workers}",
+            "# HELP converter_copied_bytes_total Bytes written into resources.",
+            "# TYPE converter_copied_bytes_total counter",
+            f"converter_copied_bytes_total {self.bytes_copied}",
+            "# HELP converter_copy_seconds_total Time spent in the copy phase; divide the bytes by it for bytes/s.",
+            "# TYPE converter_copy_seconds_total counter",
+            f"converter_copy_seconds_total {self.copy_seconds:.6f}",
+            "# HELP converter_job_seconds_total Time spent running jobs.",
+            "# TYPE converter_job_seconds_total counter",
+            f"converter_job_seconds_total {self.job_seconds:.6f}",
+            "# HELP converter_phase_seconds Time spent in each conversion phase.",
+            "# TYPE converter_phase_seconds summary",
+        ]
+        for phase in sorted(self.phase_seconds):
+            lines.append(f'converter_phase_seconds_sum{{phase="{phase}"}} {self.phase_seconds[phase]:.6f}')
+            lines.append(f'converter_phase_seconds_count{{phase="{phase}"}} {self.phase_count[phase]}')
+        return "\n".join(lines) + "\n"
+
+
+class JobServer:
+    def __init__(self, data_dir, workers=2, queue_size=DEFAULT_QUEUE_SIZE, meta_cache_path=DEFAULT_CACHE_PATH,
+                 source_root=None):
+        self.data_dir = os.path.abspath(data_dir)
+        self.workers = workers
+        self.source_root = os.path.realpath(source_root) if source_root else None
+        self.jobs = {}
+        self.metrics = ServerMetrics()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.meta_cache = open_meta_cache(meta_cache_path) if meta_cache_path else None
+        self.running = 0
+        self.threads = []
+        os.makedirs(os.path.join(self.data_dir, "jobs"), exist_ok=True)
+        os.makedirs(os.path.join(self.data_dir, "uploads"), exist_ok=True)
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        with self.lock:
+            for job in self.jobs.values():
+                job.cancel_token.cancel()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.meta_cache is not None:
+            self.meta_cache.close()
+
+    def check_source(self, source):
+        if not source:
+            raise JobError("A job needs a source path or an uploaded archive")
+        source = os.path.abspath(source)
+        if self.source_root is not None:
+            real = os.path.realpath(source)
+            if os.path.commonpath([real, self.source_root]) != self.source_root:
+                raise JobError(f"Sources have to be inside {self.source_root}", status=403)
+        if not os.path.exists(source):
+            raise JobError(f"Source not found: {source}", status=404)
+        return source
+
+    def new_upload(self):
+        job_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.data_dir, "uploads", job_id)
+        os.makedirs(upload_dir)
+        return job_id, upload_dir
+
+    def submit(self, fields, job_id=None, upload_dir=None):
+        options, combined_options = parse_job_options(fields)
+        if upload_dir is None:
+            source = self.check_source(fields.get("source"))
+        else:
+            source = fields["source"]
+        job = Job(job_id or uuid.uuid4().hex, source, options, combined_options, fields.get("combined"), upload_dir)
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise JobError("The job queue is full, try again later", status=503)
+            self.jobs[job.id] = job
+            self.metrics.jobs["queued"] += 1
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise JobError(f"No job {job_id}", status=404)
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        job.cancel_token.cancel()
+        with self.lock:
+            if job.state == "queued":
+                self._set_state(job, "cancelled")
+                job.finished = time.time()
+        return job
+
+    def delete(self, job_id):
+        job = self.get(job_id)
+        if job.state in ("queued", "running"):
+            return self.cancel(job_id)
+        with self.lock:
+            del self.jobs[job_id]
+            self.metrics.jobs[job.state] -= 1
+        shutil.rmtree(os.path.join(self.data_dir, "jobs", job.id), ignore_errors=True)
+        return job
+
+    def render_metrics(self):
+        with self.lock:
+            return self.metrics.render(self.queue.qsize(), self.running, self.workers)
+
+    def _set_state(self, job, state):
+        # Callers hold the lock.
+        self.metrics.jobs[job.state] -= 1
+        self.metrics.jobs[state] += 1
+        job.state = state
+
+    def _end_phase(self, job, now):
+        if job.phase is not None:
+            seconds = now - job.phase_started_at
+            self.metrics.add_phase(job.phase, seconds)
+            if job.phase == "copy":
+                self.metrics.copy_seconds += seconds
+        job.phase = None
+
+    def _on_event(self, job, event):
+        with self.lock:
+            if event.kind == "phase_started":
+                if event.phase != job.phase:
+                    self._end_phase(job, event.time)
+                    job.phase, job.phase_started_at = event.phase, event.time
+                job.progress = {"phase": event.phase, "done": event.done, "total": event.total}
+            elif event.kind == "bytes_copied":
+                # bytes_done counts up from zero again for every copy pass.
+                added = event.bytes_done - job.progress.get("bytes_done", 0)
+                added = event.bytes_done if added < 0 else added
+                job.bytes_copied += added
+                self.metrics.bytes_copied += added
+                job.progress = {
+                    "phase": event.phase, "done": event.done, "total": event.total,
+                    "bytes_done": event.bytes_done, "bytes_total": event.bytes_total,
+                }
+            if event.kind in LOGGED_EVENTS:
+                if len(job.events) < MAX_JOB_EVENTS:
+                    job.events.append(event.as_dict())
+                else:
+                    job.dropped_events += 1
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.state != "queued":
+                    continue
+                self._set_state(job, "running")
+                self.running += 1
+            job.started = time.time()
+            started = time.monotonic()
+            try:
+                job.result = self._run(job)
+                state = "done"
+            except ConversionCancelled:
+                state = "cancelled"
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                state = "failed"
+            finally:
+                if job.upload_dir is not None:
+                    shutil.rmtree(job.upload_dir, ignore_errors=True)
+            with self.lock:
+                self._end_phase(job, time.monotonic())
+                self.metrics.job_seconds += time.monotonic() - started
+                self.running -= 1
+                job.finished = time.time()
+                self._set_state(job, state)
+
+    def _run(self, job):
+        job_dir = os.path.join(self.data_dir, "jobs", job.id)
+        copy_report = []
+        asset_report = []
+        texture_report = []
+        options = dict(
+            job.options, copy_report=copy_report, asset_report=asset_report, texture_report=texture_report,
+            meta_cache=self.meta_cache, on_event=lambda event: self._on_event(job, event),
+            cancel_token=job.cancel_token,
+        )
+        # Like --combined, a combined job's source holds one vehicle per folder or archive.
+        inventories = discover_vehicle_folders(job.source) if job.combined and os.path.isdir(job.source) else []
+        inventory = scan_vehicle(job.source) if not inventories else None
+        try:
+            if inventory is not None and not job.combined:
+                name = find_model_name(job.source, inventory, self.meta_cache) or source_name(job.source)
+                job.output = os.path.join(job_dir, name)
+                stream_files, meta_files, audio_files = build_fivem_resource(
+                    job.source, job.output, inventory=inventory, **options
+                )
+                result = {"vehicles": 1, "stream_files": len(stream_files), "meta_files": len(meta_files),
+                          "audio_files": len(audio_files)}
+            else:
+                if inventory is not None:
+                    inventories = [inventory]
+                if not inventories:
+                    raise JobError(f"No vehicles found in {job.source}")
+                job.output = os.path.join(job_dir, job.combined or source_name(job.source))
+                meta_conflicts = []
+                streamed, metas = build_combined_fivem_resource(
+                    [inv.root for inv in inventories], job.output, inventories=inventories,
+                    meta_conflict_report=meta_conflicts, **job.combined_options, **options
+                )
+                result = {"vehicles": len(inventories), "stream_files": len(streamed), "meta_files": len(metas),
+                          "meta_conflicts": meta_conflicts}
+        finally:
+            if inventory is not None:
+                inventory.close()
+            for other in inventories:
+                if other is not inventory:
+                    other.close()
+        if job.options["output_format"] == "zip":
+            job.output += ".zip"
+        result.update(
+            copy_methods=format_methods(copy_report),
+            graphics_memory=sum(asset.physical for asset in asset_report),
+            textures_downscaled=sum(texture.textures for texture in texture_report),
+        )
+        return result
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FiveMVehiclePacker"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, error):
+        self.send_json({"error": str(error)}, getattr(error, "status", 400))
+
+    def route(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, dict(parse_qsl(url.query))
+
+    def do_GET(self):
+        parts, query = self.route()
+        jobs = self.server.jobs
+        try:
+            if parts == ["metrics"]:
+                body = jobs.render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif parts == ["jobs"]:
+                with jobs.lock:
+                    listed = [job.as_dict() for job in jobs.jobs.values()]
+                self.send_json({"jobs": listed})
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = jobs.get(parts[1])
+                with jobs.lock:
+                    self.send_json(job.as_dict())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+                job = jobs.get(parts[1])
+                since = int(query.get("since", 0))
+                with jobs.lock:
+                    events = job.events[since:]
+                    state = job.state
+                self.send_json({"state": state, "next": since + len(events), "events": events})
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                self.send_result(jobs.get(parts[1]))
+            else:
+                raise JobError(f"Not found: {self.path}", status=404)
+        except (JobError, ValueError) as e:
+            self.send_error_json(e)
+
+    def send_result(self, job):
+        if job.state != "done":
+            raise JobError(f"Job {job.id} is {job.state}", status=409)
+        if not job.output.endswith(".zip"):
+            raise JobError(f"Job {job.id} wrote a folder: {job.output}", status=409)
+        with open(job.output, 'rb') as f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(job.output)}"')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        parts, query = self.route()
+        try:
+            if parts != ["jobs"]:
+                raise JobError(f"Not found: {self.path}", status=404)
+            length = int(self.headers.get("Content-Length") or 0)
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+            if content_type == "application/json":
+                fields = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(fields, dict):
+                    raise JobError("The job has to be a JSON object")
+                job = self.server.jobs.submit(dict(query, **fields))
+            else:
+                job = self.receive_upload(query, length)
+            self.send_json(job.as_dict(), 202)
+        except (JobError, ValueError) as e:
+            self.send_error_json(e)
+
+    def receive_upload(self, query, length):
+        # The request body is the archive itself; the name picks how it's opened.
+        name = os.path.basename(query.pop("name", "") or "upload.zip")
+        if not name.lower().endswith(ARCHIVE_EXTENSIONS):
+            raise JobError(f"Uploads have to be archives ({', '.join(ARCHIVE_EXTENSIONS)})")
+        if not 0 < length <= self.server.max_upload:
+            raise JobError(f"Uploads need a Content-Length of at most {self.server.max_upload} bytes", status=413)
+        if "source" in query:
+            raise JobError("Send either a source path or an archive, not both")
+        jobs = self.server.jobs
+        job_id, upload_dir = jobs.new_upload()
+        path = os.path.join(upload_dir, re.sub(r"[^\w.-]", "_", name))
+        try:
+            with open(path, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        raise JobError("The upload ended early")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            return jobs.submit(dict(query, source=path), job_id, upload_dir)
+        except BaseException:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
+
+    def do_DELETE(self):
+        parts, _ = self.route()
+        try:
+            if len(parts) != 2 or parts[0] != "jobs":
+                raise JobError(f"Not found: {self.path}", status=404)
+            job = self.server.jobs.delete(parts[1])
+            with self.server.jobs.lock:
+                self.send_json(job.as_dict())
+        except JobError as e:
+            self.send_error_json(e)
+
+
+def make_server(jobs, host="127.0.0.1", port=DEFAULT_PORT, max_upload=DEFAULT_MAX_UPLOAD, quiet=False):
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.jobs = jobs
+    server.max_upload = max_upload
+    server.quiet = quiet
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m converter.server",
+        description="Run conversions submitted over HTTP on this machine.",
+    )
+    parser.add_argument("data_dir", help="Directory for uploads and finished resources")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="Jobs converted at the same time (default: 2)")
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+        help=f"Jobs that can wait for a worker before new ones are refused (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument("--max-upload", metavar="SIZE", default="4G", help="Largest archive accepted (default: 4G)")
+    parser.add_argument("--source-root", metavar="DIR", help="Only accept source paths inside DIR")
+    parser.add_argument(
+        "--meta-cache", metavar="PATH", default=DEFAULT_CACHE_PATH,
+        help=f"SQLite file caching parsed vehicles.meta data between runs (default: {DEFAULT_CACHE_PATH})",
+    )
+    parser.add_argument("--no-meta-cache", action="store_true", help="Parse every vehicles.meta again")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Don't log every request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.jobs < 1 or args.queue_size < 1:
+        print("--jobs and --queue-size must be at least 1", file=sys.stderr)
+        return 2
+    try:
+        max_upload = parse_size(args.max_upload)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.host not in ("127.0.0.1", "localhost", "::1"):
+        print(f"Warning: listening on {args.host}; the server has no authentication", file=sys.stderr)
+
+    jobs = JobServer(
+        args.data_dir, workers=args.jobs, queue_size=args.queue_size,
+        meta_cache_path=None if args.no_meta_cache else args.meta_cache, source_root=args.source_root,
+    )
+    server = make_server(jobs, args.host, args.port, max_upload, args.quiet)
+    jobs.start()
+    print(f"Listening on http://{args.host}:{server.server_address[1]} with {args.jobs} workers, press Ctrl+C to stop...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping")
+    finally:
+        server.server_close()
+        jobs.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
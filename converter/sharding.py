@@ -0,0 +1,153 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .archive_input import scan_source
+from .dedup import _hash_groups
+from .events import check_cancelled, emit, warn
+from .multi_convert import build_combined_fivem_resource
+from .tracing import bind_tracer, traced
+
+DEFAULT_SHARD_JOBS = 2
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(text):
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*", str(text).lower())
+    if not match:
+        raise ValueError(f"Invalid size: {text!r} (expected a byte count like 500M or 2G)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def _vehicle_groups(inventories, workers=None, digest_cache=None, kinds=("stream", "awc")):
+    # Vehicles shipping different stream files under the same name have to share
+    # a shard, otherwise the conflict policy never sees both copies and two
+    # resources stream different files under one name. Identical copies are
+    # simply written to every shard that needs them.
+    parent = list(range(len(inventories)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    owners = {}
+    for index, inventory in enumerate(inventories):
+        for entry in inventory.of_kind(*kinds):
+            owners.setdefault(entry.name.lower(), []).append((index, entry))
+    shared = {name: items for name, items in owners.items() if len(items) > 1}
+    digests = _hash_groups(
+        {name: [entry for _, entry in items] for name, items in shared.items()}, workers, digest_cache
+    )
+    for items in shared.values():
+        if len({digests[entry.path] for _, entry in items}) > 1:
+            first = items[0][0]
+            for index, _ in items[1:]:
+                parent[find(index)] = find(first)
+
+    groups = {}
+    for index, inventory in enumerate(inventories):
+        groups.setdefault(find(index), []).append(inventory)
+    return list(groups.values())
+
+
+def plan_shards(inventories, budget, workers=None, digest_cache=None):
+    groups = _vehicle_groups(inventories, workers, digest_cache)
+    groups.sort(key=lambda group: sum(inv.total_bytes for inv in group), reverse=True)
+
+    # First-fit decreasing: big groups first, each into the first shard with room.
+    shards = []
+    for group in groups:
+        size = sum(inv.total_bytes for inv in group)
+        for shard in shards:
+            if shard["bytes"] + size <= budget:
+                shard["bytes"] += size
+                shard["vehicles"].extend(group)
+                break
+        else:
+            shards.append({"bytes": size, "vehicles": list(group)})
+
+    # Keep vehicles in source order so repeated runs produce the same shards.
+    order = {id(inv): index for index, inv in enumerate(inventories)}
+    for shard in shards:
+        shard["vehicles"].sort(key=lambda inv: order[id(inv)])
+    shards.sort(key=lambda shard: order[id(shard["vehicles"][0])])
+    return shards
+
+
+def shard_name(name, index):
+    return f"{name}_{index + 1}"
+
+
+def render_ensure_cfg(names):
+    lines = ["# Vehicle resources generated by FiveM Vehicle Packer, add these lines to server.cfg"]
+    lines.extend(f"ensure {name}" for name in names)
+    return "\n".join(lines) + "\n"
+
+
+@traced()
+def build_sharded_fivem_resources(vehicle_folders, output_path, shard_size, inventories=None,
+                                  jobs=DEFAULT_SHARD_JOBS, on_event=None, cancel_token=None, **options):
+    if shard_size <= 0:
+        raise ValueError("Shard size must be positive")
+    owned = []
+    try:
+        if inventories is None:
+            inventories = owned
+            for index, folder in enumerate(vehicle_folders):
+                check_cancelled(cancel_token)
+                emit(on_event, "phase_started", phase="scan", path=folder, done=index, total=len(vehicle_folders))
+                owned.append(scan_source(folder))
+
+        # Hashes taken while planning are reused by each shard's dedup pass.
+        if options.get("digest_cache") is None:
+            options["digest_cache"] = {}
+        shards = plan_shards(inventories, shard_size, options.get("workers"), options["digest_cache"])
+        name = os.path.basename(output_path)
+        parent = os.path.dirname(output_path)
+        for index, shard in enumerate(shards):
+            shard["name"] = shard_name(name, index)
+            shard["output"] = os.path.join(parent, shard["name"])
+            if shard["bytes"] > shard_size:
+                folders = ", ".join(os.path.basename(inv.root) for inv in shard["vehicles"])
+                reason = "ship conflicting stream files" if len(shard["vehicles"]) > 1 else "is bigger than the budget"
+                warn(on_event, f"\u26a0\ufe0f {shard['name']} is over the size budget: {folders} {reason}")
+
+        def forward_warnings(event):
+            if event.kind == "warning":
+                on_event(event)
+
+        def build(shard):
+            return build_combined_fivem_resource(
+                [inv.root for inv in shard["vehicles"]], shard["output"], inventories=shard["vehicles"],
+                on_event=forward_warnings if on_event is not None else None,
+                cancel_token=cancel_token, **options
+            )
+
+        emit(on_event, "phase_started", phase="shards", done=0, total=len(shards))
+        errors = []
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(bind_tracer(build), shard): shard for shard in shards}
+            for done, future in enumerate(as_completed(futures), 1):
+                shard = futures[future]
+                try:
+                    shard["streamed"], shard["metas"] = future.result()
+                except Exception as e:
+                    errors.append(e)
+                emit(on_event, "phase_started", phase="shards", path=shard["output"], done=done, total=len(shards))
+        if errors:
+            raise errors[0]
+
+        stale = shard_name(name, len(shards))
+        if os.path.exists(os.path.join(parent, stale)) or os.path.exists(os.path.join(parent, stale + ".zip")):
+            warn(on_event, f"{stale} from an earlier build with more shards was left in place")
+
+        cfg_path = output_path + ".cfg"
+        with open(cfg_path, 'w', encoding='utf-8') as f:
+            f.write(render_ensure_cfg(shard["name"] for shard in shards))
+        emit(on_event, "manifest_written", phase="shards", path=cfg_path)
+        return shards
+    finally:
+        for inventory in owned:
+            inventory.close()
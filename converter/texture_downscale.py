@@ -0,0 +1,337 @@
+import multiprocessing
+import os
+import struct
+import zlib
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .asset_budget import RSC7_HEADER, parse_rsc7_header
+from .events import check_cancelled, emit, warn
+from .hashing import CHUNK_SIZE, hash_bytes, new_digest
+from .tracing import traced
+
+YTD_VERSION = 13
+SYSTEM_BASE = 0x50000000
+GRAPHICS_BASE = 0x60000000
+BLOCK_ALIGN = 16
+# Pages in the 16-unit size class; up to 127 of them fit in the flags.
+PAGE_UNITS = 16
+MAX_PAGES = 0x7F
+
+# Legacy (D3D9-style) texture formats used by PC texture dictionaries.
+BLOCK_BYTES = {
+    0x31545844: 8,   # DXT1
+    0x33545844: 16,  # DXT3
+    0x35545844: 16,  # DXT5
+    0x31495441: 8,   # ATI1
+    0x32495441: 16,  # ATI2
+    0x20374342: 16,  # BC7
+}
+PIXEL_BITS = {
+    21: 32,  # A8R8G8B8
+    25: 16,  # A1R5G5B5
+    28: 8,   # A8
+    32: 32,  # A8B8G8R8
+    50: 8,   # L8
+}
+
+TextureResult = namedtuple(
+    "TextureResult", ["vehicle", "src", "dst", "textures", "before", "after", "memory_before", "memory_after"]
+)
+
+
+class YtdFormatError(ValueError):
+    pass
+
+
+def _level_size(fmt, width, height):
+    if fmt in BLOCK_BYTES:
+        return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * BLOCK_BYTES[fmt]
+    return width * height * PIXEL_BITS[fmt] // 8
+
+
+def _stride(fmt, width):
+    if fmt in BLOCK_BYTES:
+        return max(1, (width + 3) // 4) * BLOCK_BYTES[fmt]
+    return width * PIXEL_BITS[fmt] // 8
+
+
+def _level_sizes(fmt, width, height, levels):
+    return [_level_size(fmt, max(1, width >> i), max(1, height >> i)) for i in range(levels)]
+
+
+def _system_offset(pointer, system_size):
+    offset = pointer - SYSTEM_BASE
+    if not 0 <= offset < system_size:
+        raise YtdFormatError(f"system pointer out of range: {pointer:#x}")
+    return offset
+
+
+def _read_textures(body, system_size, graphics_size):
+    # pgDictionary<grcTexture>: the texture pointer list sits at 0x30.
+    list_pointer, count = struct.unpack_from("<QH", body, 0x30)
+    list_offset = _system_offset(list_pointer, system_size)
+    textures = []
+    for index in range(count):
+        pointer, = struct.unpack_from("<Q", body, list_offset + index * 8)
+        offset = _system_offset(pointer, system_size)
+        width, height, depth, stride, fmt, levels = struct.unpack_from("<HHHHIxB", body, offset + 0x50)
+        data_pointer, = struct.unpack_from("<Q", body, offset + 0x70)
+        known = fmt in BLOCK_BYTES or fmt in PIXEL_BITS
+        sizes = _level_sizes(fmt, width, height, levels) if known else []
+        data_offset = data_pointer - GRAPHICS_BASE
+        if known and (depth != 1 or not levels or stride != _stride(fmt, width)
+                      or not 0 <= data_offset <= graphics_size - sum(sizes)):
+            # Cube maps, volumes or data we can't account for: leave the whole file alone.
+            raise YtdFormatError(f"unexpected texture layout at {offset:#x}")
+        textures.append({
+            "offset": offset, "width": width, "height": height, "format": fmt, "levels": levels,
+            "data_offset": data_offset, "sizes": sizes, "known": known,
+        })
+    return textures
+
+
+def _levels_to_drop(texture, max_size):
+    if not texture["known"]:
+        return 0
+    width, height, levels = texture["width"], texture["height"], texture["levels"]
+    drop = 0
+    while max(width >> drop, height >> drop) > max_size and levels - drop > 1:
+        if texture["format"] in BLOCK_BYTES and min(width >> (drop + 1), height >> (drop + 1)) < 4:
+            break
+        drop += 1
+    return drop
+
+
+def _pack_pages(sizes, version_bits):
+    # Every page has the same size, and no block may straddle two pages.
+    largest = max(sizes, default=0)
+    for shift in range(16):
+        page_size = (0x200 << shift) * PAGE_UNITS
+        if page_size < largest:
+            continue
+        pages = []
+        positions = []
+        for size in sizes:
+            for page in pages:
+                if page["used"] + size <= page_size:
+                    break
+            else:
+                page = {"index": len(pages), "used": 0}
+                pages.append(page)
+            positions.append(page["index"] * page_size + page["used"])
+            page["used"] += size + (-size) % BLOCK_ALIGN
+        if len(pages) <= MAX_PAGES:
+            flags = version_bits | (len(pages) << 17) | shift
+            return flags, positions, len(pages) * page_size
+    raise YtdFormatError("textures don't fit in a resource")
+
+
+def _read_header(head):
+    parsed = parse_rsc7_header(head)
+    if parsed is None:
+        raise YtdFormatError("not an RSC7 resource")
+    version, system_size, graphics_size = parsed
+    if version != YTD_VERSION:
+        raise YtdFormatError(f"unsupported texture dictionary version {version}")
+    _, _, system_flags, graphics_flags = RSC7_HEADER.unpack_from(head)
+    return version, system_size, graphics_size, system_flags, graphics_flags
+
+
+def _plan(textures, max_size, graphics_flags, graphics_size):
+    # Which mips each texture keeps and where they go, or None if nothing gets smaller.
+    drops = [_levels_to_drop(texture, max_size) for texture in textures]
+    if not any(drops):
+        return None
+    if not all(texture["known"] for texture in textures):
+        raise YtdFormatError("texture in an unknown format")
+    sizes = [sum(texture["sizes"][drop:]) for texture, drop in zip(textures, drops)]
+    # Biggest blocks first so the pages fill up evenly.
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True)
+    flags, positions, new_size = _pack_pages([sizes[i] for i in order], graphics_flags & 0xF0000000)
+    if new_size >= graphics_size:
+        return None
+    return drops, order, positions, flags, new_size
+
+
+def downscale_ytd(data, max_size, level=6):
+    version, system_size, graphics_size, system_flags, graphics_flags = _read_header(data)
+    body = zlib.decompress(data[RSC7_HEADER.size:], -15)
+    if len(body) != system_size + graphics_size:
+        raise YtdFormatError("resource size doesn't match its header")
+
+    system = bytearray(body[:system_size])
+    graphics = body[system_size:]
+    textures = _read_textures(system, system_size, graphics_size)
+    plan = _plan(textures, max_size, graphics_flags, graphics_size)
+    if plan is None:
+        return None, 0, graphics_size, graphics_size
+    drops, order, positions, new_flags, new_size = plan
+
+    # Rebuild the graphics segment from the mips each texture keeps.
+    new_graphics = bytearray(new_size)
+    for i, position in zip(order, positions):
+        texture, drop = textures[i], drops[i]
+        start = texture["data_offset"] + sum(texture["sizes"][:drop])
+        block = graphics[start:texture["data_offset"] + sum(texture["sizes"])]
+        new_graphics[position:position + len(block)] = block
+        width = max(1, texture["width"] >> drop)
+        height = max(1, texture["height"] >> drop)
+        struct.pack_into("<HHHH", system, texture["offset"] + 0x50, width, height, 1, _stride(texture["format"], width))
+        struct.pack_into("<B", system, texture["offset"] + 0x5D, texture["levels"] - drop)
+        struct.pack_into("<Q", system, texture["offset"] + 0x70, GRAPHICS_BASE + position)
+
+    header = RSC7_HEADER.pack(b"RSC7", version, system_flags, new_flags)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(bytes(system)) + compressor.compress(bytes(new_graphics)) + compressor.flush()
+    return header + compressed, sum(1 for drop in drops if drop), graphics_size, new_size
+
+
+def estimate_downscaled(entry, asset, max_size):
+    # Only the system segment is inflated: it says how big every texture will be.
+    if asset.version != YTD_VERSION or not entry.name.lower().endswith(".ytd"):
+        return asset
+    try:
+        with entry.open() as f:
+            _, system_size, graphics_size, _, graphics_flags = _read_header(f.read(RSC7_HEADER.size))
+            decompressor = zlib.decompressobj(-15)
+            system = b""
+            while len(system) < system_size:
+                chunk = decompressor.unconsumed_tail or f.read(64 * 1024)
+                if not chunk:
+                    return asset
+                system += decompressor.decompress(chunk, system_size - len(system))
+        plan = _plan(_read_textures(system, system_size, graphics_size), max_size, graphics_flags, graphics_size)
+    except (YtdFormatError, zlib.error, struct.error):
+        # The downscaling pass itself warns about these.
+        return asset
+    return asset if plan is None else asset._replace(physical=plan[4])
+
+
+def _downscale_job(source, max_size):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = f.read()
+    try:
+        return downscale_ytd(source, max_size) + (None,)
+    except (YtdFormatError, zlib.error, struct.error) as e:
+        return None, 0, 0, 0, str(e)
+
+
+def _write_output(target, data, package):
+    if package is not None:
+        package.write_bytes(target, data)
+        return
+    tmp_path = target + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+
+
+def _copy_unchanged(entry, target, package):
+    if package is not None:
+        package.write_entry(entry, target)
+        return None
+    # Never written in place: after a --copy-mode link build the target is a hard link to the source.
+    digest = new_digest()
+    tmp_path = target + ".tmp"
+    with entry.open() as src, open(tmp_path, 'wb') as dst:
+        while chunk := src.read(CHUNK_SIZE):
+            dst.write(chunk)
+            digest.update(chunk)
+    os.replace(tmp_path, target)
+    return digest.hexdigest()
+
+
+def _job_source(entry):
+    if entry.is_local_file:
+        return entry.path
+    with entry.open() as f:
+        return f.read()
+
+
+def _iter_downscaled(pending, max_size, workers, cancel_token):
+    if workers == 1 or len(pending) == 1:
+        # Not worth starting a pool for.
+        for target, entry in pending:
+            check_cancelled(cancel_token)
+            yield target, entry, _downscale_job(_job_source(entry), max_size)
+        return
+
+    # Spawned rather than forked: builds run on worker threads, and forking a threaded process isn't safe.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {}
+        queue = list(reversed(pending))
+        while queue or futures:
+            check_cancelled(cancel_token)
+            # Archive members are read here and sent over; keep only a few in flight.
+            while queue and len(futures) < workers * 2:
+                target, entry = queue.pop()
+                futures[pool.submit(_downscale_job, _job_source(entry), max_size)] = (target, entry)
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                target, entry = futures.pop(future)
+                yield target, entry, future.result()
+
+
+@traced("downscale_textures")
+def downscale_textures(copies, max_size, workers=None, cache=None, package=None, report=None,
+                       on_event=None, cancel_token=None, vehicle_of=None, digests=None):
+    # Returns the copies still left to do; every .ytd is written here instead.
+    candidates = {t: e for t, e in copies.items() if e.name.lower().endswith(".ytd")}
+    remaining = {t: e for t, e in copies.items() if t not in candidates}
+    transform = f"ytd<={max_size}"
+    pending = []
+    for target, entry in candidates.items():
+        if cache is not None and cache.is_fresh(entry, target, transform):
+            if digests is not None:
+                digests[target] = cache.output_digest(target)
+            continue
+        pending.append((target, entry))
+    if not pending:
+        return remaining
+
+    emit(on_event, "phase_started", phase="textures", done=0, total=len(pending))
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    for done, (target, entry, result) in enumerate(_iter_downscaled(pending, max_size, workers, cancel_token), 1):
+        data, textures, memory_before, memory_after, error = result
+        if error is not None:
+            warn(on_event, f"Left {entry.name} as it is: {error}", entry.path)
+        if data is None:
+            output_digest = _copy_unchanged(entry, target, package)
+        else:
+            _write_output(target, data, package)
+            output_digest = hash_bytes(data) if package is None else None
+            if report is not None:
+                vehicle = vehicle_of.get(entry.path) if vehicle_of else None
+                report.append(TextureResult(
+                    vehicle, entry.path, target, textures, entry.size, len(data), memory_before, memory_after
+                ))
+        if cache is not None:
+            cache.record(entry, target, transform=transform, output_digest=output_digest)
+        if digests is not None:
+            digests[target] = output_digest
+        emit(on_event, "phase_started", phase="textures", path=target, done=done, total=len(pending))
+    return remaining
+
+
+def bytes_saved_by_vehicle(results):
+    saved = {}
+    for result in results:
+        total = saved.setdefault(result.vehicle, {"files": 0, "textures": 0, "bytes": 0, "memory": 0})
+        total["files"] += 1
+        total["textures"] += result.textures
+        total["bytes"] += result.before - result.after
+        total["memory"] += result.memory_before - result.memory_after
+    return saved
+
+
+def format_texture_report(results):
+    lines = []
+    for vehicle, total in sorted(bytes_saved_by_vehicle(results).items(), key=lambda item: str(item[0])):
+        lines.append(
+            f"{vehicle or '?':<24} {total['textures']:>4} textures in {total['files']:>3} files: "
+            f"{total['bytes'] / (1024 * 1024):.1f} MiB smaller on disk, "
+            f"{total['memory'] / (1024 * 1024):.1f} MiB less graphics memory"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,187 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Per thread, so jobs running side by side (server workers, GUI conversions) each
+# record into their own tracer. Pool threads start without one; see bind_tracer.
+_active = contextvars.ContextVar("converter_tracer", default=None)
+
+
+def _now_us():
+    # perf_counter is system-wide on the platforms we ship, so spans recorded in
+    # worker processes line up with the parent's.
+    return time.perf_counter_ns() / 1000
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.cat, self.start, _now_us(), self.args)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, cat="converter", **args):
+        return _Span(self, name, cat, args)
+
+    def add(self, name, cat, start, end, args):
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X", "ts": start, "dur": end - start,
+            "pid": self.pid, "tid": thread.ident, "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+            if thread.ident not in self._threads:
+                self._threads[thread.ident] = thread.name
+                self.events.append({
+                    "name": "thread_name", "ph": "M", "pid": self.pid, "tid": thread.ident,
+                    "args": {"name": thread.name},
+                })
+
+    def extend(self, events):
+        with self._lock:
+            self.events.extend(events)
+
+    def chrome_trace(self):
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def totals(self):
+        totals = defaultdict(lambda: {"count": 0, "seconds": 0.0, "bytes": 0})
+        for event in self.events:
+            if event["ph"] != "X":
+                continue
+            total = totals[event["name"]]
+            total["count"] += 1
+            total["seconds"] += event["dur"] / 1_000_000
+            total["bytes"] += event["args"].get("bytes", 0)
+        return dict(totals)
+
+    def summary(self, limit=15):
+        # Spans nest and copy spans run in parallel, so totals are busy time, not wall time.
+        rows = sorted(self.totals().items(), key=lambda item: item[1]["seconds"], reverse=True)
+        lines = [f"{'span':<30} {'count':>7} {'total':>10} {'bytes':>10} {'rate':>12}"]
+        for name, total in rows[:limit]:
+            rate = ""
+            if total["bytes"] and total["seconds"]:
+                rate = f"{total['bytes'] / total['seconds'] / (1024 * 1024):.1f} MB/s"
+            size = f"{total['bytes'] / (1024 * 1024):.1f} MB" if total["bytes"] else ""
+            lines.append(
+                f"{name:<30} {total['count']:>7} {total['seconds'] * 1000:>8.1f}ms {size:>10} {rate:>12}"
+            )
+        return "\n".join(lines)
+
+
+def span(name, cat="converter", **args):
+    tracer = _active.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, cat, **args)
+
+
+def traced(name=None, cat="converter"):
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind_tracer(func):
+    # For work handed to a pool thread: runs func under the submitting thread's tracer.
+    tracer = _active.get()
+    if tracer is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _active.set(tracer)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return wrapper
+
+
+def active_tracer():
+    return _active.get()
+
+
+def start_tracing():
+    tracer = Tracer()
+    _active.set(tracer)
+    return tracer
+
+
+def stop_tracing():
+    tracer = _active.get()
+    _active.set(None)
+    return tracer
+
+
+@contextmanager
+def tracing(path=None):
+    tracer = start_tracing()
+    try:
+        yield tracer
+    finally:
+        stop_tracing()
+        if path:
+            tracer.write(path)
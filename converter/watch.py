@@ -0,0 +1,189 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from .events import check_cancelled
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 0.5
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    def __init__(self, roots):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        for root in roots:
+            self._watch_tree(root)
+
+    def _watch_tree(self, root):
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            wd = self._add_watch(self._fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                continue
+            self._dirs[wd] = current
+            try:
+                with os.scandir(current) as it:
+                    pending.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+            except OSError:
+                pass
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; report every watched folder as changed.
+                changed.update(self._dirs.values())
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            folder = self._dirs.get(wd)
+            if folder is None:
+                continue
+            path = os.path.join(folder, os.fsdecode(name)) if name else folder
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New subfolders need their own watch; files already inside are changes too.
+                self._watch_tree(path)
+                changed.update(_snapshot([path]))
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _snapshot(roots):
+    state = {}
+    pending = list(roots)
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        state[entry.path] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            continue
+    return state
+
+
+class _PollingBackend:
+    def __init__(self, roots, interval=DEFAULT_POLL_INTERVAL):
+        self._roots = roots
+        self._interval = interval
+        self._state = _snapshot(roots)
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self._interval))
+        state = _snapshot(self._roots)
+        old = self._state
+        self._state = state
+        changed = {path for path, stat in state.items() if old.get(path) != stat}
+        changed.update(path for path in old if path not in state)
+        return changed
+
+    def close(self):
+        pass
+
+
+class SourceWatcher:
+    def __init__(self, roots, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+                 force_polling=False, ignore=()):
+        self.roots = [os.path.abspath(root) for root in roots]
+        # Output folders often live inside the watched tree; writing them must not trigger a rebuild.
+        self.ignore = [os.path.abspath(path) for path in ignore]
+        self.debounce = debounce
+        self.backend = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self.backend = _InotifyBackend(self.roots)
+                self.kind = "inotify"
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = _PollingBackend(self.roots, poll_interval)
+            self.kind = "polling"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.backend.close()
+
+    def wait(self, cancel_token=None):
+        changed = set()
+        while not changed:
+            check_cancelled(cancel_token)
+            changed = self._read(0.2)
+        # Editors and exporters save in bursts; wait until things go quiet.
+        while True:
+            check_cancelled(cancel_token)
+            more = self._read(self.debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def _read(self, timeout):
+        changed = self.backend.read(timeout)
+        if self.ignore:
+            changed = {path for path in changed if not affected_sources([path], self.ignore)}
+        return changed
+
+
+def affected_sources(changed, sources):
+    affected = set()
+    for path in changed:
+        for source in sources:
+            if path == source or path.startswith(source.rstrip(os.sep) + os.sep):
+                affected.add(source)
+    return affected
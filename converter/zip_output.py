@@ -0,0 +1,139 @@
+import os
+import time
+import zipfile
+
+from .copy_engine import CopyResult
+from .events import check_cancelled, emit
+from .hashing import CHUNK_SIZE, hash_bytes, new_digest
+from .integrity import MANIFEST_FILE, render_manifest
+from .tracing import span, traced
+
+OUTPUT_FORMATS = ("folder", "zip")
+RSC7_MAGIC = b"RSC7"
+STORED_EXTENSIONS = (".awc",)
+
+
+def compress_type_for(name, head):
+    # RSC7 resources and audio banks are already compressed; deflating them
+    # again costs CPU for a few bytes at best.
+    if head.startswith(RSC7_MAGIC) or name.lower().endswith(STORED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _date_time(mtime):
+    return time.localtime(max(mtime, 315532800))[:6]
+
+
+class ZipPackage:
+    def __init__(self, output_path, checksums=False):
+        self.output_path = output_path
+        # relative path -> (size, digest) of every member, hashed as it's written.
+        self.digests = {} if checksums else None
+        self.path = output_path + ".zip"
+        self.prefix = os.path.basename(os.path.normpath(output_path))
+        self._tmp_path = self.path + ".tmp"
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", allowZip64=True)
+        self._names = set()
+        self.committed = False
+
+    def _rel(self, target):
+        return os.path.relpath(target, self.output_path).replace(os.sep, "/")
+
+    def arcname(self, target):
+        return f"{self.prefix}/{self._rel(target)}"
+
+    def _info(self, target, compress_type, mtime=None, size=0):
+        name = self.arcname(target)
+        if name in self._names:
+            raise ValueError(f"Duplicate entry in package: {name}")
+        self._names.add(name)
+        info = zipfile.ZipInfo(name, _date_time(time.time() if mtime is None else mtime))
+        info.compress_type = compress_type
+        info.file_size = size
+        info.external_attr = 0o644 << 16
+        return info
+
+    def write_entry(self, entry, target):
+        with span("zip_entry", path=entry.path, bytes=entry.size), entry.open() as src:
+            head = src.read(CHUNK_SIZE)
+            compress_type = compress_type_for(entry.name, head)
+            info = self._info(target, compress_type, entry.mtime, entry.size)
+            # file_size lets zipfile decide up front whether the entry needs zip64.
+            digest = new_digest() if self.digests is not None else None
+            with self._zip.open(info, "w") as dst:
+                chunk = head
+                while chunk:
+                    dst.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    chunk = src.read(CHUNK_SIZE)
+        if digest is not None:
+            self.digests[self._rel(target)] = (entry.size, digest.hexdigest())
+        return "stored" if compress_type == zipfile.ZIP_STORED else "deflated"
+
+    def write_chunks(self, target, chunks):
+        info = self._info(target, zipfile.ZIP_DEFLATED)
+        digest = new_digest() if self.digests is not None else None
+        size = 0
+        with self._zip.open(info, "w") as dst:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                dst.write(data)
+                if digest is not None:
+                    digest.update(data)
+                    size += len(data)
+        if digest is not None:
+            self.digests[self._rel(target)] = (size, digest.hexdigest())
+
+    def write_bytes(self, target, data):
+        info = self._info(target, compress_type_for(os.path.basename(target), data[:len(RSC7_MAGIC)]), size=len(data))
+        self._zip.writestr(info, data)
+        if self.digests is not None:
+            self.digests[self._rel(target)] = (len(data), hash_bytes(data))
+
+    def write_text(self, target, text):
+        self.write_chunks(target, [text])
+
+    def close(self):
+        if self.digests is not None:
+            info = self._info(os.path.join(self.output_path, MANIFEST_FILE), zipfile.ZIP_DEFLATED)
+            self._zip.writestr(info, render_manifest(self.digests))
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+        self.committed = True
+
+    def discard(self):
+        if self.committed:
+            return
+        self._zip.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+@traced("zip_files")
+def write_files(copies, package, report=None, on_event=None, cancel_token=None):
+    files_total = len(copies)
+    bytes_total = sum(entry.size for entry in copies.values())
+    bytes_done = 0
+    results = []
+
+    emit(on_event, "phase_started", phase="copy", done=0, total=files_total, bytes_total=bytes_total)
+    # zipfile writes one member at a time, so there is nothing to gain from a thread pool here.
+    for index, (target, entry) in enumerate(copies.items()):
+        check_cancelled(cancel_token)
+        method = package.write_entry(entry, target)
+        result = CopyResult(entry.path, package.arcname(target), method, None)
+        results.append(result)
+        bytes_done += entry.size
+        emit(on_event, "bytes_copied", phase="copy", path=result.dst, done=index + 1,
+             total=files_total, bytes_done=bytes_done, bytes_total=bytes_total, data=result)
+
+    if report is not None:
+        report.extend(results)
+    return results
@@ -0,0 +1,44 @@
+import traceback
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from converter.events import CancelToken, ConversionCancelled
+
+
+class ConversionWorker(QObject):
+    progress_event = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, *args, **kwargs):
+        super().__init__()
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_token = CancelToken()
+
+    def run(self):
+        try:
+            result = self.task(
+                *self.args, on_event=self.progress_event.emit, cancel_token=self.cancel_token, **self.kwargs
+            )
+        except ConversionCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e, traceback.format_exc())
+        else:
+            self.finished.emit(result)
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+
+def start_worker(parent, worker):
+    thread = QThread(parent)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for signal in (worker.finished, worker.failed, worker.cancelled):
+        signal.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QMessageBox
 from gui.translator import load_language
+from converter.archive_input import is_archive
 
 class FolderSelectPage(QWidget):
     def __init__(self, language_code='en'):
@@ -76,5 +77,5 @@ class DragDropLabel(QLabel):
         urls = event.mimeData().urls()
         if urls:
             folder_path = urls[0].toLocalFile()
-            if os.path.isdir(folder_path):
+            if os.path.isdir(folder_path) or is_archive(folder_path):
                 self.parent().handle_folder_drop(folder_path)
\ No newline at end of file
@@ -1,18 +1,125 @@
 import os
-import re
-import traceback
+import time
+from collections import Counter
 from PyQt6.QtWidgets import (
     QMainWindow, QStackedWidget, QFileDialog, QMessageBox, QPushButton, QToolBar, QWidget, QSizePolicy, QHBoxLayout
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt
 from .welcome_page import WelcomePage
-from .folder_select_page import FolderSelectPage
-from .progress_page import ConversionProgressPage
-from .multi_vehicle_page import MultiVehicleCompilerPage
-from .utils import load_settings, save_settings, open_folder
-from .settings_dialog import SettingsDialog
-from .help_dialog import HelpDialog
-from converter import build_fivem_resource
+from .utils import load_settings, save_settings, open_folder, asset_limits_from_settings
+from .conversion_worker import ConversionWorker, start_worker
+from converter.events import ConversionCancelled, emit
+
+# The other pages, dialogs and the converter itself are imported when they are
+# first needed, so the window shows up without loading them.
+
+
+def get_model_name(folder_path, inventory=None, meta_cache=None):
+    from converter.archive_input import scan_source
+    from converter.c_utils import find_model_name
+
+    if inventory is None:
+        inventory = scan_source(folder_path)
+    if inventory.find("vehicles.meta") is None:
+        print("vehicles.meta not found in folder:", folder_path)
+        return None
+
+    model_name = find_model_name(folder_path, inventory, meta_cache)
+    if not model_name:
+        print("No <modelName> found in vehicles.meta.")
+    return model_name
+
+
+def convert_vehicle(folder, output_dir, settings, meta_cache=None, on_event=None, cancel_token=None):
+    from converter.archive_input import scan_source
+    from converter.convert import build_fivem_resource
+    from converter.tracing import start_tracing, stop_tracing
+
+    tracer = start_tracing() if settings.get("trace") else None
+    inventory = scan_source(folder)
+    try:
+        model_name = get_model_name(folder, inventory, meta_cache)
+        fallback_name = not model_name
+        if fallback_name:
+            model_name = "convertedcar"
+
+        output_folder = os.path.join(output_dir, model_name)
+        copy_report = []
+        asset_report = []
+        texture_report = []
+        stream_files, meta_files, audio_files = build_fivem_resource(
+            folder, output_folder, inventory=inventory,
+            workers=settings.get("copy_workers"),
+            copy_mode=settings.get("copy_mode", "copy"),
+            copy_report=copy_report,
+            output_format=settings.get("output_format", "folder"),
+            asset_limits=asset_limits_from_settings(settings),
+            asset_report=asset_report,
+            texture_max_size=settings.get("max_texture_size"),
+            texture_report=texture_report,
+            checksums=settings.get("checksums", False),
+            meta_cache=meta_cache,
+            on_event=on_event,
+            cancel_token=cancel_token
+        )
+    finally:
+        inventory.close()
+        if tracer is not None:
+            stop_tracing()
+    if settings.get("output_format") == "zip":
+        output_folder += ".zip"
+    result = {
+        "model_name": model_name,
+        "fallback_name": fallback_name,
+        "output_folder": output_folder,
+        "stream_files": stream_files,
+        "meta_files": meta_files,
+        "audio_files": audio_files,
+        "copy_report": copy_report,
+        "asset_report": asset_report,
+        "texture_report": texture_report,
+    }
+    if tracer is not None:
+        result["trace_path"] = os.path.join(output_dir, f"{model_name}.trace.json")
+        result["trace_summary"] = tracer.summary()
+        tracer.write(result["trace_path"])
+    return result
+
+
+def format_copy_methods(copy_report):
+    methods = Counter(r.method for r in copy_report)
+    return ", ".join(f"{m}: {n}" for m, n in sorted(methods.items()))
+
+
+def watch_vehicle(folder, output_dir, settings, meta_cache=None, on_event=None, cancel_token=None):
+    from converter.watch import SourceWatcher, affected_sources
+
+    # An archive is a single file, so watch the folder it sits in.
+    root = folder if os.path.isdir(folder) else os.path.dirname(folder)
+
+    def forward_warnings(event):
+        if event.kind == "warning":
+            on_event(event)
+
+    with SourceWatcher([root], ignore=[output_dir]) as watcher:
+        while True:
+            changed = watcher.wait(cancel_token)
+            if not affected_sources(changed, [folder]):
+                continue
+            started = time.perf_counter()
+            try:
+                result = convert_vehicle(folder, output_dir, settings, meta_cache, forward_warnings, cancel_token)
+            except ConversionCancelled:
+                raise
+            except Exception as e:
+                # Exporters often leave files half-written for a moment; the next save rebuilds again.
+                emit(on_event, "rebuilt", message=f"\u274c Rebuild failed: {e}")
+                continue
+            emit(
+                on_event, "rebuilt", data=result,
+                message=f"\U0001f501 Rebuilt {result['model_name']} in {time.perf_counter() - started:.2f}s "
+                        f"[{format_copy_methods(result['copy_report'])}]"
+            )
 
 
 class MainWindow(QMainWindow):
@@ -22,25 +129,26 @@ class MainWindow(QMainWindow):
         self.resize(500, 500)
 
         self.settings = load_settings()
+        self.meta_cache = None
+        self.conversion_worker = None
+        self.conversion_thread = None
+        self.watch_worker = None
+        self.watch_thread = None
         self.language = self.settings.get("language", "en")
 
         self.stack = QStackedWidget()
         self.single_vehicle_page = QWidget()
-        self.multi_vehicle_page = MultiVehicleCompilerPage(language_code=self.language)
+        # Only the first page is built up front, the rest on first navigation.
+        self._pages = {}
 
         self.welcome_page = WelcomePage(language_code=self.language)
-        self.folder_select_page = FolderSelectPage(language_code=self.language)
-        self.progress_page = ConversionProgressPage(language_code=self.language)
 
         self.inner_stack = QStackedWidget()
         self.inner_stack.addWidget(self.welcome_page)
-        self.inner_stack.addWidget(self.folder_select_page)
-        self.inner_stack.addWidget(self.progress_page)
         self.single_vehicle_page.setLayout(QHBoxLayout())
         self.single_vehicle_page.layout().addWidget(self.inner_stack)
 
         self.stack.addWidget(self.single_vehicle_page)
-        self.stack.addWidget(self.multi_vehicle_page)
         self.setCentralWidget(self.stack)
 
         self.init_toolbar()
@@ -52,11 +160,36 @@ class MainWindow(QMainWindow):
         self.welcome_page.browse_button.clicked.connect(self.select_output_dir)
         self.welcome_page.next_button.clicked.connect(self.goto_folder_select)
 
-        self.folder_select_page.browse_button.clicked.connect(self.select_mod_folder)
-        self.folder_select_page.back_button.clicked.connect(lambda: self.inner_stack.setCurrentWidget(self.welcome_page))
-
-        self.progress_page.done_button.clicked.connect(self.restart_app)
-        self.progress_page.back_button.clicked.connect(lambda: self.inner_stack.setCurrentWidget(self.welcome_page))
+    @property
+    def folder_select_page(self):
+        page = self._pages.get("folder_select")
+        if page is None:
+            from .folder_select_page import FolderSelectPage
+            page = self._pages["folder_select"] = FolderSelectPage(language_code=self.language)
+            page.browse_button.clicked.connect(self.select_mod_folder)
+            page.back_button.clicked.connect(lambda: self.inner_stack.setCurrentWidget(self.welcome_page))
+            self.inner_stack.addWidget(page)
+        return page
+
+    @property
+    def progress_page(self):
+        page = self._pages.get("progress")
+        if page is None:
+            from .progress_page import ConversionProgressPage
+            page = self._pages["progress"] = ConversionProgressPage(language_code=self.language)
+            page.done_button.clicked.connect(self.restart_app)
+            page.back_button.clicked.connect(lambda: self.inner_stack.setCurrentWidget(self.welcome_page))
+            self.inner_stack.addWidget(page)
+        return page
+
+    @property
+    def multi_vehicle_page(self):
+        page = self._pages.get("multi_vehicle")
+        if page is None:
+            from .multi_vehicle_page import MultiVehicleCompilerPage
+            page = self._pages["multi_vehicle"] = MultiVehicleCompilerPage(language_code=self.language)
+            self.stack.addWidget(page)
+        return page
 
     def init_toolbar(self):
         toolbar = QToolBar()
@@ -104,8 +237,23 @@ class MainWindow(QMainWindow):
         toolbar.addWidget(help_btn)
 
     def open_settings_dialog(self):
+        from .settings_dialog import SettingsDialog
+
         dialog = SettingsDialog(current_lang=self.language, parent=self)
         if dialog.exec():
+            self.settings["copy_workers"] = dialog.get_copy_workers()
+            self.settings["copy_mode"] = dialog.get_copy_mode()
+            self.settings["conflict_policy"] = dialog.get_conflict_policy()
+            self.settings["dedupe_metas"] = dialog.get_dedupe_metas()
+            self.settings["remap_kit_ids"] = dialog.get_remap_kit_ids()
+            self.settings["shard_size_mb"] = dialog.get_shard_size_mb()
+            self.settings["max_asset_mb"] = dialog.get_max_asset_mb()
+            self.settings["fail_over_budget"] = dialog.get_fail_over_budget()
+            self.settings["max_texture_size"] = dialog.get_max_texture_size()
+            self.settings["output_format"] = dialog.get_output_format()
+            self.settings["checksums"] = dialog.get_checksums()
+            self.settings["trace"] = dialog.get_trace_enabled()
+            save_settings(self.settings)
             new_lang = dialog.get_selected_language()
             if new_lang != self.language:
                 self.language = new_lang
@@ -114,6 +262,8 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "Restart Required", "Please restart the app to apply language changes.")
 
     def open_help_dialog(self):
+        from .help_dialog import HelpDialog
+
         dialog = HelpDialog(self)
         dialog.exec()
 
@@ -150,70 +300,131 @@ class MainWindow(QMainWindow):
                 self.run_conversion()
 
     def run_conversion(self):
+        if self.conversion_worker is not None:
+            return
+        self.stop_watching(wait=True)
         self.inner_stack.setCurrentWidget(self.progress_page)
         self.progress_page.status_label.setText("Converting... Please wait.")
-        QTimer.singleShot(100, self.convert_files)
-
-    def convert_files(self):
-        output_dir = self.welcome_page.output_dir_input.text()
-        open_when_done = self.welcome_page.open_when_done.isChecked()
-
-        try:
-            model_name = self.get_model_name(self.selected_mod_folder)
-            if not model_name:
-                self.progress_page.summary_text.append("\u26a0\ufe0f Warning: vehicles.meta missing or malformed. Using fallback model name: convertedcar")
-                model_name = "convertedcar"
-
-            output_folder = os.path.join(output_dir, model_name)
-
-            self.progress_page.summary_text.clear()
-            self.progress_page.summary_text.append("\ud83e\udde0 Reading metadata files...")
-            self.progress_page.summary_text.append("\ud83d\udce6 Packing meta files into a data folder...")
-            self.progress_page.summary_text.append("\ud83c\udfa8 Streaming textures and models into place...")
-            self.progress_page.summary_text.append("\ud83d\uddd8 Generating fxmanifest.lua and vehicle_names.lua...")
-            self.progress_page.summary_text.append("\ud83e\uddf9 Doing a little cleanup and prep...")
-
-            stream_files, meta_files = build_fivem_resource(
-                self.selected_mod_folder, output_folder
-            )
-
-            self.progress_page.status_label.setText("\u2705 Conversion complete!")
-            summary = f"Model: {model_name}\nStreamed files: {len(stream_files)}\nMeta files: {len(meta_files)}\nSaved to: {output_folder}"
-            self.progress_page.summary_text.append("\n" + summary)
-
-            if open_when_done:
-                open_folder(output_folder)
-
-        except Exception as e:
-            self.progress_page.status_label.setText("\u274c Conversion failed.")
-            error_details = traceback.format_exc()
-            self.progress_page.summary_text.setText(f"Error: {str(e)}\n\nDetails:\n{error_details}")
-
-    def get_model_name(self, folder_path):
-        vehicles_meta = None
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                if file == "vehicles.meta":
-                    vehicles_meta = os.path.join(root, file)
-                    break
-        if not vehicles_meta:
-            print("vehicles.meta not found in folder:", folder_path)
-            return None
-
-        try:
-            with open(vehicles_meta, 'r', encoding='utf-8') as f:
-                content = f.read()
-            matches = re.findall(r"<modelName>\s*(.*?)\s*</modelName>", content)
-            if matches:
-                return matches[0]
-            else:
-                print("No <modelName> found in vehicles.meta.")
-                return None
-        except Exception as e:
-            print(f"Error reading or parsing vehicles.meta: {e}")
-            return None
+        self.progress_page.summary_text.clear()
+        self.progress_page.start_progress()
+
+        if self.meta_cache is None:
+            from converter.meta_cache import open_meta_cache
+            self.meta_cache = open_meta_cache()
+
+        self.conversion_worker = ConversionWorker(
+            convert_vehicle,
+            self.selected_mod_folder,
+            self.welcome_page.output_dir_input.text(),
+            self.settings,
+            self.meta_cache
+        )
+        self.conversion_worker.progress_event.connect(self.progress_page.update_progress)
+        self.conversion_worker.finished.connect(self.on_conversion_finished)
+        self.conversion_worker.failed.connect(self.on_conversion_failed)
+        self.conversion_worker.cancelled.connect(self.on_conversion_cancelled)
+        self.progress_page.cancel_button.clicked.connect(self.conversion_worker.cancel)
+        self.conversion_thread = start_worker(self, self.conversion_worker)
+
+    def end_conversion(self):
+        self.progress_page.cancel_button.clicked.disconnect(self.conversion_worker.cancel)
+        self.progress_page.stop_progress()
+        self.conversion_worker = None
+        self.conversion_thread = None
+
+    def on_conversion_finished(self, result):
+        from converter.asset_budget import format_asset_report
+        from converter.texture_downscale import format_texture_report
+
+        self.end_conversion()
+        if result["fallback_name"]:
+            self.progress_page.summary_text.append(f"\u26a0\ufe0f Warning: vehicles.meta missing or malformed. Using fallback model name: {result['model_name']}")
+
+        self.progress_page.status_label.setText("\u2705 Conversion complete!")
+        methods_text = format_copy_methods(result["copy_report"])
+        summary = f"Model: {result['model_name']}\nStreamed files: {len(result['stream_files'])}\nMeta files: {len(result['meta_files'])}\nCopy methods: {methods_text}\nSaved to: {result['output_folder']}"
+        self.progress_page.summary_text.append("\n" + summary)
+        if result["asset_report"]:
+            self.progress_page.show_asset_report(format_asset_report(result["asset_report"]))
+        if result["texture_report"]:
+            self.progress_page.show_texture_report(format_texture_report(result["texture_report"]))
+        if "trace_summary" in result:
+            self.progress_page.show_trace_summary(result["trace_summary"], result["trace_path"])
+
+        if self.welcome_page.open_when_done.isChecked():
+            output = result["output_folder"]
+            open_folder(os.path.dirname(output) if output.endswith(".zip") else output)
+
+        if self.welcome_page.watch_for_changes.isChecked():
+            self.start_watching()
+
+    def start_watching(self):
+        self.watch_worker = ConversionWorker(
+            watch_vehicle,
+            self.selected_mod_folder,
+            self.welcome_page.output_dir_input.text(),
+            self.settings,
+            self.meta_cache
+        )
+        self.watch_worker.progress_event.connect(self.on_watch_event)
+        self.watch_worker.failed.connect(self.on_watch_failed)
+        self.watch_worker.cancelled.connect(self.on_watch_stopped)
+        self.progress_page.cancel_button.clicked.connect(self.stop_watching)
+        self.progress_page.cancel_button.show()
+        self.progress_page.cancel_button.setEnabled(True)
+        self.progress_page.status_label.setText("\U0001f440 Watching for changes...")
+        self.watch_thread = start_worker(self, self.watch_worker)
+
+    def stop_watching(self, wait=False):
+        if self.watch_worker is None:
+            return
+        self.watch_worker.cancel()
+        if wait:
+            # Clean up here rather than in the queued signal, which may arrive after a new watch started.
+            self.watch_worker.cancelled.disconnect(self.on_watch_stopped)
+            self.watch_worker.failed.disconnect(self.on_watch_failed)
+            self.watch_thread.quit()
+            self.watch_thread.wait()
+            self.on_watch_stopped()
+
+    def on_watch_event(self, event):
+        self.progress_page.summary_text.append(event.message)
+
+    def on_watch_failed(self, error, error_details):
+        self.on_watch_stopped()
+        self.progress_page.summary_text.append(f"\u274c Watching stopped: {error}")
+
+    def on_watch_stopped(self):
+        self.progress_page.cancel_button.clicked.disconnect(self.stop_watching)
+        self.progress_page.cancel_button.hide()
+        self.progress_page.status_label.setText("\u2705 Conversion complete!")
+        self.watch_worker = None
+        self.watch_thread = None
+
+    def on_conversion_failed(self, error, error_details):
+        self.end_conversion()
+        self.progress_page.status_label.setText("\u274c Conversion failed.")
+        self.progress_page.summary_text.setText(f"Error: {str(error)}\n\nDetails:\n{error_details}")
+
+    def on_conversion_cancelled(self):
+        self.end_conversion()
+        self.progress_page.status_label.setText("\u26d4 Conversion cancelled.")
+
+    def get_model_name(self, folder_path, inventory=None):
+        return get_model_name(folder_path, inventory, self.meta_cache)
+
+    def closeEvent(self, event):
+        if self.conversion_worker is not None:
+            self.conversion_worker.cancel()
+            self.conversion_thread.quit()
+            self.conversion_thread.wait()
+        self.stop_watching(wait=True)
+        if "multi_vehicle" in self._pages:
+            self.multi_vehicle_page.cancel_and_wait()
+        super().closeEvent(event)
 
     def restart_app(self):
+        self.stop_watching(wait=True)
         self.inner_stack.setCurrentWidget(self.folder_select_page)
         self.folder_select_page.instruction.setText("Drag and drop or browse to a folder containing extracted GTA mod files")
         self.folder_select_page.drag_drop_label.setText("\u2b07\ufe0f Drag and drop a folder here \u2b07\ufe0f")
@@ -1,15 +1,36 @@
 import os
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
-    QFileDialog, QCheckBox, QHBoxLayout, QSpacerItem, QSizePolicy
+    QFileDialog, QCheckBox, QHBoxLayout, QProgressBar
 )
-from converter import build_combined_fivem_resource
-import webbrowser
+# Submodules rather than the package, so PyInstaller sees what the lazy exports load.
+from converter.dedup import StreamConflictError
+from converter.build_cache import STAGING_SUFFIX
+from gui.utils import load_settings, asset_limits_from_settings
+from gui.conversion_worker import ConversionWorker, start_worker
+from gui.vehicle_table import create_vehicle_table
+
+
+def is_output_folder(name, full_path, final_output):
+    # Our own output, its staging folder and its shards live next to the vehicles.
+    output_folder_name = os.path.basename(final_output)
+    if full_path == final_output or name in (output_folder_name, output_folder_name + STAGING_SUFFIX):
+        return True
+    suffix = name[len(output_folder_name) + 1:]
+    return name.startswith(output_folder_name + "_") and suffix.split(".")[0].isdigit()
+
 
 class MultiVehicleCompilerPage(QWidget):
     def __init__(self, language_code='en'):
         super().__init__()
         self.language_code = language_code
+        self.worker = None
+        self.worker_thread = None
+        self.scan_worker = None
+        self.scan_thread = None
+        self.scan_pending = []
+        self.scan_progress = (0, 0)
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
         self.setup_ui()
@@ -37,6 +58,33 @@ class MultiVehicleCompilerPage(QWidget):
         self.browse_button.clicked.connect(self.browse_folder)
         self.layout.addWidget(self.browse_button)
 
+        filter_layout = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("🔍 Filter vehicles...")
+        self.filter_input.textChanged.connect(self.filter_vehicles)
+        self.select_all_button = QPushButton("Select all")
+        self.select_all_button.clicked.connect(lambda: self.check_visible(True))
+        self.select_none_button = QPushButton("Select none")
+        self.select_none_button.clicked.connect(lambda: self.check_visible(False))
+        filter_layout.addWidget(self.filter_input)
+        filter_layout.addWidget(self.select_all_button)
+        filter_layout.addWidget(self.select_none_button)
+        self.layout.addLayout(filter_layout)
+
+        self.vehicle_table, self.vehicle_model, self.vehicle_proxy = create_vehicle_table(self)
+        self.vehicle_model.dataChanged.connect(self.update_selection_status)
+        self.vehicle_model.rowsInserted.connect(self.update_selection_status)
+        self.vehicle_model.modelReset.connect(self.update_selection_status)
+        self.layout.addWidget(self.vehicle_table, 1)
+
+        self.selection_label = QLabel("")
+        self.layout.addWidget(self.selection_label)
+
+        # Scan results arrive per vehicle; adding them in batches keeps the table responsive.
+        self.scan_timer = QTimer(self)
+        self.scan_timer.setInterval(100)
+        self.scan_timer.timeout.connect(self.flush_scanned)
+
         self.output_dir_label = QLabel("Select output directory:")
         self.layout.addWidget(self.output_dir_label)
 
@@ -57,16 +105,23 @@ class MultiVehicleCompilerPage(QWidget):
         self.compile_button.clicked.connect(self.start_compilation)
         self.layout.addWidget(self.compile_button)
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        self.layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("⛔ Cancel")
+        self.cancel_button.hide()
+        self.layout.addWidget(self.cancel_button)
+
         self.status_label = QLabel("")
         self.status_label.setWordWrap(True)
         self.layout.addWidget(self.status_label)
 
-        self.layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
-
     def browse_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Parent Folder Containing Vehicles")
         if folder_path:
             self.folder_input.setText(folder_path)
+            self.start_scan(folder_path)
 
     def select_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Output Folder")
@@ -84,46 +139,271 @@ class MultiVehicleCompilerPage(QWidget):
                 folder_path = urls[0].toLocalFile()
                 if os.path.isdir(folder_path):
                     self.folder_input.setText(folder_path)
+                    self.start_scan(folder_path)
                     event.accept()
                     return True
         return super().eventFilter(source, event)
 
+    def final_output_path(self):
+        return os.path.abspath(os.path.join(self.output_dir_input.text(), "your_cars_resource"))
+
+    def start_scan(self, input_path):
+        self.cancel_scan()
+        self.vehicle_model.clear()
+        self.scan_pending = []
+        self.compile_button.setEnabled(False)
+        self.status_label.setText("🔍 Scanning vehicle folders...")
+        final_output = self.final_output_path()
+
+        def skip(name):
+            return is_output_folder(name, os.path.abspath(os.path.join(input_path, name)), final_output)
+
+        self.scan_worker = ConversionWorker(scan_vehicles, input_path, skip)
+        self.scan_worker.progress_event.connect(self.on_vehicle_scanned)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.failed.connect(self.on_scan_failed)
+        self.scan_worker.cancelled.connect(self.on_scan_cancelled)
+        self.scan_thread = start_worker(self, self.scan_worker)
+        self.scan_timer.start()
+
+    def is_current_scan(self):
+        # Signals from a scan that was replaced by a newer one can still be queued.
+        return self.scan_worker is not None and self.sender() is self.scan_worker
+
+    def on_vehicle_scanned(self, event):
+        if event.kind == "vehicle_scanned" and self.is_current_scan():
+            self.scan_pending.append(event.data)
+            self.scan_progress = (event.done, event.total)
+
+    def flush_scanned(self):
+        pending, self.scan_pending = self.scan_pending, []
+        self.vehicle_model.append_rows(pending)
+        if self.scan_worker is not None and pending:
+            done, total = self.scan_progress
+            self.status_label.setText(f"🔍 Scanning vehicle folders... {done}/{total}")
+
+    def end_scan(self):
+        self.scan_timer.stop()
+        self.flush_scanned()
+        self.scan_worker = None
+        self.scan_thread = None
+        if self.worker is None:
+            self.compile_button.setEnabled(True)
+
+    def on_scan_finished(self, summaries):
+        if not self.is_current_scan():
+            return
+        self.end_scan()
+        warned = sum(1 for summary in summaries if summary.warnings)
+        status = f"✅ Found {len(summaries)} folders"
+        if warned:
+            status += f", ⚠️ {warned} with warnings"
+        self.status_label.setText(status)
+
+    def on_scan_failed(self, error, error_details):
+        if not self.is_current_scan():
+            return
+        self.end_scan()
+        self.status_label.setText(f"❌ Scan failed: {str(error)}")
+
+    def on_scan_cancelled(self):
+        if self.is_current_scan():
+            self.end_scan()
+
+    def cancel_scan(self):
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            self.scan_thread.quit()
+            self.scan_thread.wait()
+            self.end_scan()
+
+    def filter_vehicles(self, text):
+        self.vehicle_proxy.setFilterFixedString(text)
+        self.update_selection_status()
+
+    def check_visible(self, checked):
+        self.vehicle_model.set_checked(self.vehicle_proxy.visible_source_rows(), checked)
+
+    def update_selection_status(self, *args):
+        total = self.vehicle_model.rowCount()
+        checked = sum(self.vehicle_model.checked)
+        shown = self.vehicle_proxy.rowCount()
+        text = f"{checked} of {total} selected"
+        if shown != total:
+            text += f" ({shown} shown)"
+        self.selection_label.setText(text if total else "")
+
     def start_compilation(self):
+        if self.worker is not None or self.scan_worker is not None:
+            return
         input_path = self.folder_input.text()
-        output_path = self.output_dir_input.text()
 
         if not os.path.isdir(input_path):
             self.status_label.setText("⚠️ Invalid vehicle folder selected.")
             return
-        
-        final_output = os.path.abspath(os.path.join(output_path, "your_cars_resource"))
-        output_folder_name = os.path.basename(final_output)
-
-        vehicle_folders = []
-        for name in os.listdir(input_path):
-            full_path = os.path.abspath(os.path.join(input_path, name))
-            if not os.path.isdir(full_path):
-                continue
-            if full_path == final_output or os.path.basename(full_path) == output_folder_name:
-                continue
-            vehicle_folders.append(full_path)
+
+        final_output = self.final_output_path()
+        # The output folder may have changed since the scan.
+        vehicle_folders = [
+            os.path.abspath(path) for path in self.vehicle_model.checked_paths()
+            if not is_output_folder(os.path.basename(path), os.path.abspath(path), final_output)
+        ]
 
         if not vehicle_folders:
-            self.status_label.setText("⚠️ No vehicle folders found in the selected directory.")
+            if self.vehicle_model.rowCount():
+                self.status_label.setText("⚠️ No vehicles selected.")
+            else:
+                self.status_label.setText("⚠️ No vehicle folders found in the selected directory.")
             return
 
-        os.makedirs(final_output, exist_ok=True)
+        settings = load_settings()
+        if settings.get("output_format") != "zip" and not settings.get("shard_size_mb"):
+            os.makedirs(final_output, exist_ok=True)
 
         self.status_label.setText("🔄 Compiling multi-vehicle resource...")
-        self.repaint()
+        self.final_output = final_output
+        self.compile_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.show()
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+
+        self.worker = ConversionWorker(compile_vehicles, vehicle_folders, final_output, settings)
+        self.worker.progress_event.connect(self.update_progress)
+        self.worker.finished.connect(self.on_compilation_finished)
+        self.worker.failed.connect(self.on_compilation_failed)
+        self.worker.cancelled.connect(self.on_compilation_cancelled)
+        self.cancel_button.clicked.connect(self.worker.cancel)
+        self.worker_thread = start_worker(self, self.worker)
 
-        try:
-            streamed, metas = build_combined_fivem_resource(vehicle_folders, final_output)
+    def update_progress(self, event):
+        if event.kind not in ("phase_started", "bytes_copied"):
+            return
+        if event.total:
+            self.progress_bar.setRange(0, event.total)
+            self.progress_bar.setValue(event.done)
+        else:
+            self.progress_bar.setRange(0, 0)
+        if event.phase == "copy":
             self.status_label.setText(
-                f"✅ Done! Output at:\n{final_output}\n\n{len(streamed)} streamed files\n{len(metas)} meta files"
+                f"🔄 Copying stream files: {event.done}/{event.total} "
+                f"({event.bytes_done // (1024 * 1024)}/{event.bytes_total // (1024 * 1024)} MB)"
             )
+        else:
+            self.status_label.setText(f"🔄 Compiling multi-vehicle resource... ({event.phase})")
+
+    def end_compilation(self):
+        self.cancel_button.clicked.disconnect(self.worker.cancel)
+        self.worker = None
+        self.worker_thread = None
+        self.compile_button.setEnabled(True)
+        self.cancel_button.hide()
+        self.progress_bar.hide()
+
+    def on_compilation_finished(self, result):
+        self.end_compilation()
+        streamed, metas, conflicts, output, shards, texture_report, meta_conflicts = result
+        status = f"✅ Done! Output at:\n{output}\n\n{len(streamed)} streamed files\n{len(metas)} meta files"
+        if shards:
+            ensure_lines = "\n".join(f"ensure {shard['name']}" for shard in shards)
+            status += f"\n\n🧩 Split into {len(shards)} resources, add to server.cfg:\n{ensure_lines}"
+        if texture_report:
+            saved = sum(r.before - r.after for r in texture_report)
+            textures = sum(r.textures for r in texture_report)
+            status += f"\n\n\U0001f5bc\ufe0f Downscaled {textures} textures, {saved // (1024 * 1024)} MB smaller"
+        if load_settings().get("trace"):
+            status += f"\n\n\u23f1\ufe0f Trace saved to {self.final_output}.trace.json"
+        if conflicts:
+            names = ", ".join(c["name"] for c in conflicts[:5])
+            status += f"\n\n⚠️ {len(conflicts)} conflicting stream files: {names}"
+        if meta_conflicts:
+            names = ", ".join(c["value"] for c in meta_conflicts[:5])
+            status += f"\n\n⚠️ {len(meta_conflicts)} duplicate meta entries: {names}"
+        self.status_label.setText(status)
 
-            if self.open_when_done.isChecked():
-                webbrowser.open(final_output)
-        except Exception as e:
-            self.status_label.setText(f"❌ Error: {str(e)}")
\ No newline at end of file
+        if self.open_when_done.isChecked():
+            import webbrowser
+            webbrowser.open(os.path.dirname(output) if output.endswith((".zip", ".cfg")) else output)
+
+    def on_compilation_failed(self, error, error_details):
+        self.end_compilation()
+        if isinstance(error, StreamConflictError):
+            names = "\n".join(f" - {c['name']}" for c in error.conflicts[:10])
+            self.status_label.setText(f"❌ {error}\n{names}")
+        else:
+            self.status_label.setText(f"❌ Error: {str(error)}")
+
+    def cancel_and_wait(self):
+        self.cancel_scan()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+
+    def on_compilation_cancelled(self):
+        self.end_compilation()
+        self.status_label.setText("⛔ Compilation cancelled.")
+
+
+def scan_vehicles(input_path, skip, on_event=None, cancel_token=None):
+    from converter.library import scan_library
+    from converter.meta_cache import open_meta_cache
+
+    meta_cache = open_meta_cache()
+    try:
+        return scan_library(input_path, meta_cache, skip=skip, on_event=on_event, cancel_token=cancel_token)
+    finally:
+        if meta_cache is not None:
+            meta_cache.close()
+
+
+def compile_vehicles(vehicle_folders, final_output, settings, on_event=None, cancel_token=None):
+    from converter.multi_convert import build_combined_fivem_resource
+    from converter.sharding import build_sharded_fivem_resources
+    from converter.meta_cache import open_meta_cache
+    from converter.tracing import start_tracing, stop_tracing
+
+    conflicts = []
+    meta_conflicts = []
+    texture_report = []
+    shards = None
+    tracer = start_tracing() if settings.get("trace") else None
+    meta_cache = open_meta_cache()
+    options = {
+        "workers": settings.get("copy_workers"),
+        "copy_mode": settings.get("copy_mode", "copy"),
+        "conflict_policy": settings.get("conflict_policy", "keep_last"),
+        "conflict_report": conflicts,
+        "dedupe_metas": settings.get("dedupe_metas", False),
+        "remap_kit_ids": settings.get("remap_kit_ids", False),
+        "meta_conflict_report": meta_conflicts,
+        "output_format": settings.get("output_format", "folder"),
+        "asset_limits": asset_limits_from_settings(settings),
+        "texture_max_size": settings.get("max_texture_size"),
+        "texture_report": texture_report,
+        "checksums": settings.get("checksums", False),
+        "meta_cache": meta_cache,
+        "on_event": on_event,
+        "cancel_token": cancel_token,
+    }
+    try:
+        if settings.get("shard_size_mb"):
+            shards = build_sharded_fivem_resources(
+                vehicle_folders, final_output, settings["shard_size_mb"] * 1024 * 1024, **options
+            )
+            streamed = [name for shard in shards for name in shard["streamed"]]
+            metas = sorted({name for shard in shards for name in shard["metas"]})
+        else:
+            streamed, metas = build_combined_fivem_resource(vehicle_folders, final_output, **options)
+    finally:
+        if meta_cache is not None:
+            meta_cache.close()
+        if tracer is not None:
+            stop_tracing()
+    if tracer is not None:
+        tracer.write(final_output + ".trace.json")
+    if shards:
+        final_output += ".cfg"
+    elif settings.get("output_format") == "zip":
+        final_output += ".zip"
+    return streamed, metas, conflicts, final_output, shards, texture_report, meta_conflicts
\ No newline at end of file
@@ -1,10 +1,29 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton,
-    QSizePolicy, QSpacerItem
+    QSizePolicy, QSpacerItem, QProgressBar
 )
 from PyQt6.QtGui import QFont
 from gui.translator import load_language
 
+PHASE_LABELS = {
+    "scan": "\U0001f50d Scanning files...",
+    "metadata": "\U0001f9e0 Reading metadata files...",
+    "dedup": "\U0001f9ec Checking for duplicate files...",
+    "budget": "\U0001f4cf Checking asset sizes...",
+    "textures": "\U0001f5bc\ufe0f Downscaling oversized textures...",
+    "copy": "\U0001f3a8 Streaming textures and models into place...",
+    "meta": "\U0001f4e6 Merging meta files...",
+    "manifest": "\U0001f5d8 Generating fxmanifest.lua and vehicle_names.lua...",
+}
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
 class ConversionProgressPage(QWidget):
     def __init__(self, language_code='en'):
         super().__init__()
@@ -15,6 +34,14 @@ class ConversionProgressPage(QWidget):
 
         self.status_label = QLabel("")
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+
+        self.detail_label = QLabel("")
+        self.detail_label.setWordWrap(True)
+        self.detail_label.hide()
+
         self.summary_text = QTextEdit()
         self.summary_text.setReadOnly(True)
         self.summary_text.setFont(QFont("Courier New", 10))
@@ -22,15 +49,80 @@ class ConversionProgressPage(QWidget):
 
         self.done_button = QPushButton(self.tr["done"])
         self.back_button = QPushButton(self.tr["back"])
+        self.cancel_button = QPushButton(self.tr["cancel"])
+        self.cancel_button.hide()
+
+        self.phase = None
+        self.phase_started_at = None
 
         layout.addWidget(self.status_label)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.detail_label)
         layout.addWidget(self.summary_text)
+        layout.addWidget(self.cancel_button)
         layout.addWidget(self.done_button)
         layout.addWidget(self.back_button)
         layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
 
         self.setLayout(layout)
 
+    def start_progress(self):
+        self.phase = None
+        self.progress_bar.setValue(0)
+        self.detail_label.setText("")
+        self.progress_bar.show()
+        self.detail_label.show()
+        self.cancel_button.show()
+        self.cancel_button.setEnabled(True)
+        self.done_button.setEnabled(False)
+        self.back_button.setEnabled(False)
+
+    def stop_progress(self):
+        self.progress_bar.hide()
+        self.detail_label.hide()
+        self.cancel_button.hide()
+        self.done_button.setEnabled(True)
+        self.back_button.setEnabled(True)
+
+    def update_progress(self, event):
+        if event.kind == "warning":
+            self.summary_text.append(event.message)
+            return
+        if event.kind not in ("phase_started", "bytes_copied"):
+            return
+
+        if event.phase != self.phase:
+            self.phase = event.phase
+            self.phase_started_at = event.time
+            self.summary_text.append(PHASE_LABELS.get(event.phase, event.phase))
+
+        if event.total:
+            self.progress_bar.setRange(0, event.total)
+            self.progress_bar.setValue(event.done)
+        else:
+            self.progress_bar.setRange(0, 0)
+
+        if event.phase != "copy":
+            self.detail_label.setText(f"{event.done}/{event.total}" if event.total else "")
+            return
+
+        elapsed = max(event.time - self.phase_started_at, 0.001)
+        rate = event.bytes_done / elapsed
+        detail = f"{event.done}/{event.total} files \u2022 {format_bytes(event.bytes_done)} / {format_bytes(event.bytes_total)}"
+        if rate > 0 and event.bytes_done < event.bytes_total:
+            detail += f" \u2022 {format_bytes(rate)}/s \u2022 ETA {int((event.bytes_total - event.bytes_done) / rate)}s"
+        self.detail_label.setText(detail)
+
+    def show_asset_report(self, report):
+        self.summary_text.append(f"\n\U0001f4cf Streaming memory (from the RSC7 headers):\n{report}")
+
+    def show_texture_report(self, report):
+        self.summary_text.append(f"\n\U0001f5bc\ufe0f Downscaled textures:\n{report}")
+
+    def show_trace_summary(self, summary, trace_path):
+        self.summary_text.append(f"\n\u23f1\ufe0f Timing by phase (busy time, parallel copies overlap):\n{summary}")
+        self.summary_text.append(f"Trace saved to {trace_path} (open it in ui.perfetto.dev)")
+
     def show_summary(self, stream_files, meta_files, audio_files):
         summary = "\n✅ Conversion Complete!\n\n"
 
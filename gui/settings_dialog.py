@@ -1,8 +1,10 @@
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QComboBox, QDialogButtonBox, QFormLayout
+    QDialog, QVBoxLayout, QComboBox, QDialogButtonBox, QFormLayout, QSpinBox, QCheckBox
 )
 from PyQt6.QtCore import Qt
 from gui.utils import load_settings
+from converter.asset_budget import DEFAULT_ASSET_LIMIT
+from converter.copy_engine import DEFAULT_COPY_WORKERS
 
 class SettingsDialog(QDialog):
     def __init__(self, current_lang='en', parent=None):
@@ -48,6 +50,89 @@ class SettingsDialog(QDialog):
         self.lang_selector.setCurrentText(current_lang)
         form_layout.addRow("🌐 Language:", self.lang_selector)
 
+        self.copy_workers = QSpinBox()
+        self.copy_workers.setRange(1, 64)
+        self.copy_workers.setValue(self.settings.get("copy_workers", DEFAULT_COPY_WORKERS))
+        self.copy_workers.setToolTip("Number of files copied at the same time during conversion")
+        form_layout.addRow("📂 Copy threads:", self.copy_workers)
+
+        self.copy_mode = QComboBox()
+        self.copy_mode.addItem("Copy files", userData="copy")
+        self.copy_mode.addItem("Fast copy (reflink / in-kernel)", userData="fast")
+        self.copy_mode.addItem("Hardlink when possible", userData="link")
+        index = self.copy_mode.findData(self.settings.get("copy_mode", "copy"))
+        self.copy_mode.setCurrentIndex(max(index, 0))
+        self.copy_mode.setToolTip("Hardlinks share disk space with the source files, so editing one edits both")
+        form_layout.addRow("🔗 Output mode:", self.copy_mode)
+
+        self.conflict_policy = QComboBox()
+        self.conflict_policy.addItem("Keep the last vehicle's file", userData="keep_last")
+        self.conflict_policy.addItem("Keep the first vehicle's file", userData="keep_first")
+        self.conflict_policy.addItem("Rename conflicting files", userData="rename")
+        self.conflict_policy.addItem("Stop the build", userData="fail")
+        index = self.conflict_policy.findData(self.settings.get("conflict_policy", "keep_last"))
+        self.conflict_policy.setCurrentIndex(max(index, 0))
+        self.conflict_policy.setToolTip("What the Multi-Vehicle Compiler does when two vehicles ship different files with the same name")
+        form_layout.addRow("⚔️ Stream conflicts:", self.conflict_policy)
+
+        self.dedupe_metas = QCheckBox("Drop identical duplicate meta entries")
+        self.dedupe_metas.setChecked(self.settings.get("dedupe_metas", False))
+        self.dedupe_metas.setToolTip("Skip vehicles.meta, handling.meta and carcols.meta entries that another vehicle already added unchanged")
+        form_layout.addRow("", self.dedupe_metas)
+
+        self.remap_kit_ids = QCheckBox("Give clashing modkits a free ID")
+        self.remap_kit_ids.setChecked(self.settings.get("remap_kit_ids", False))
+        self.remap_kit_ids.setToolTip("Renumber carcols.meta kits whose ID another vehicle already uses, so tuning parts don't mix")
+        form_layout.addRow("", self.remap_kit_ids)
+
+        self.shard_size = QSpinBox()
+        self.shard_size.setRange(0, 100000)
+        self.shard_size.setSingleStep(100)
+        self.shard_size.setSuffix(" MB")
+        self.shard_size.setSpecialValueText("Off")
+        self.shard_size.setValue(self.settings.get("shard_size_mb", 0))
+        self.shard_size.setToolTip("Split the Multi-Vehicle Compiler output into several resources of at most this size")
+        form_layout.addRow("🧩 Split combined packs:", self.shard_size)
+
+        self.max_asset_size = QSpinBox()
+        self.max_asset_size.setRange(0, 1024)
+        self.max_asset_size.setSuffix(" MB")
+        self.max_asset_size.setSpecialValueText("Off")
+        self.max_asset_size.setValue(self.settings.get("max_asset_mb", DEFAULT_ASSET_LIMIT // (1024 * 1024)))
+        self.max_asset_size.setToolTip("Warn about models and textures that need more memory than this in game")
+        form_layout.addRow("📏 Asset size limit:", self.max_asset_size)
+
+        self.fail_over_budget = QCheckBox("Stop the build when an asset is too big")
+        self.fail_over_budget.setChecked(self.settings.get("fail_over_budget", False))
+        form_layout.addRow("", self.fail_over_budget)
+
+        self.max_texture_size = QComboBox()
+        self.max_texture_size.addItem("Off", userData=0)
+        for size in (4096, 2048, 1024, 512):
+            self.max_texture_size.addItem(f"{size} px", userData=size)
+        index = self.max_texture_size.findData(self.settings.get("max_texture_size", 0))
+        self.max_texture_size.setCurrentIndex(max(index, 0))
+        self.max_texture_size.setToolTip("Drop the largest mip levels of textures bigger than this; the source files are left untouched")
+        form_layout.addRow("\U0001f5bc\ufe0f Downscale textures:", self.max_texture_size)
+
+        self.output_format = QComboBox()
+        self.output_format.addItem("Resource folder", userData="folder")
+        self.output_format.addItem("Zip package", userData="zip")
+        index = self.output_format.findData(self.settings.get("output_format", "folder"))
+        self.output_format.setCurrentIndex(max(index, 0))
+        self.output_format.setToolTip("Write each resource straight into a .zip ready to upload to a server")
+        form_layout.addRow("📦 Output format:", self.output_format)
+
+        self.checksums = QCheckBox("Write resource.sha checksums")
+        self.checksums.setChecked(self.settings.get("checksums", False))
+        self.checksums.setToolTip("Lists the size and checksum of every file, so a deployed copy can be checked with --verify")
+        form_layout.addRow("", self.checksums)
+
+        self.trace_enabled = QCheckBox("Record a performance trace")
+        self.trace_enabled.setChecked(self.settings.get("trace", False))
+        self.trace_enabled.setToolTip("Saves a Chrome/Perfetto trace next to the output and shows where the time went")
+        form_layout.addRow("⏱️ Tracing:", self.trace_enabled)
+
         layout.addLayout(form_layout)
 
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -59,3 +144,39 @@ class SettingsDialog(QDialog):
 
     def get_selected_language(self):
         return self.lang_selector.currentData()
+
+    def get_copy_workers(self):
+        return self.copy_workers.value()
+
+    def get_copy_mode(self):
+        return self.copy_mode.currentData()
+
+    def get_conflict_policy(self):
+        return self.conflict_policy.currentData()
+
+    def get_dedupe_metas(self):
+        return self.dedupe_metas.isChecked()
+
+    def get_remap_kit_ids(self):
+        return self.remap_kit_ids.isChecked()
+
+    def get_shard_size_mb(self):
+        return self.shard_size.value()
+
+    def get_max_asset_mb(self):
+        return self.max_asset_size.value()
+
+    def get_fail_over_budget(self):
+        return self.fail_over_budget.isChecked()
+
+    def get_max_texture_size(self):
+        return self.max_texture_size.currentData()
+
+    def get_output_format(self):
+        return self.output_format.currentData()
+
+    def get_checksums(self):
+        return self.checksums.isChecked()
+
+    def get_trace_enabled(self):
+        return self.trace_enabled.isChecked()
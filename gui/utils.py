@@ -21,6 +21,12 @@ def save_settings(data):
     except Exception:
         pass
 
+def asset_limits_from_settings(settings):
+    from converter.asset_budget import DEFAULT_ASSET_LIMIT, AssetLimits
+
+    max_asset_mb = settings.get("max_asset_mb", DEFAULT_ASSET_LIMIT // (1024 * 1024))
+    return AssetLimits(asset=max_asset_mb * 1024 * 1024, fail=settings.get("fail_over_budget", False))
+
 def open_folder(path):
     try:
         if sys.platform.startswith("win"):
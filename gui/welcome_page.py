@@ -45,6 +45,9 @@ class WelcomePage(QWidget):
         self.open_when_done.setChecked(True)
         self.layout.addWidget(self.open_when_done)
 
+        self.watch_for_changes = QCheckBox(self.tr["watch_for_changes"])
+        self.layout.addWidget(self.watch_for_changes)
+
         self.layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
 
         self.next_button = QPushButton(self.tr["next"])
@@ -0,0 +1,68 @@
+import pickle
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from converter.archive_input import ArchiveInventory
+
+FILES = {f"car/stream/part_{i}.ytd": bytes([i]) * (1000 + i) for i in range(16)}
+
+
+def make_tar(tmp_path, mode, name):
+    folder = tmp_path / "src"
+    for rel, data in FILES.items():
+        path = folder / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    archive = tmp_path / name
+    with tarfile.open(archive, mode) as tar:
+        tar.add(folder / "car", arcname="car")
+    return str(archive)
+
+
+def read_all(inventory):
+    def read(entry):
+        with entry.open() as f:
+            return entry.rel_path, f.read()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        return dict(pool.map(read, reversed(inventory.entries)))
+
+
+@pytest.mark.parametrize("mode, name, sequential", [
+    ("w", "car.tar", False),
+    ("w:gz", "car.tar.gz", True),
+    ("w:bz2", "car.tar.bz2", True),
+    ("w:xz", "car.tar.xz", True),
+])
+def test_only_compressed_tars_are_sequential(tmp_path, mode, name, sequential):
+    inventory = ArchiveInventory.scan(make_tar(tmp_path, mode, name))
+    try:
+        assert inventory.sequential is sequential
+        assert read_all(inventory) == FILES
+    finally:
+        inventory.close()
+    assert inventory._handles == []
+
+
+def test_plain_tar_is_read_with_a_handle_per_thread(tmp_path):
+    inventory = ArchiveInventory.scan(make_tar(tmp_path, "w", "car.tar"))
+    try:
+        read_all(inventory)
+        handles = list(inventory._handles)
+        assert 1 <= len(handles) <= 4
+        assert inventory._tar is None
+    finally:
+        inventory.close()
+    assert all(handle.closed for handle in handles)
+
+
+def test_pickled_inventory_keeps_compression(tmp_path):
+    inventory = ArchiveInventory.scan(make_tar(tmp_path, "w:gz", "car.tgz"))
+    copy = pickle.loads(pickle.dumps(inventory))
+    try:
+        assert copy.sequential and copy.compressed
+        assert read_all(copy) == FILES
+    finally:
+        copy.close()
+        inventory.close()
@@ -0,0 +1,86 @@
+import glob
+import os
+import re
+
+import pytest
+
+from benchmarks.generate import generate_mod_tree
+from converter import CancelToken, ConversionCancelled, build_combined_fivem_resource
+from converter.hashing import hash_file
+
+
+def tree_digests(root):
+    return {
+        os.path.relpath(path, root): hash_file(path)
+        for path in glob.glob(os.path.join(root, "**"), recursive=True)
+        if os.path.isfile(path) and not os.path.basename(path).startswith(".packer")
+    }
+
+
+def cancel_after(copies):
+    token = CancelToken()
+    seen = []
+
+    def on_event(event):
+        if event.kind == "bytes_copied":
+            seen.append(event)
+            if len(seen) == copies:
+                token.cancel()
+
+    return token, on_event
+
+
+@pytest.fixture
+def sources(tmp_path):
+    generate_mod_tree(str(tmp_path / "src"), vehicles=3, asset_size=4096, meta_entries=2, audio_banks=1)
+    return sorted(glob.glob(str(tmp_path / "src" / "*")))
+
+
+def touch_streams(sources):
+    for path in glob.glob(os.path.join(sources[0], "..", "*", "stream", "*")):
+        with open(path, "ab") as f:
+            f.write(b"x")
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_cancelled_rebuild_keeps_output_and_resumes(tmp_path, sources, incremental):
+    output = str(tmp_path / "out" / "pack")
+    build_combined_fivem_resource(sources, output)
+    published = tree_digests(output)
+
+    touch_streams(sources)
+    token, on_event = cancel_after(2)
+    with pytest.raises(ConversionCancelled):
+        build_combined_fivem_resource(sources, output, incremental=incremental,
+                                      on_event=on_event, cancel_token=token)
+    assert tree_digests(output) == published
+    assert os.path.isdir(output + ".partial")
+
+    warnings = []
+    build_combined_fivem_resource(sources, output, incremental=incremental,
+                                  on_event=lambda e: e.kind == "warning" and warnings.append(e.message))
+    # Copies run in parallel, so a few more may finish before the cancel is seen.
+    resumed = [int(m.group(1)) for m in map(re.compile(r"Resuming an interrupted build, (\d+) files").search,
+                                            warnings) if m]
+    assert resumed and resumed[0] >= 2
+    assert not os.path.exists(output + ".partial")
+    assert tree_digests(output) != published
+
+    fresh = str(tmp_path / "fresh" / "pack")
+    build_combined_fivem_resource(sources, fresh, incremental=False)
+    assert tree_digests(output) == tree_digests(fresh)
+
+
+def test_unchanged_rebuild_copies_nothing(tmp_path, sources):
+    output = str(tmp_path / "out" / "pack")
+    build_combined_fivem_resource(sources, output)
+    published = tree_digests(output)
+    inodes = {rel: os.stat(os.path.join(output, rel)).st_ino for rel in published}
+    copied = []
+    build_combined_fivem_resource(sources, output,
+                                  on_event=lambda e: e.kind == "bytes_copied" and copied.append(e))
+    assert copied == []
+    assert tree_digests(output) == published
+    # The staging folder was seeded with hard links, not copies.
+    stream = [rel for rel in published if rel.startswith("stream")]
+    assert all(os.stat(os.path.join(output, rel)).st_ino == inodes[rel] for rel in stream)
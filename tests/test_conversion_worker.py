@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from converter.events import check_cancelled, emit  # noqa: E402
+from gui.conversion_worker import ConversionWorker, start_worker  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def run_worker(app, worker, on_started=None):
+    seen = {"events": [], "outcome": None}
+    loop = QtCore.QEventLoop()
+    worker.progress_event.connect(seen["events"].append)
+    worker.finished.connect(lambda result: seen.update(outcome=("finished", result)))
+    worker.failed.connect(lambda error, trace: seen.update(outcome=("failed", error)))
+    worker.cancelled.connect(lambda: seen.update(outcome=("cancelled", None)))
+    thread = start_worker(None, worker)
+    thread.finished.connect(loop.quit)
+    if on_started is not None:
+        on_started(worker)
+    QtCore.QTimer.singleShot(5000, loop.quit)
+    loop.exec()
+    return seen
+
+
+def copy_task(count, on_event=None, cancel_token=None):
+    for done in range(1, count + 1):
+        check_cancelled(cancel_token)
+        emit(on_event, "bytes_copied", phase="copy", done=done, total=count)
+    return count
+
+
+def test_worker_delivers_events_and_result(app):
+    seen = run_worker(app, ConversionWorker(copy_task, 3))
+    assert seen["outcome"] == ("finished", 3)
+    assert [event.done for event in seen["events"]] == [1, 2, 3]
+
+
+def test_worker_reports_failures(app):
+    def broken(on_event=None, cancel_token=None):
+        raise ValueError("bad meta")
+
+    seen = run_worker(app, ConversionWorker(broken))
+    assert seen["outcome"][0] == "failed"
+    assert str(seen["outcome"][1]) == "bad meta"
+
+
+def test_worker_cancel(app):
+    def blocking(on_event=None, cancel_token=None):
+        while True:
+            check_cancelled(cancel_token)
+            QtCore.QThread.msleep(5)
+
+    seen = run_worker(app, ConversionWorker(blocking), on_started=lambda worker: worker.cancel())
+    assert seen["outcome"] == ("cancelled", None)
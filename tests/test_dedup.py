@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from converter.dedup import StreamConflictError, resolve_stream_entries
+from converter.inventory import scan_folder
+
+
+@pytest.fixture
+def inventories(tmp_path):
+    contents = {"car_a": b"wheels v1", "car_b": b"wheels v1", "car_c": b"wheels v2"}
+    result = []
+    for name, wheels in contents.items():
+        stream = tmp_path / name / "stream"
+        stream.mkdir(parents=True)
+        (stream / "wheels.ytd").write_bytes(wheels)
+        (stream / f"{name}.yft").write_bytes(name.encode())
+        result.append(scan_folder(str(tmp_path / name)))
+    return result
+
+
+def source_of(resolved, name):
+    # <vehicle>/stream/<file>
+    return os.path.basename(os.path.dirname(os.path.dirname(resolved[name].path)))
+
+
+def test_keep_last_is_the_default(inventories):
+    resolved, conflicts, duplicates = resolve_stream_entries(inventories)
+    assert source_of(resolved, "wheels.ytd") == "car_c"
+    assert duplicates == 1
+    assert [c["action"] for c in conflicts] == ["keep_last"]
+    assert sorted(resolved) == ["car_a.yft", "car_b.yft", "car_c.yft", "wheels.ytd"]
+
+
+def test_keep_first(inventories):
+    resolved, conflicts, _ = resolve_stream_entries(inventories, "keep_first")
+    assert source_of(resolved, "wheels.ytd") == "car_a"
+    assert len(conflicts) == 1
+
+
+def test_rename_keeps_every_version(inventories):
+    resolved, conflicts, _ = resolve_stream_entries(inventories, "rename")
+    assert source_of(resolved, "wheels.ytd") == "car_a"
+    (renamed,) = conflicts[0]["renamed"]
+    assert renamed.startswith("wheels_") and renamed.endswith(".ytd")
+    assert source_of(resolved, renamed) == "car_c"
+
+
+def test_fail_raises_with_the_conflicts(inventories):
+    with pytest.raises(StreamConflictError) as error:
+        resolve_stream_entries(inventories, "fail")
+    assert [c["name"] for c in error.value.conflicts] == ["wheels.ytd"]
@@ -0,0 +1,121 @@
+import os
+import time
+
+import pytest
+
+from converter import deploy as deploy_module
+from converter.deploy import deploy_resource
+from converter.integrity import DEPLOY_STATE_FILE, MANIFEST_FILE, write_manifest
+
+RESOURCE = {
+    "fxmanifest.lua": b"fx_version 'cerulean'\n",
+    "vehicle_names.lua": b"AddTextEntry('car', 'car')\n",
+    "data/vehicles.meta": b"<CVehicleModelInfo__InitDataList />\n",
+    "stream/car.yft": b"yft" * 100,
+    "stream/car.ytd": b"ytd" * 200,
+    "stream/extras/car_hi.yft": b"hi" * 50,
+}
+
+
+def write_tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            files[os.path.relpath(path, root).replace(os.sep, "/")] = open(path, 'rb').read()
+    return files
+
+
+@pytest.fixture(params=[False, True], ids=["no-manifest", "manifest"])
+def source(tmp_path, request):
+    root = tmp_path / "build" / "car"
+    write_tree(root, RESOURCE)
+    if request.param:
+        write_manifest(str(root))
+    return root
+
+
+def deploy(source, target, **kwargs):
+    events = []
+    result = deploy_resource(str(source), str(target), on_event=events.append, **kwargs)
+    result["warnings"] = [event.message for event in events if event.kind == "warning"]
+    return result
+
+
+def test_first_deploy_then_nothing_to_do(source, tmp_path):
+    target = tmp_path / "resources" / "car"
+    first = deploy(source, target)
+    assert first["copied"] == sorted(RESOURCE)
+    assert {rel: data for rel, data in read_tree(target).items()
+            if rel not in (MANIFEST_FILE, DEPLOY_STATE_FILE)} == RESOURCE
+
+    again = deploy(source, target)
+    assert again["copied"] == [] and again["deleted"] == []
+    assert again["unchanged"] == len(RESOURCE)
+
+
+def test_removed_files_are_deleted_and_unknown_ones_kept(source, tmp_path):
+    target = tmp_path / "resources" / "car"
+    deploy(source, target)
+    (target / "server_notes.txt").write_text("added on the server")
+    os.remove(source / "stream" / "extras" / "car_hi.yft")
+    if (source / MANIFEST_FILE).exists():
+        write_manifest(str(source))
+
+    result = deploy(source, target)
+    assert result["deleted"] == ["stream/extras/car_hi.yft"]
+    assert not (target / "stream" / "extras").exists()
+    assert result["unknown"] == ["server_notes.txt"]
+    assert (target / "server_notes.txt").exists()
+    assert any("server_notes.txt" in message for message in result["warnings"])
+
+
+def test_files_edited_on_the_server_are_recopied(source, tmp_path):
+    target = tmp_path / "resources" / "car"
+    deploy(source, target)
+    # Same size, so only the digest can tell.
+    (target / "stream" / "car.ytd").write_bytes(b"YTD" * 200)
+    (target / "data" / "vehicles.meta").write_bytes(b"<broken")
+
+    result = deploy(source, target)
+    assert result["copied"] == ["data/vehicles.meta", "stream/car.ytd"]
+    assert read_tree(target)["stream/car.ytd"] == RESOURCE["stream/car.ytd"]
+
+
+def test_fxmanifest_is_placed_after_everything_it_lists(source, tmp_path, monkeypatch):
+    target = tmp_path / "resources" / "car"
+    deploy(source, target)
+    for rel in ("fxmanifest.lua", "stream/car.yft", "stream/car.ytd", "data/vehicles.meta"):
+        (source / rel).write_bytes(RESOURCE[rel] + b"-- v2\n")
+    if (source / MANIFEST_FILE).exists():
+        write_manifest(str(source))
+
+    placed = []
+    place = deploy_module._place
+
+    def recording_place(src, dst, copy_mode):
+        if not dst.endswith("fxmanifest.lua"):
+            # Slow enough that a manifest placed alongside them would finish first.
+            time.sleep(0.05)
+        place(src, dst, copy_mode)
+        placed.append(os.path.relpath(dst, target).replace(os.sep, "/"))
+
+    monkeypatch.setattr(deploy_module, "_place", recording_place)
+    deploy(source, target, workers=4)
+    assert len(placed) == 4
+    assert placed[-1] == "fxmanifest.lua"
+
+
+def test_link_mode_deploys_real_copies(source, tmp_path):
+    target = tmp_path / "resources" / "car"
+    deploy(source, target, copy_mode="link")
+    for rel in RESOURCE:
+        assert not os.path.samefile(source / rel, target / rel)
+        assert os.stat(target / rel).st_nlink == 1
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from converter.inventory import scan_folder
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_scan_does_not_follow_directory_symlinks(tmp_path):
+    stream = tmp_path / "car" / "stream"
+    stream.mkdir(parents=True)
+    (stream / "car.yft").write_bytes(b"yft")
+    (tmp_path / "car" / "vehicles.meta").write_text("<CVehicleModelInfo__InitDataList />")
+    os.symlink(tmp_path / "car", stream / "loop", target_is_directory=True)
+    os.symlink(stream / "car.yft", tmp_path / "car" / "linked.yft")
+
+    inventory = scan_folder(str(tmp_path / "car"))
+    assert sorted(entry.rel_path.replace(os.sep, "/") for entry in inventory.entries) == [
+        "linked.yft", "stream/car.yft", "vehicles.meta",
+    ]
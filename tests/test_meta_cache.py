@@ -0,0 +1,40 @@
+import os
+import sqlite3
+
+from converter.meta_cache import MetaCache
+
+
+def write_meta(path, model):
+    path.write_text(f"<InitDatas><Item><modelName>{model}</modelName></Item></InitDatas>")
+
+
+def test_cache_hits_touched_and_changed_files(tmp_path):
+    meta = tmp_path / "vehicles.meta"
+    write_meta(meta, "car1")
+    with MetaCache(str(tmp_path / "cache" / "meta.sqlite")) as cache:
+        assert cache.get(str(meta))["model_names"] == ["car1"]
+        st = os.stat(meta)
+        os.utime(meta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert cache.get(str(meta))["model_names"] == ["car1"]
+        assert (cache.hits, cache.misses) == (1, 1)
+        write_meta(meta, "car2")
+        assert cache.get(str(meta))["model_names"] == ["car2"]
+        assert cache.misses == 2
+
+
+def test_unwritable_cache_only_warns(tmp_path, monkeypatch, capsys):
+    meta = tmp_path / "vehicles.meta"
+    write_meta(meta, "car1")
+    with MetaCache(str(tmp_path / "meta.sqlite")) as cache:
+        cache.get(str(meta))
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(cache, "_store", locked)
+        st = os.stat(meta)
+        os.utime(meta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert cache.get(str(meta))["model_names"] == ["car1"]
+        write_meta(meta, "car2")
+        assert cache.get(str(meta))["model_names"] == ["car2"]
+    assert capsys.readouterr().out.count("Could not update metadata cache") == 2
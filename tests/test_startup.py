@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import PROBES, REPO_DIR, run_probes, summarize
+
+
+def loaded_modules(code):
+    completed = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    return set(completed.stdout.split())
+
+
+@pytest.mark.parametrize("name", sorted(PROBES))
+def test_import_time_within_budget(name):
+    result = run_probes([name])[name]
+    if result["status"] == "skipped":
+        pytest.skip(result["reason"])
+    heaviest = ", ".join(f"{m['name']} {m['ms']:.1f} ms" for m in result["heaviest"])
+    assert result["status"] == "ok", (
+        f"{name} takes {result['measured_ms']:.1f} ms to import, over its {result['budget_ms']} ms budget "
+        f"(heaviest: {heaviest})"
+    )
+
+
+def test_converter_package_imports_nothing_eagerly():
+    modules = loaded_modules("import converter")
+    assert {m for m in modules if m.startswith("converter.")} == set()
+    assert not {"sqlite3", "xml.etree.ElementTree", "concurrent.futures"} & modules
+
+
+def test_main_window_defers_the_converter():
+    pytest.importorskip("PyQt6")
+    modules = loaded_modules("import gui.main_window")
+    assert {m for m in modules if m.startswith("converter.")} <= {"converter.events"}
+
+
+def test_summarize_excludes_nested_packages():
+    # importtime lists children before their parent.
+    modules = [
+        {"name": "PyQt6.QtCore", "self_us": 900, "cumulative_us": 900, "depth": 2},
+        {"name": "pkgutil", "self_us": 300, "cumulative_us": 300, "depth": 3},
+        {"name": "PyQt6", "self_us": 100, "cumulative_us": 400, "depth": 2},
+        {"name": "PyQt6.QtWidgets", "self_us": 600, "cumulative_us": 1000, "depth": 1},
+        {"name": "gui.utils", "self_us": 200, "cumulative_us": 200, "depth": 1},
+        {"name": "gui", "self_us": 100, "cumulative_us": 1300, "depth": 0},
+    ]
+    summary = summarize(modules, exclude=("PyQt6",))
+    assert summary["total_ms"] == pytest.approx(1.3)
+    assert summary["excluded_ms"] == pytest.approx(1.0)
+    assert [m["name"] for m in summary["heaviest"]] == ["gui", "gui.utils"]
@@ -0,0 +1,66 @@
+import threading
+
+from converter.copy_engine import copy_files
+from converter.events import iter_conversion_events
+from converter.inventory import scan_folder
+from converter.tracing import active_tracer, span, start_tracing, stop_tracing, traced, tracing
+
+
+def span_names(tracer):
+    return sorted(event["name"] for event in tracer.events if event["ph"] == "X")
+
+
+def test_jobs_on_different_threads_trace_separately():
+    both_started = threading.Barrier(2)
+    tracers = {}
+
+    def job(name):
+        start_tracing()
+        both_started.wait()
+        with span(name):
+            pass
+        both_started.wait()
+        tracers[name] = stop_tracing()
+
+    threads = [threading.Thread(target=job, args=(name,)) for name in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert span_names(tracers["first"]) == ["first"]
+    assert span_names(tracers["second"]) == ["second"]
+    assert active_tracer() is None
+
+
+def test_stopping_one_job_leaves_the_other_tracing():
+    tracer = start_tracing()
+    try:
+        other = threading.Thread(target=lambda: (start_tracing(), stop_tracing()))
+        other.start()
+        other.join()
+        assert active_tracer() is tracer
+    finally:
+        stop_tracing()
+
+
+def test_pool_threads_record_into_the_submitting_job(tmp_path):
+    stream = tmp_path / "car" / "stream"
+    stream.mkdir(parents=True)
+    for index in range(6):
+        (stream / f"part_{index}.ytd").write_bytes(b"x" * (index + 1))
+    (tmp_path / "out").mkdir()
+    copies = {str(tmp_path / "out" / entry.name): entry for entry in scan_folder(str(tmp_path / "car")).entries}
+    with tracing() as tracer:
+        copy_files(copies, 3)
+    assert span_names(tracer).count("copy_file") == 6
+
+
+def test_conversion_thread_records_into_the_callers_tracer():
+    @traced("build")
+    def build(on_event=None, cancel_token=None):
+        return active_tracer()
+
+    with tracing() as tracer:
+        events = list(iter_conversion_events(build))
+    assert events[-1].data is tracer
+    assert span_names(tracer) == ["build"]